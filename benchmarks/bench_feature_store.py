@@ -0,0 +1,107 @@
+"""Benchmark the daily feature store against per-minute snapshot files.
+
+Usage::
+
+    python benchmarks/bench_feature_store.py --minutes 1440 --stations 100
+
+Writes synthetic per-minute snapshots for one day, compacts them with
+:func:`~metro_disruptions_intelligence.feature_store.build_feature_store` and
+times a station time series and a one-minute cross-section on both layouts,
+reading the same columns from each.
+"""
+
+from __future__ import annotations
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from metro_disruptions_intelligence.feature_store import build_feature_store
+from metro_disruptions_intelligence.features import read_features, write_features
+from metro_disruptions_intelligence.processed_reader import (
+    daily_features_path,
+    read_cross_section,
+    read_station_series,
+    snapshot_path,
+)
+
+DAY_START = 1743465600  # 2025-04-01 00:00 UTC
+FLOAT_COLS = ["arrival_delay_t", "headway_t", "delay_mean_5", "delay_mean_15", "data_fresh_secs"]
+
+
+def _write_minutes(root: Path, minutes: int, stations: int) -> list[int]:
+    rng = np.random.default_rng(0)
+    stops = [str(2_000_000 + i) for i in range(stations)]
+    stamps = [DAY_START + 60 * k for k in range(minutes)]
+    for ts in stamps:
+        feats = pd.DataFrame({"stop_id": np.repeat(stops, 2), "direction_id": [0, 1] * stations})
+        for col in FLOAT_COLS:
+            feats[col] = rng.normal(0, 60, len(feats))
+        feats["hub_flag"] = 0
+        feats["snapshot_timestamp"] = ts
+        write_features(feats, snapshot_path(ts, root))
+    return stamps
+
+
+def _timed(label: str, func, *args, repeat: int = 3, **kwargs) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args, **kwargs)
+        best = min(best, time.perf_counter() - start)
+    print(f"{label:<36} {best * 1000:10.1f} ms")
+    return best
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--minutes", type=int, default=1440)
+    parser.add_argument("--stations", type=int, default=100)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        stamps = _write_minutes(root, args.minutes, args.stations)
+        start = time.perf_counter()
+        build_feature_store(root)
+        print(f"compacted {len(stamps)} minute files in {time.perf_counter() - start:.2f}s")
+
+        stop = str(2_000_000 + args.stations // 2)
+        columns = ["stop_id", "direction_id", "delay_mean_15", "snapshot_timestamp"]
+
+        def minute_series() -> pd.DataFrame:
+            frames = []
+            for ts in stamps:
+                df = read_features(snapshot_path(ts, root), columns=columns)
+                frames.append(df[df["stop_id"] == stop])
+            return pd.concat(frames)
+
+        per_minute = _timed("series: per-minute files", minute_series)
+        daily = _timed(
+            "series: daily store", read_station_series, root, stop, None, columns=columns
+        )
+        print(f"  speed-up {per_minute / daily:,.0f}x")
+
+        ts = stamps[len(stamps) // 2]
+        filters = [("snapshot_timestamp", "=", ts)]
+        minute = _timed(
+            "cross-section: per-minute file", read_features, snapshot_path(ts, root), columns
+        )
+        daily = _timed(
+            "cross-section: daily store",
+            read_features,
+            daily_features_path(ts, root),
+            columns,
+            filters,
+        )
+        print(f"  per-minute file {daily / minute:,.0f}x faster")
+        _timed("cross-section: read_cross_section", read_cross_section, root, ts, columns)
+
+
+if __name__ == "__main__":
+    main()
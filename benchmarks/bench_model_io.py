@@ -0,0 +1,74 @@
+"""Benchmark array and pickle persistence of ``StreamingIForestDetector``.
+
+Usage::
+
+    python benchmarks/bench_model_io.py --n-trees 100 --height 10
+
+Trains a detector on random snapshots, then times :meth:`save` and
+:meth:`load` for the memory-mapped ``.npz`` format and the legacy pickle.
+"""
+
+from __future__ import annotations
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from metro_disruptions_intelligence.detect.streaming_iforest import (
+    DEFAULT_STATIONS,
+    IForestConfig,
+    StreamingIForestDetector,
+)
+
+START = 1714665600
+
+
+def _train(config: IForestConfig, minutes: int) -> StreamingIForestDetector:
+    rng = np.random.default_rng(0)
+    stations = sorted(DEFAULT_STATIONS)
+    det = StreamingIForestDetector(config)
+    for k in range(minutes):
+        df = pd.DataFrame({
+            "snapshot_timestamp": START + 60 * k,
+            "stop_id": stations,
+            "direction_id": 0,
+            **{f"f{i}": rng.random(len(stations)) for i in range(12)},
+        })
+        det.score_and_update(df)
+    return det
+
+
+def _timed(label: str, func, *args, repeat: int = 3, **kwargs) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args, **kwargs)
+        best = min(best, time.perf_counter() - start)
+    print(f"{label:<36} {best * 1000:10.1f} ms")
+    return best
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--n-trees", type=int, default=100)
+    parser.add_argument("--height", type=int, default=10)
+    parser.add_argument("--minutes", type=int, default=60)
+    args = parser.parse_args(argv)
+
+    config = IForestConfig(n_trees=args.n_trees, height=args.height, window_size=500)
+    det = _train(config, args.minutes)
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in ("model.npz", "model.pkl"):
+            path = Path(tmp) / name
+            _timed(f"save {name}", det.save, path)
+            print(f"  {path.stat().st_size / 1e6:.1f} MB")
+            _timed(f"load {name}", StreamingIForestDetector.load, path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Benchmark bulk pre-training against replaying ``learn_one`` row by row.
+
+Usage::
+
+    python benchmarks/bench_pretrain.py --days 4 --replay-rows 2000
+
+Builds ``--days`` of random per-minute history for the default stations and
+times :meth:`StreamingIForestDetector.pretrain` with the configured
+``subsample_size`` and with exact window profiles. The replay is timed on the
+first ``--replay-rows`` rows and extrapolated to the whole history.
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from metro_disruptions_intelligence.detect.streaming_iforest import (
+    DEFAULT_STATIONS,
+    IForestConfig,
+    StreamingIForestDetector,
+)
+
+START = 1714665600
+
+
+def _history(days: int) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    stations = sorted(DEFAULT_STATIONS)
+    minutes = days * 1440
+    return pd.DataFrame({
+        "snapshot_timestamp": np.repeat(START + 60 * np.arange(minutes), len(stations)),
+        "stop_id": np.tile(stations, minutes),
+        "direction_id": 0,
+        **{f"f{i}": rng.random(minutes * len(stations)) for i in range(12)},
+    })
+
+
+def _replay(config: IForestConfig, history: pd.DataFrame) -> None:
+    det = StreamingIForestDetector(config)
+    for _, minute in history.groupby("snapshot_timestamp", sort=False):
+        det.score_and_update(minute)
+
+
+def _timed(label: str, func, *args, repeat: int = 3, **kwargs) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args, **kwargs)
+        best = min(best, time.perf_counter() - start)
+    print(f"{label:<36} {best * 1000:10.1f} ms")
+    return best
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--days", type=int, default=4)
+    parser.add_argument("--replay-rows", type=int, default=2000)
+    args = parser.parse_args(argv)
+
+    history = _history(args.days)
+    print(f"{len(history)} history rows")
+    config = IForestConfig(seed=0)
+    exact = IForestConfig(seed=0, subsample_size=config.window_size)
+    _timed("pretrain subsampled", StreamingIForestDetector(config).pretrain, history)
+    _timed("pretrain exact", StreamingIForestDetector(exact).pretrain, history)
+    replay = _timed("replay learn_one", _replay, config, history.iloc[: args.replay_rows], repeat=1)
+    print(f"  ~{replay * len(history) / args.replay_rows:.0f} s for the whole history")
+
+
+if __name__ == "__main__":
+    main()
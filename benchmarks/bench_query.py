@@ -0,0 +1,98 @@
+"""Benchmark DuckDB views against ``load_rt_dataset`` for trip update aggregates.
+
+Usage::
+
+    python benchmarks/bench_query.py --days 3 --files-per-day 240 --rows 500
+
+Writes synthetic processed trip update partitions and times per-station delay
+percentiles computed with :func:`~metro_disruptions_intelligence.query.station_delay_percentiles`
+and with pandas over :func:`~metro_disruptions_intelligence.processed_reader.load_rt_dataset`,
+for the whole tree and for a one-day range.
+"""
+
+from __future__ import annotations
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from metro_disruptions_intelligence.etl.schemas import TRIP_UPDATES_SCHEMA
+from metro_disruptions_intelligence.etl.write_parquet import write_df_to_partitions
+from metro_disruptions_intelligence.processed_reader import load_rt_dataset
+from metro_disruptions_intelligence.query import connect, station_delay_percentiles
+
+START = 1743465600  # 2025-04-01 00:00 UTC
+QUANTILES = (0.5, 0.9, 0.99)
+
+
+def _write_trip_updates(root: Path, days: int, files_per_day: int, rows: int) -> None:
+    rng = np.random.default_rng(0)
+    step = 86_400 // files_per_day
+    stops = np.array([str(2_000_000 + i) for i in range(200)])
+    for k in range(days * files_per_day):
+        ts = START + k * step
+        df = pd.DataFrame({
+            "snapshot_timestamp": ts,
+            "trip_id": [f"trip{k // 30}_{i}" for i in range(rows)],
+            "start_date": "20250401",
+            "route_id": "T1",
+            "stop_id": stops[rng.integers(0, len(stops), rows)],
+            "arrival_delay": rng.integers(-60, 900, rows),
+        })
+        stamp = time.strftime("%Y-%d-%m-%H-%M", time.gmtime(ts))
+        write_df_to_partitions(
+            df, root / "trip_updates", f"trip_updates_{stamp}", schema=TRIP_UPDATES_SCHEMA
+        )
+
+
+def _pandas_percentiles(root: Path, start_ts: int | None, end_ts: int | None) -> pd.DataFrame:
+    tu = load_rt_dataset(root, ["trip_updates"])
+    if start_ts is not None:
+        tu = tu[tu["snapshot_timestamp"].between(start_ts, end_ts)]
+    tu = tu.dropna(subset=["arrival_delay"]).sort_values("snapshot_timestamp")
+    last = tu.groupby(["trip_id", "start_date", "stop_id"])["arrival_delay"].last()
+    return last.groupby("stop_id").quantile(list(QUANTILES)).unstack()
+
+
+def _timed(label: str, func, *args, repeat: int = 3, **kwargs) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args, **kwargs)
+        best = min(best, time.perf_counter() - start)
+    print(f"{label:<36} {best * 1000:10.1f} ms")
+    return best
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--days", type=int, default=3)
+    parser.add_argument("--files-per-day", type=int, default=240)
+    parser.add_argument("--rows", type=int, default=500)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        _write_trip_updates(root, args.days, args.files_per_day, args.rows)
+        con = connect(root)
+        day = (START + 86_400, START + 2 * 86_400 - 1)
+        for label, (lo, hi) in {"all days": (None, None), "one day": day}.items():
+            slow = _timed(f"{label}: load_rt_dataset + pandas", _pandas_percentiles, root, lo, hi)
+            fast = _timed(
+                f"{label}: duckdb views",
+                station_delay_percentiles,
+                con,
+                start_ts=lo,
+                end_ts=hi,
+                quantiles=QUANTILES,
+            )
+            print(f"  speed-up {slow / fast:,.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Benchmark command line startup and the import cost of each subcommand.
+
+Usage::
+
+    python benchmarks/bench_startup.py --repeat 5
+
+Times fresh interpreters running ``import metro_disruptions_intelligence.cli``,
+``--help`` and the imports each subcommand performs when it runs.
+"""
+
+from __future__ import annotations
+
+import argparse
+import subprocess
+import sys
+import time
+
+SUBCOMMAND_MODULES = {
+    "ingest-static": "metro_disruptions_intelligence.etl.static_ingest",
+    "ingest-rt": "metro_disruptions_intelligence.etl.ingest_rt",
+    "query": "metro_disruptions_intelligence.query",
+    "generate-features": "metro_disruptions_intelligence.feature_runner",
+    "detect-anomalies": "metro_disruptions_intelligence.detect.streaming_iforest",
+    "serve": "metro_disruptions_intelligence.service",
+}
+
+
+def _timed(label: str, code: str, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], check=True, capture_output=True)
+        best = min(best, time.perf_counter() - start)
+    print(f"{label:<36} {best * 1000:10.1f} ms")
+    return best
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    base = _timed("python -c pass", "pass", args.repeat)
+    cli = _timed("import cli", "import metro_disruptions_intelligence.cli", args.repeat)
+    _timed(
+        "cli --help",
+        "from metro_disruptions_intelligence.cli import cli\ncli(['--help'], standalone_mode=False)",
+        args.repeat,
+    )
+    print(f"  cli import over bare interpreter {(cli - base) * 1000:.1f} ms")
+    for command, module in SUBCOMMAND_MODULES.items():
+        _timed(f"{command} imports", f"import {module}", args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,293 @@
+"""Reproducible benchmark suite over ETL, features, detection and evaluation.
+
+Usage::
+
+    python benchmarks/bench_suite.py --scale 2 --save benchmarks/results/main.json
+    python benchmarks/bench_suite.py --scale 2 --compare benchmarks/results/main.json
+
+Every case runs on a fixed dataset derived from ``sample_data`` and grown by
+``--scale``: the sample trip update file with its entities repeated
+``--scale`` times, and the first ``30 * --scale`` sample minutes with both
+realtime feeds (their feature snapshots and a seeded synthetic score frame
+for the evaluation). Each case is timed ``--repeat`` times after one warm-up
+run; the best and median run are printed and, with ``--save``, written as
+JSON together with the versions, platform and commit they were measured on.
+
+``--compare`` reruns the suite and exits with status 1 when the best time of
+any case exceeds the baseline's by more than ``--tolerance`` (a fraction).
+Compare runs made on the same machine and scale only.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from metro_disruptions_intelligence.detect.streaming_iforest import (
+    IForestConfig,
+    StreamingIForestDetector,
+)
+from metro_disruptions_intelligence.detect.tune_iforest import run_grid_search
+from metro_disruptions_intelligence.etl.parse_trip_updates import parse_one_trip_update_file
+from metro_disruptions_intelligence.etl.write_parquet import write_df_to_partitioned_parquet
+from metro_disruptions_intelligence.evaluation import evaluate_scores
+from metro_disruptions_intelligence.features import (
+    SnapshotFeatureBuilder,
+    build_route_map,
+    snapshot_frame,
+    write_features,
+)
+from metro_disruptions_intelligence.processed_reader import (
+    compose_path,
+    discover_all_snapshot_minutes,
+    snapshot_path,
+)
+
+SAMPLE = Path(__file__).resolve().parents[1] / "sample_data"
+FEEDS = ("trip_updates", "vehicle_positions")
+DETECTOR = IForestConfig(n_trees=25, height=8, window_size=256, seed=0)
+GRID = {"n_trees": [10, 25], "height": 8, "window_size": [128, 256], "seed": 0}
+DROP_FEATURES = ["data_fresh_secs", "dwell_delta_t"]
+
+
+@dataclass
+class Dataset:
+    """Fixed inputs of one suite run."""
+
+    root: Path
+    tu_json: Path
+    tu_frame: pd.DataFrame
+    processed_root: Path
+    minutes: list[int]
+    frames: list[tuple[pd.DataFrame, pd.DataFrame]]
+    route_map: dict
+    feats: list[pd.DataFrame]
+    features_root: Path
+    scored: pd.DataFrame
+
+
+def _trip_update_json(out: Path, scale: int) -> Path:
+    raw = json.loads((SAMPLE / "rt" / "sample_trip_update.json").read_text())
+    entities = []
+    for copy in range(scale):
+        for entity in raw["entity"]:
+            entity = json.loads(json.dumps(entity))
+            if "trip_update" in entity:
+                entity["trip_update"]["trip"]["trip_id"] += f"-{copy}"
+            entities.append(entity)
+    raw["entity"] = entities
+    out.write_text(json.dumps(raw))
+    return out
+
+
+def _scored_frame(n_rows: int) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    score = rng.random(n_rows)
+    return pd.DataFrame({
+        "ts": 1_700_000_000 + 60 * (np.arange(n_rows) // 40),
+        "stop_id": rng.integers(0, 40, n_rows).astype(str),
+        "direction_id": rng.integers(0, 2, n_rows),
+        "anomaly_score": score,
+        "anomaly_flag": (score > 0.97).astype(int),
+        "arrival_delay_t": rng.exponential(60, n_rows),
+        "departure_delay_t": rng.exponential(60, n_rows),
+    })
+
+
+def build_dataset(root: Path, scale: int) -> Dataset:
+    """Materialise the suite inputs for ``scale`` below ``root``."""
+    tu_json = _trip_update_json(root / "trip_update.json", scale)
+    sample_root = SAMPLE / "rt_parquet"
+    processed_root = root / "rt"
+    minutes, frames = [], []
+    for ts in discover_all_snapshot_minutes(sample_root):
+        paths = [compose_path(ts, sample_root, feed) for feed in FEEDS]
+        if not all(p.exists() for p in paths):
+            continue
+        pair = tuple(pd.read_parquet(p) for p in paths)
+        # a few sample minutes hold header-only files
+        if any(df.empty or "snapshot_timestamp" not in df for df in pair):
+            continue
+        for feed, path in zip(FEEDS, paths):
+            dest = compose_path(ts, processed_root, feed)
+            dest.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(path, dest)
+        minutes.append(ts)
+        frames.append(pair)
+        if len(minutes) == 30 * scale:
+            break
+
+    route_map = build_route_map(processed_root)
+    builder = SnapshotFeatureBuilder(route_map, log_every=None)
+    feats = [snapshot_frame(builder, tu, vp, ts) for ts, (tu, vp) in zip(minutes, frames)]
+    features_root = root / "features"
+    for ts, df in zip(minutes, feats):
+        write_features(df, snapshot_path(ts, features_root))
+
+    return Dataset(
+        root=root,
+        tu_json=tu_json,
+        tu_frame=parse_one_trip_update_file(tu_json),
+        processed_root=processed_root,
+        minutes=minutes,
+        frames=frames,
+        route_map=route_map,
+        feats=feats,
+        features_root=features_root,
+        scored=_scored_frame(10_000 * scale),
+    )
+
+
+def _build_features(data: Dataset) -> None:
+    builder = SnapshotFeatureBuilder(data.route_map, log_every=None)
+    for ts, (tu, vp) in zip(data.minutes, data.frames):
+        builder.build_snapshot_features(tu, vp, ts)
+
+
+def _score(data: Dataset, explain: bool) -> None:
+    det = StreamingIForestDetector(DETECTOR, drop_features=DROP_FEATURES)
+    # explanations walk every tree per row; a sixth of the minutes keeps the case short
+    feats = data.feats[: max(len(data.feats) // 6, 1)] if explain else data.feats
+    for df in feats:
+        det.score_and_update(df, explain=explain)
+
+
+def _grid_search(data: Dataset) -> None:
+    import yaml
+
+    with tempfile.TemporaryDirectory(dir=data.root) as tmp:
+        grid = Path(tmp) / "grid.yaml"
+        grid.write_text(yaml.safe_dump(GRID))
+        run_grid_search(
+            data.features_root,
+            grid,
+            datetime.fromtimestamp(data.minutes[0], tz=timezone.utc),
+            datetime.fromtimestamp(data.minutes[-1] + 60, tz=timezone.utc),
+            Path(tmp) / "cache",
+            results_csv=Path(tmp) / "results.csv",
+            best_yaml=Path(tmp) / "best.yaml",
+            delay_threshold=120,
+        )
+
+
+def cases(data: Dataset) -> dict[str, Callable[[], object]]:
+    """Return the benchmark cases, each a function of no arguments."""
+    return {
+        "parse_one_trip_update_file": lambda: parse_one_trip_update_file(data.tu_json),
+        "write_df_to_partitioned_parquet": lambda: write_df_to_partitioned_parquet(
+            data.tu_frame, data.root / "written" / "trip_updates", "trip_updates"
+        ),
+        "build_route_map": lambda: build_route_map(data.processed_root),
+        "build_snapshot_features": lambda: _build_features(data),
+        "score_and_update": lambda: _score(data, explain=False),
+        "score_and_update[explain]": lambda: _score(data, explain=True),
+        "run_grid_search": lambda: _grid_search(data),
+        "evaluate_scores": lambda: evaluate_scores(data.scored, None, delay_threshold=120),
+    }
+
+
+def _run(func: Callable[[], object], repeat: int) -> list[float]:
+    func()
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        runs.append(time.perf_counter() - start)
+    return runs
+
+
+def _environment(scale: int, repeat: int) -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=SAMPLE.parent,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": commit,
+        "scale": scale,
+        "repeat": repeat,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Return a message for every case of ``results`` slower than ``baseline`` beyond ``tolerance``."""
+    if results["environment"]["scale"] != baseline["environment"]["scale"]:
+        raise ValueError("Baseline was measured at a different --scale")
+    regressions = []
+    for name, current in results["benchmarks"].items():
+        before = baseline["benchmarks"].get(name)
+        if before is None:
+            continue
+        ratio = current["best"] / before["best"]
+        print(f"{name:<36} {ratio:8.2f}x baseline")
+        if ratio > 1 + tolerance:
+            regressions.append(
+                f"{name}: {current['best'] * 1000:.1f} ms vs {before['best'] * 1000:.1f} ms"
+            )
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Run the suite and return the process exit status."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--only", nargs="*", default=None, help="Run only these cases")
+    parser.add_argument("--save", type=Path, default=None, help="Write the results as JSON")
+    parser.add_argument("--compare", type=Path, default=None, help="Baseline JSON to check")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data = build_dataset(Path(tmp), args.scale)
+        print(f"scale {args.scale}: {len(data.minutes)} minutes, {len(data.tu_frame)} parsed rows")
+        results = {"environment": _environment(args.scale, args.repeat), "benchmarks": {}}
+        for name, func in cases(data).items():
+            if args.only and name not in args.only:
+                continue
+            runs = _run(func, args.repeat)
+            best, median = min(runs), statistics.median(runs)
+            results["benchmarks"][name] = {"best": best, "median": median, "runs": runs}
+            print(f"{name:<36} {best * 1000:10.1f} ms (median {median * 1000:.1f} ms)")
+
+    if args.save is not None:
+        args.save.parent.mkdir(parents=True, exist_ok=True)
+        args.save.write_text(json.dumps(results, indent=2))
+        print(f"Wrote {args.save}")
+    if args.compare is not None:
+        regressions = compare(results, json.loads(args.compare.read_text()), args.tolerance)
+        if regressions:
+            print(f"Slower than {args.compare} by more than {args.tolerance:.0%}:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
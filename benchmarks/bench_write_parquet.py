@@ -0,0 +1,70 @@
+"""Benchmark partition key derivation and partitioned Parquet writes.
+
+Usage::
+
+    python benchmarks/bench_write_parquet.py --rows 1000000
+
+Compares the former per-row pytz ``map`` used to derive year/month/day with
+the vectorised :func:`~metro_disruptions_intelligence.etl.write_parquet.partition_keys`
+and times a full :func:`write_df_to_partitions` call on a frame spanning two days.
+"""
+
+from __future__ import annotations
+
+import argparse
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytz
+
+from metro_disruptions_intelligence.etl.write_parquet import partition_keys, write_df_to_partitions
+
+
+def _legacy_keys(ts: pd.Series) -> pd.DataFrame:
+    tz_london = pytz.timezone("Europe/London")
+
+    def to_dt(t: int) -> datetime:
+        return datetime.fromtimestamp(int(t), tz_london)
+
+    df = ts.to_frame()
+    df["year"] = ts.map(lambda t: to_dt(t).year)
+    df["month"] = ts.map(lambda t: to_dt(t).month)
+    df["day"] = ts.map(lambda t: to_dt(t).day)
+    return df
+
+
+def _timed(label: str, func, *args) -> float:
+    start = time.perf_counter()
+    func(*args)
+    secs = time.perf_counter() - start
+    print(f"{label:<28} {secs:8.3f}s")
+    return secs
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(0)
+    start = 1_743_462_000 - 3600
+    df = pd.DataFrame({
+        "snapshot_timestamp": np.sort(rng.integers(start, start + 2 * 3600, args.rows)),
+        "stop_id": rng.integers(2_000_000, 2_000_100, args.rows).astype(str),
+        "arrival_delay": rng.normal(0, 60, args.rows),
+    })
+    print(f"rows={args.rows:,}")
+    legacy = _timed("legacy partition keys", _legacy_keys, df["snapshot_timestamp"])
+    fast = _timed("vectorised partition keys", partition_keys, df["snapshot_timestamp"])
+    print(f"speed-up {legacy / fast:,.0f}x")
+    with tempfile.TemporaryDirectory() as tmp:
+        _timed("write_df_to_partitions", write_df_to_partitions, df, Path(tmp), "bench")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,27 @@
-"""Top-level module for metro_disruptions_intelligence."""
+"""Top-level module for metro_disruptions_intelligence.
 
-from .features import SnapshotFeatureBuilder
-from .utils_gtfsrt import is_new_service_day, make_fake_tu, make_fake_vp
+Public names are imported on first access so that importing a submodule,
+such as the command line interface, does not load pandas and PyArrow.
+"""
+
+from __future__ import annotations
+
+import importlib
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from .features import SnapshotFeatureBuilder
+    from .utils_gtfsrt import is_new_service_day, make_fake_tu, make_fake_vp
 
 __version__ = "0.1.0.dev0"
 
+_LAZY = {
+    "SnapshotFeatureBuilder": ".features",
+    "is_new_service_day": ".utils_gtfsrt",
+    "make_fake_tu": ".utils_gtfsrt",
+    "make_fake_vp": ".utils_gtfsrt",
+}
+
 __all__ = [
     "SnapshotFeatureBuilder",
     "is_new_service_day",
@@ -12,3 +29,11 @@ __all__ = [
     "make_fake_vp",
     "__version__",
 ]
+
+
+def __getattr__(name: str) -> Any:
+    if name not in _LAZY:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_LAZY[name], __name__), name)
+    globals()[name] = value
+    return value
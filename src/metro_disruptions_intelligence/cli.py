@@ -1,28 +1,74 @@
-"""Command line entry points for :mod:`metro_disruptions_intelligence`."""
+"""Command line entry points for :mod:`metro_disruptions_intelligence`.
+
+Subcommands import their implementation when they run, so ``--help`` and
+the light commands do not pay for pandas, river or DuckDB at startup.
+"""
 
 import logging
 from datetime import datetime
 from pathlib import Path
 
 import click
-import pandas as pd
-import pytz
-
-from .detect.streaming_iforest import StreamingIForestDetector
-from .detect.tune_iforest import run_grid_search
-from .etl.ingest_rt import _parse_cli_time, ingest_all_rt, union_all_feeds
-from .etl.static_ingest import ingest_static_gtfs
-from .features import SnapshotFeatureBuilder, build_route_map, write_features
-from .processed_reader import compose_path, discover_all_snapshot_minutes, snapshot_path
 
 logger = logging.getLogger(__name__)
 
 
 @click.group()
 @click.version_option(package_name="metro_disruptions_intelligence")
-def cli() -> None:
+@click.option(
+    "--metrics-file",
+    type=click.Path(dir_okay=False, path_type=Path),
+    default=None,
+    help="Write Prometheus metrics to this file every 15 s and on exit",
+)
+@click.option(
+    "--metrics-port",
+    type=int,
+    default=None,
+    help="Serve Prometheus metrics on http://0.0.0.0:PORT/metrics while running",
+)
+@click.option(
+    "--profile",
+    is_flag=True,
+    help="Profile the command: top functions, collapsed stacks and peak RSS",
+)
+@click.option(
+    "--profile-memory",
+    is_flag=True,
+    help="With --profile, also trace allocations with tracemalloc (slows the command down)",
+)
+@click.option(
+    "--profile-dir",
+    type=click.Path(file_okay=False, path_type=Path),
+    default=Path("profiles"),
+    show_default=True,
+    help="Directory for the --profile reports",
+)
+@click.pass_context
+def cli(
+    ctx: click.Context,
+    metrics_file: Path | None,
+    metrics_port: int | None,
+    profile: bool,
+    profile_memory: bool,
+    profile_dir: Path,
+) -> None:
     """Command line interface for ``metro_disruptions_intelligence``."""
-    pass
+    if profile and ctx.invoked_subcommand is not None:
+        from .profiling import profile_command
+
+        # registered first so it closes last, after the metrics exporters
+        ctx.call_on_close(
+            profile_command(ctx.invoked_subcommand, profile_dir, memory=profile_memory)
+        )
+    if metrics_file is None and metrics_port is None:
+        return
+    from .metrics import export_to_file, serve_metrics
+
+    if metrics_file is not None:
+        ctx.call_on_close(export_to_file(metrics_file))
+    if metrics_port is not None:
+        ctx.call_on_close(serve_metrics(metrics_port))
 
 
 @cli.command("ingest-static")
@@ -35,9 +81,29 @@ def cli() -> None:
     help="Directory to store processed Parquet and optional DuckDB",
 )
 @click.option("--persist-duckdb", is_flag=True, help="Persist the intermediate DuckDB DB")
-def ingest_static_cmd(gtfs_dir: Path, output_dir: Path, persist_duckdb: bool) -> None:
-    """Ingest static GTFS files into Parquet tables."""
-    ingest_static_gtfs(gtfs_dir, output_dir, persist_duckdb)
+@click.option(
+    "--start-date", type=click.DateTime(["%Y-%m-%d"]), default=None, help="First service date"
+)
+@click.option(
+    "--end-date", type=click.DateTime(["%Y-%m-%d"]), default=None, help="Last service date"
+)
+def ingest_static_cmd(
+    gtfs_dir: Path,
+    output_dir: Path,
+    persist_duckdb: bool,
+    start_date: datetime | None,
+    end_date: datetime | None,
+) -> None:
+    """Ingest static GTFS files into Parquet tables partitioned by service and route."""
+    from .etl.static_ingest import ingest_static_gtfs
+
+    ingest_static_gtfs(
+        gtfs_dir,
+        output_dir,
+        persist_duckdb,
+        start_date=start_date.date() if start_date else None,
+        end_date=end_date.date() if end_date else None,
+    )
 
 
 @cli.command("ingest-rt")
@@ -56,6 +122,8 @@ def ingest_rt_cmd(
     raw_root: Path, processed_root: Path, union: bool, start_time: str | None, end_time: str | None
 ) -> None:
     """Ingest realtime JSON feeds into Parquet tables."""
+    from .etl.ingest_rt import _parse_cli_time, ingest_all_rt, union_all_feeds
+
     ingest_all_rt(
         raw_root,
         processed_root,
@@ -67,6 +135,78 @@ def ingest_rt_cmd(
         union_all_feeds(processed_root, output_parquet)
 
 
+@cli.command("generate-synthetic")
+@click.argument("out_root", type=click.Path(file_okay=False, path_type=Path))
+@click.option(
+    "--route-source",
+    type=click.Path(exists=True, path_type=Path),
+    default=None,
+    help="station_schedule.parquet or a processed realtime root; default synthetic lines",
+)
+@click.option(
+    "--format",
+    "fmt",
+    type=click.Choice(["json", "parquet"]),
+    default="parquet",
+    show_default=True,
+    help="Raw JSON for ingest-rt/serve or processed Parquet for generate-features",
+)
+@click.option("--routes", type=int, default=None, help="Number of routes, copying lines as needed")
+@click.option("--stops", type=int, default=20, show_default=True, help="Stops per synthetic line")
+@click.option("--trains-per-hour", type=float, default=12.0, show_default=True)
+@click.option("--days", type=int, default=1, show_default=True)
+@click.option("--minutes-per-day", type=click.IntRange(1, 1440), default=60, show_default=True)
+@click.option("--start-time", type=str, default=None, help="First minute of the first day")
+@click.option("--disruptions", type=int, default=1, show_default=True, help="Disruptions per day")
+@click.option("--disruption-delay", type=int, default=600, show_default=True, help="Seconds")
+@click.option("--lag-mean", type=float, default=10.0, show_default=True, help="Mean feed lag (s)")
+@click.option("--lag-max", type=int, default=120, show_default=True, help="Maximum feed lag (s)")
+@click.option(
+    "--drop-prob", type=float, default=0.0, show_default=True, help="Chance a feed file is missing"
+)
+@click.option("--seed", type=int, default=0, show_default=True)
+def generate_synthetic_cmd(
+    out_root: Path,
+    route_source: Path | None,
+    fmt: str,
+    routes: int | None,
+    stops: int,
+    trains_per_hour: float,
+    days: int,
+    minutes_per_day: int,
+    start_time: str | None,
+    disruptions: int,
+    disruption_delay: int,
+    lag_mean: float,
+    lag_max: int,
+    drop_prob: float,
+    seed: int,
+) -> None:
+    """Write a synthetic GTFS-realtime feed with injected disruptions to OUT_ROOT."""
+    from .etl.ingest_rt import _parse_cli_time
+    from .etl.synthetic import SyntheticConfig, generate_synthetic_feeds, load_route_map
+
+    route_map = load_route_map(route_source, routes, stops)
+    cfg = SyntheticConfig(
+        days=days,
+        minutes_per_day=minutes_per_day,
+        trains_per_hour=trains_per_hour,
+        disruptions_per_day=disruptions,
+        disruption_delay_secs=disruption_delay,
+        lag_mean_secs=lag_mean,
+        lag_max_secs=lag_max,
+        drop_prob=drop_prob,
+        seed=seed,
+    )
+    if start_time:
+        cfg.start_ts = int(_parse_cli_time(start_time).timestamp())
+    planned = generate_synthetic_feeds(route_map, out_root, cfg, fmt)
+    click.echo(
+        f"Wrote {days * minutes_per_day} minutes of {len(route_map)} route directions "
+        f"with {len(planned)} disruptions to {out_root}"
+    )
+
+
 @cli.command("generate-features")
 @click.argument("processed_root", type=click.Path(exists=True, path_type=Path))
 @click.option(
@@ -80,45 +220,139 @@ def ingest_rt_cmd(
     "--start-time", type=str, default=None, help="Process snapshots on or after this time"
 )
 @click.option("--end-time", type=str, default=None, help="Process snapshots up to this time")
+@click.option(
+    "--checkpoint-dir",
+    type=click.Path(path_type=Path),
+    default=None,
+    help="Directory for builder state checkpoints; resumes from the latest one before --start-time",
+)
+@click.option(
+    "--checkpoint-every",
+    type=click.IntRange(min=1),
+    default=60,
+    show_default=True,
+    help="Minutes between builder checkpoints",
+)
+@click.option(
+    "--incremental",
+    is_flag=True,
+    help="Only rebuild snapshots whose input files changed and the minutes depending on them",
+)
+@click.option(
+    "--static-dir",
+    type=click.Path(exists=True, path_type=Path),
+    default=None,
+    help="ingest-static output; adds timetable features such as sched_headway_t",
+)
+@click.option(
+    "--ledger-root",
+    type=click.Path(file_okay=False, path_type=Path),
+    default=None,
+    help="Append per-minute stage telemetry to the run ledger below this directory",
+)
 def generate_features_cmd(
-    processed_root: Path, output_root: Path, start_time: str | None, end_time: str | None
+    processed_root: Path,
+    output_root: Path,
+    start_time: str | None,
+    end_time: str | None,
+    checkpoint_dir: Path | None,
+    checkpoint_every: int,
+    incremental: bool,
+    static_dir: Path | None,
+    ledger_root: Path | None,
 ) -> None:
     """Generate per-minute feature Parquet files from processed realtime data."""
-    start_dt = _parse_cli_time(start_time) if start_time else None
-    end_dt = _parse_cli_time(end_time) if end_time else None
-
-    route_map = build_route_map(processed_root)
-    builder = SnapshotFeatureBuilder(route_map)
-    minutes = discover_all_snapshot_minutes(processed_root)
-
-    if start_dt:
-        start_ts = int(start_dt.timestamp())
-        minutes = [m for m in minutes if m >= start_ts]
-    if end_dt:
-        end_ts = int(end_dt.timestamp())
-        minutes = [m for m in minutes if m <= end_ts]
-
-    for ts in minutes:
-        tu_file = compose_path(ts, processed_root, "trip_updates")
-        vp_file = compose_path(ts, processed_root, "vehicle_positions")
-        if not tu_file.exists() or not vp_file.exists():
-            if not tu_file.exists():
-                logger.warning("trip_updates file missing for %s", ts)
-            if not vp_file.exists():
-                logger.warning("vehicle_positions file missing for %s", ts)
-            continue
-
-        trip_now = pd.read_parquet(tu_file)
-        veh_now = pd.read_parquet(vp_file)
-        if veh_now.empty:
-            logger.warning("vehicle_positions file %s contains no rows", vp_file)
-        feats = builder.build_snapshot_features(trip_now, veh_now, ts)
-
-        feats = feats.reset_index()
-        feats["snapshot_timestamp"] = ts
-
-        out_file = snapshot_path(ts, output_root)
-        write_features(feats, out_file)
+    from .etl.ingest_rt import _parse_cli_time
+    from .feature_runner import generate_features
+    from .ledger import RunLedger
+
+    ledger = None if ledger_root is None else RunLedger(ledger_root)
+    try:
+        generate_features(
+            processed_root,
+            output_root,
+            start_ts=int(_parse_cli_time(start_time).timestamp()) if start_time else None,
+            end_ts=int(_parse_cli_time(end_time).timestamp()) if end_time else None,
+            checkpoint_dir=checkpoint_dir,
+            checkpoint_every=checkpoint_every,
+            incremental=incremental,
+            static_dir=static_dir,
+            ledger=ledger,
+        )
+    finally:
+        if ledger is not None:
+            ledger.close()
+
+
+@cli.command("build-feature-store")
+@click.argument("features_root", type=click.Path(exists=True, path_type=Path))
+@click.option(
+    "--out-root",
+    type=click.Path(path_type=Path),
+    default=None,
+    help="Root for stations_daily/ output (defaults to FEATURES_ROOT)",
+)
+@click.option("--start-time", type=str, default=None, help="First day to compact")
+@click.option("--end-time", type=str, default=None, help="Last day to compact")
+def build_feature_store_cmd(
+    features_root: Path, out_root: Path | None, start_time: str | None, end_time: str | None
+) -> None:
+    """Compact per-minute feature snapshots into sorted daily files."""
+    from .etl.ingest_rt import _parse_cli_time
+    from .feature_store import build_feature_store
+
+    written = build_feature_store(
+        features_root,
+        out_root,
+        start_ts=int(_parse_cli_time(start_time).timestamp()) if start_time else None,
+        end_ts=int(_parse_cli_time(end_time).timestamp()) if end_time else None,
+    )
+    click.echo(f"Wrote {len(written)} daily feature files")
+
+
+@cli.command("query")
+@click.argument("sql", type=str)
+@click.option(
+    "--processed-root",
+    type=click.Path(path_type=Path),
+    default=Path("data/processed/rt"),
+    show_default=True,
+    help="Processed realtime root exposed as alerts/trip_updates/vehicle_positions views",
+)
+@click.option(
+    "--features-root",
+    type=click.Path(path_type=Path),
+    default=Path("data/stations_features_time_series"),
+    show_default=True,
+    help="Feature root exposed as stations_feats/stations_daily views",
+)
+@click.option(
+    "--output",
+    type=click.Path(path_type=Path),
+    default=None,
+    help="Write the result to a .parquet, .csv or .json file instead of printing it",
+)
+@click.option(
+    "--ledger-root",
+    type=click.Path(path_type=Path),
+    default=None,
+    help="Run ledger root exposed as the run_ledger view",
+)
+def query_cmd(
+    sql: str,
+    processed_root: Path,
+    features_root: Path,
+    output: Path | None,
+    ledger_root: Path | None,
+) -> None:
+    """Run SQL over the processed Parquet partitions with DuckDB."""
+    from .query import connect, run_query
+
+    con = connect(processed_root, features_root, ledger_root=ledger_root)
+    try:
+        click.echo(run_query(con, sql, output))
+    finally:
+        con.close()
 
 
 @cli.command("detect-anomalies")
@@ -132,40 +366,62 @@ def generate_features_cmd(
 @click.option("--config", "config_path", type=click.Path(path_type=Path))
 @click.option("--start", "start_time", required=True, type=str)
 @click.option("--end", "end_time", required=True, type=str)
+@click.option(
+    "--workers",
+    type=click.IntRange(min=1),
+    default=1,
+    show_default=True,
+    help="Score service days in this many processes; set seed in --config for reproducible trees",
+)
+@click.option(
+    "--model-bank",
+    type=click.Path(path_type=Path),
+    default=None,
+    help="Directory of weekday/weekend snapshots that warm-start each service day",
+)
+@click.option(
+    "--pretrain",
+    is_flag=True,
+    help="Pre-train each service day on the warmup_days of features before it",
+)
+@click.option(
+    "--ledger-root",
+    type=click.Path(file_okay=False, path_type=Path),
+    default=None,
+    help="Append per-minute stage telemetry to the run ledger below this directory",
+)
 def detect_anomalies_cmd(
-    processed_root: Path, out_root: Path, config_path: Path | None, start_time: str, end_time: str
+    processed_root: Path,
+    out_root: Path,
+    config_path: Path | None,
+    start_time: str,
+    end_time: str,
+    workers: int,
+    model_bank: Path | None,
+    pretrain: bool,
+    ledger_root: Path | None,
 ) -> None:
     """Stream feature snapshots and score anomalies."""
-    start_dt = _parse_cli_time(start_time)
-    end_dt = _parse_cli_time(end_time)
-    config = config_path if config_path else {}
-    det = StreamingIForestDetector(config, drop_features=["data_fresh_secs", "dwell_delta_t"])
-
-    total = 0
-    anomalies = 0
-    mean_accum = 0.0
-
-    start_ts = int(start_dt.timestamp())
-    end_ts = int(end_dt.timestamp())
-    for ts in range(start_ts, end_ts, 60):
-        in_file = snapshot_path(ts, processed_root)
-        if not in_file.exists():
-            continue
-        df = pd.read_parquet(in_file)
-        out = det.score_and_update(df)
-        logger.info("scored %s -> %d rows", in_file, len(out))
-        if out.empty:
-            continue
-        total += 1
-        anomalies += int(out["anomaly_flag"].sum())
-        mean_accum += float(out["anomaly_score"].mean())
-        dt = datetime.fromtimestamp(ts, tz=pytz.UTC)
-        out_dir = out_root / f"year={dt.year:04d}" / f"month={dt.month:02d}" / f"day={dt.day:02d}"
-        out_dir.mkdir(parents=True, exist_ok=True)
-        out_file = out_dir / f"anomaly_scores_{dt:%Y-%d-%m-%H-%M}.parquet"
-        out.to_parquet(out_file, index=False)
-    mean_score = mean_accum / total if total else 0.0
-    click.echo(f"Processed {total} snapshots | anomalies {anomalies} | mean_score {mean_score:.4f}")
+    from .detect.backfill import backfill
+    from .etl.ingest_rt import _parse_cli_time
+
+    if model_bank is not None and workers > 1:
+        raise click.UsageError("--model-bank links consecutive service days; use --workers 1")
+    stats = backfill(
+        processed_root,
+        out_root,
+        config_path if config_path else {},
+        int(_parse_cli_time(start_time).timestamp()),
+        int(_parse_cli_time(end_time).timestamp()),
+        workers=workers,
+        model_bank=model_bank,
+        pretrain=pretrain,
+        ledger_root=ledger_root,
+    )
+    click.echo(
+        f"Processed {stats.snapshots} snapshots | anomalies {stats.anomalies} | "
+        f"mean_score {stats.mean_score:.4f}"
+    )
 
 
 @cli.command("tune-iforest")
@@ -184,6 +440,9 @@ def tune_iforest_cmd(
     processed_root: Path, grid_yaml: Path, start_time: str, end_time: str, delay_threshold: int
 ) -> None:
     """Grid search hyper-parameters for StreamingIForestDetector."""
+    from .detect.tune_iforest import run_grid_search
+    from .etl.ingest_rt import _parse_cli_time
+
     start_dt = _parse_cli_time(start_time)
     end_dt = _parse_cli_time(end_time)
     df = run_grid_search(
@@ -198,3 +457,177 @@ def tune_iforest_cmd(
     )
     if df.empty:
         click.echo("No feature files found for the specified range", err=True)
+
+
+@cli.command("serve")
+@click.argument("raw_root", type=click.Path(path_type=Path))
+@click.option(
+    "--processed-root",
+    type=click.Path(path_type=Path),
+    default=Path("data/processed/rt"),
+    show_default=True,
+    help="Destination directory for partitioned realtime Parquet",
+)
+@click.option(
+    "--features-root",
+    type=click.Path(path_type=Path),
+    default=Path("data/stations_features_time_series"),
+    show_default=True,
+    help="Directory for feature Parquet output",
+)
+@click.option(
+    "--scores-root",
+    type=click.Path(path_type=Path),
+    default=Path("data/anomaly_scores"),
+    show_default=True,
+    help="Directory for anomaly score Parquet output",
+)
+@click.option("--config", "config_path", type=click.Path(path_type=Path))
+@click.option("--poll-interval", type=float, default=1.0, show_default=True)
+@click.option(
+    "--settle-secs",
+    type=float,
+    default=1.0,
+    show_default=True,
+    help="Minimum age of a raw file before its minute is processed",
+)
+@click.option("--max-minutes", type=int, default=None, help="Stop after this many minutes")
+@click.option(
+    "--idle-timeout", type=float, default=None, help="Stop after this many seconds without input"
+)
+@click.option("--no-inotify", is_flag=True, help="Always poll instead of using inotify")
+@click.option(
+    "--model-bank",
+    type=click.Path(path_type=Path),
+    default=None,
+    help="Directory of weekday/weekend snapshots that warm-start each service day",
+)
+@click.option(
+    "--pretrain",
+    is_flag=True,
+    help="Pre-train each service day on the warmup_days of features before it",
+)
+@click.option(
+    "--ledger-root",
+    type=click.Path(file_okay=False, path_type=Path),
+    default=None,
+    help="Append per-minute stage telemetry to the run ledger below this directory",
+)
+def serve_cmd(
+    raw_root: Path,
+    processed_root: Path,
+    features_root: Path,
+    scores_root: Path,
+    config_path: Path | None,
+    poll_interval: float,
+    settle_secs: float,
+    max_minutes: int | None,
+    idle_timeout: float | None,
+    no_inotify: bool,
+    model_bank: Path | None,
+    pretrain: bool,
+    ledger_root: Path | None,
+) -> None:
+    """Watch RAW_ROOT and ingest, featurise and score each new minute."""
+    from .service import MinuteReport, RawFeedWatcher, build_service
+
+    service = build_service(
+        processed_root,
+        features_root,
+        scores_root,
+        config_path,
+        settle_secs=settle_secs,
+        model_bank=model_bank,
+        pretrain=pretrain,
+        ledger_root=ledger_root,
+    )
+    watcher = RawFeedWatcher(raw_root, poll_interval=poll_interval, use_inotify=not no_inotify)
+    click.echo(f"Watching {raw_root} ({watcher.backend})")
+
+    def _echo(report: MinuteReport) -> None:
+        click.echo(
+            f"{report.ts}: scored {report.n_scored} | anomalies {report.n_anomalies} | "
+            f"latency {report.latency_secs:.3f}s"
+        )
+
+    try:
+        service.run(watcher, max_minutes=max_minutes, idle_timeout=idle_timeout, on_minute=_echo)
+    except KeyboardInterrupt:
+        click.echo("Stopped")
+    finally:
+        watcher.close()
+        if service.ledger is not None:
+            service.ledger.close()
+
+
+@cli.command("run-pipeline")
+@click.argument("raw_root", type=click.Path(exists=True, path_type=Path))
+@click.option(
+    "--processed-root",
+    type=click.Path(path_type=Path),
+    default=Path("data/processed/rt"),
+    show_default=True,
+    help="Destination directory for partitioned realtime Parquet",
+)
+@click.option(
+    "--features-root",
+    type=click.Path(path_type=Path),
+    default=Path("data/stations_features_time_series"),
+    show_default=True,
+    help="Directory for feature Parquet output",
+)
+@click.option(
+    "--scores-root",
+    type=click.Path(path_type=Path),
+    default=Path("data/anomaly_scores"),
+    show_default=True,
+    help="Directory for anomaly score Parquet output",
+)
+@click.option("--config", "config_path", type=click.Path(path_type=Path))
+@click.option("--start-time", type=str, default=None, help="Process raw files from this time")
+@click.option("--end-time", type=str, default=None, help="Process raw files up to this time")
+@click.option("--queue-size", type=int, default=8, show_default=True)
+@click.option("--parse-workers", type=int, default=2, show_default=True)
+@click.option(
+    "--ledger-root",
+    type=click.Path(file_okay=False, path_type=Path),
+    default=None,
+    help="Append per-minute stage telemetry to the run ledger below this directory",
+)
+def run_pipeline_cmd(
+    raw_root: Path,
+    processed_root: Path,
+    features_root: Path,
+    scores_root: Path,
+    config_path: Path | None,
+    start_time: str | None,
+    end_time: str | None,
+    queue_size: int,
+    parse_workers: int,
+    ledger_root: Path | None,
+) -> None:
+    """Replay RAW_ROOT through overlapping parse, feature, scoring and write stages."""
+    from .etl.ingest_rt import _parse_cli_time, group_raw_files
+    from .pipeline import AsyncPipeline
+    from .service import build_service
+
+    start_ts = int(_parse_cli_time(start_time).timestamp()) if start_time else None
+    end_ts = int(_parse_cli_time(end_time).timestamp()) if end_time else None
+    minutes = group_raw_files(raw_root, start_ts, end_ts)
+    service = build_service(
+        processed_root, features_root, scores_root, config_path, ledger_root=ledger_root
+    )
+    pipeline = AsyncPipeline(service, queue_size=queue_size, parse_workers=parse_workers)
+    try:
+        stats = pipeline.run_sync(minutes.items(), report_every=60.0)
+    finally:
+        if service.ledger is not None:
+            service.ledger.close()
+    # a minute is processed once its outputs are written; skipped minutes never reach the sink
+    done = stats["stages"]["sink"]["items"]
+    click.echo(f"Processed {done} of {len(minutes)} minutes in {stats['elapsed_secs']:.1f}s")
+    for name, stage in stats["stages"].items():
+        click.echo(
+            f"  {name:<8} {stage['items']:>6} items | {stage['items_per_sec']:.2f}/s | "
+            f"utilisation {stage['utilisation']:.0%}"
+        )
@@ -1,11 +1,14 @@
 # src/metro_disruptions_intelligence/data_loader.py
-"""Utility helpers to locate and list the raw GTFS JSON files."""
+"""Utility helpers to locate and list the raw GTFS JSON files.
+
+``DATA_DIR`` and the feed directories are module attributes resolved on first
+access, so importing this module neither reads YAML nor touches the disk.
+"""
 
 import os
+from functools import lru_cache
 from pathlib import Path
 
-import yaml
-
 
 def _load_config() -> dict:
     """Load configuration from multiple locations.
@@ -22,6 +25,8 @@ def _load_config() -> dict:
     if env_path:
         return {"data_dir": env_path}
 
+    import yaml
+
     # 2) Attempt to load local override
     local_cfg_path = Path(__file__).resolve().parents[2] / "config" / "local.yaml"
     if local_cfg_path.exists():
@@ -44,21 +49,37 @@ def _load_config() -> dict:
     )
 
 
-# Load config at import time so we don’t repeatedly re‐read YAML
-_cfg = _load_config()
-DATA_DIR = Path(_cfg["data_dir"]).expanduser()
+_SUBDIRS = {
+    "ALERTS_DIR": ("RAIL_RT_ALERTS", "RAIL_RT_ALERTS"),
+    "TRIP_UPDATES_DIR": ("RAIL_RT_TRIP_UPDATES", "RAIL_RT_TRIP_UPDATES"),
+    "VEHICLE_POSITIONS_DIR": ("RAIL_RT_VEHICLE_POSITIONS", "RAIL_RT_VEHICLE_POSITIONS"),
+}
+
+
+@lru_cache(maxsize=1)
+def _data_dir() -> Path:
+    """Resolve and validate ``DATA_DIR`` on first use; the result is cached."""
+    data_dir = Path(_load_config()["data_dir"]).expanduser()
+    if not data_dir.is_dir():
+        raise RuntimeError(
+            f"Data directory '{data_dir}' does not exist. "
+            "Set the METRO_DATA_DIR environment variable or update config/local.yaml "
+            "with a valid path."
+        )
+    return data_dir
+
+
+def _feed_dir(name: str) -> Path:
+    return _data_dir().joinpath(*_SUBDIRS[name])
 
-if not DATA_DIR.is_dir():
-    raise RuntimeError(
-        f"Data directory '{DATA_DIR}' does not exist. "
-        "Set the METRO_DATA_DIR environment variable or update config/local.yaml "
-        "with a valid path."
-    )
 
-# Define the three subdirectories (relative to DATA_DIR)
-ALERTS_DIR = DATA_DIR / "RAIL_RT_ALERTS" / "RAIL_RT_ALERTS"
-TRIP_UPDATES_DIR = DATA_DIR / "RAIL_RT_TRIP_UPDATES" / "RAIL_RT_TRIP_UPDATES"
-VEHICLE_POSITIONS_DIR = DATA_DIR / "RAIL_RT_VEHICLE_POSITIONS" / "RAIL_RT_VEHICLE_POSITIONS"
+def __getattr__(name: str) -> Path:
+    """Resolve ``DATA_DIR`` and the three feed subdirectories lazily."""
+    if name == "DATA_DIR":
+        return _data_dir()
+    if name in _SUBDIRS:
+        return _feed_dir(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def _ensure_dir_exists(path: Path) -> None:
@@ -72,17 +93,20 @@ def _ensure_dir_exists(path: Path) -> None:
 
 def list_all_alert_files() -> list[Path]:
     """Return a list of all JSON files under ALERTS_DIR."""
-    _ensure_dir_exists(ALERTS_DIR)
-    return sorted(ALERTS_DIR.glob("*.json"))
+    path = _feed_dir("ALERTS_DIR")
+    _ensure_dir_exists(path)
+    return sorted(path.glob("*.json"))
 
 
 def list_all_trip_update_files() -> list[Path]:
     """Return a list of all JSON files under TRIP_UPDATES_DIR."""
-    _ensure_dir_exists(TRIP_UPDATES_DIR)
-    return sorted(TRIP_UPDATES_DIR.glob("*.json"))
+    path = _feed_dir("TRIP_UPDATES_DIR")
+    _ensure_dir_exists(path)
+    return sorted(path.glob("*.json"))
 
 
 def list_all_vehicle_position_files() -> list[Path]:
     """Return a list of all JSON files under VEHICLE_POSITIONS_DIR."""
-    _ensure_dir_exists(VEHICLE_POSITIONS_DIR)
-    return sorted(VEHICLE_POSITIONS_DIR.glob("*.json"))
+    path = _feed_dir("VEHICLE_POSITIONS_DIR")
+    _ensure_dir_exists(path)
+    return sorted(path.glob("*.json"))
@@ -1,5 +1,19 @@
 """Streaming anomaly detection utilities."""
 
-from .streaming_iforest import IForestConfig, StreamingIForestDetector
+from __future__ import annotations
+
+import importlib
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from .streaming_iforest import IForestConfig, StreamingIForestDetector
 
 __all__ = ["IForestConfig", "StreamingIForestDetector"]
+
+
+def __getattr__(name: str) -> Any:
+    if name not in __all__:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(".streaming_iforest", __name__), name)
+    globals()[name] = value
+    return value
@@ -0,0 +1,178 @@
+"""Anomaly scoring of stored feature snapshots, optionally sharded by service day.
+
+:class:`~.streaming_iforest.StreamingIForestDetector` discards its trees and
+scores window at every Sydney service-day boundary, so each service day is an
+independent scoring job. :func:`backfill` cuts a time range at those
+boundaries and scores the days in separate processes. With a seeded
+:class:`~.streaming_iforest.IForestConfig` every day starts from identical
+trees and the output files and flags match a serial run.
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from itertools import groupby
+from pathlib import Path
+
+from ..features import read_features
+from ..ledger import RunLedger, new_run_id
+from ..metrics import record_parquet_write
+from ..processed_reader import anomaly_scores_path, snapshot_path
+from .model_bank import ModelBank
+from .streaming_iforest import IForestConfig, StreamingIForestDetector
+
+logger = logging.getLogger(__name__)
+
+DROP_FEATURES = ["data_fresh_secs", "dwell_delta_t"]
+
+
+@dataclass
+class BackfillStats:
+    """Summary of a scored range; ``snapshot_means`` holds one mean score per scored snapshot."""
+
+    snapshots: int = 0
+    anomalies: int = 0
+    snapshot_means: list[float] = field(default_factory=list)
+
+    @property
+    def mean_score(self) -> float:
+        """Mean of the per-snapshot mean scores (``0.0`` when none were scored)."""
+        # left to right like the serial accumulator; sum() compensates from Python 3.12
+        total = 0.0
+        for value in self.snapshot_means:
+            total += value
+        return total / self.snapshots if self.snapshots else 0.0
+
+    def merge(self, other: BackfillStats) -> BackfillStats:
+        """Append the statistics of the range following this one."""
+        self.snapshots += other.snapshots
+        self.anomalies += other.anomalies
+        self.snapshot_means.extend(other.snapshot_means)
+        return self
+
+
+def service_day_shards(
+    start_ts: int, end_ts: int, config: IForestConfig | dict | str | Path
+) -> list[tuple[int, int]]:
+    """Split the minutes of ``[start_ts, end_ts)`` into one ``(start, end)`` range per service day."""
+    det = StreamingIForestDetector(config)
+    shards = []
+    for _, minutes in groupby(range(start_ts, end_ts, 60), key=det._service_day):
+        minutes = list(minutes)
+        shards.append((minutes[0], minutes[-1] + 60))
+    return shards
+
+
+def score_range(
+    processed_root: Path,
+    out_root: Path,
+    config: IForestConfig | dict | str | Path,
+    start_ts: int,
+    end_ts: int,
+    model_bank: Path | None = None,
+    pretrain: bool = False,
+    ledger_root: Path | None = None,
+    run_id: str | None = None,
+) -> BackfillStats:
+    """Score the feature snapshots of ``[start_ts, end_ts)`` with one detector and write the scores.
+
+    ``model_bank`` is a :class:`~.model_bank.ModelBank` directory that warm
+    starts each service day. With ``pretrain`` days it cannot seed are
+    pre-trained on the ``warmup_days`` of history in ``processed_root``.
+    With ``ledger_root`` every scored snapshot appends a ``score`` row to the
+    :class:`~metro_disruptions_intelligence.ledger.RunLedger` of ``run_id`` there.
+    """
+    bank = None if model_bank is None else ModelBank(model_bank)
+    det = StreamingIForestDetector(
+        config,
+        drop_features=DROP_FEATURES,
+        model_bank=bank,
+        history_root=processed_root if pretrain else None,
+    )
+    ledger = None if ledger_root is None else RunLedger(ledger_root, run_id)
+    stats = BackfillStats()
+    for ts in range(start_ts, end_ts, 60):
+        in_file = snapshot_path(ts, processed_root)
+        if not in_file.exists():
+            continue
+        start = time.perf_counter()
+        feats = read_features(in_file)
+        out = det.score_and_update(feats)
+        secs = time.perf_counter() - start
+        logger.info("scored %s -> %d rows", in_file, len(out))
+        if out.empty:
+            continue
+        stats.snapshots += 1
+        stats.anomalies += int(out["anomaly_flag"].sum())
+        stats.snapshot_means.append(float(out["anomaly_score"].mean()))
+        out_file = anomaly_scores_path(ts, out_root)
+        out_file.parent.mkdir(parents=True, exist_ok=True)
+        out.to_parquet(out_file, index=False)
+        record_parquet_write(out_file, "anomaly_scores")
+        if ledger is not None:
+            ledger.record(
+                "score",
+                ts,
+                secs,
+                rows_in=len(feats),
+                rows_out=len(out),
+                bytes_written=out_file.stat().st_size,
+            )
+    if ledger is not None:
+        ledger.close()
+    return stats
+
+
+def _score_shard(args: tuple) -> BackfillStats:
+    return score_range(*args)
+
+
+def backfill(
+    processed_root: Path,
+    out_root: Path,
+    config: IForestConfig | dict | str | Path,
+    start_ts: int,
+    end_ts: int,
+    *,
+    workers: int = 1,
+    model_bank: Path | None = None,
+    pretrain: bool = False,
+    ledger_root: Path | None = None,
+) -> BackfillStats:
+    """Score ``[start_ts, end_ts)``, one service day per process when ``workers`` > 1.
+
+    A ``model_bank`` carries state from one service day to the next, so it
+    requires a single worker. Pre-training reads each day's history itself
+    and shards freely. Every worker appends to the run ledger below ``ledger_root``.
+    """
+    run_id = None if ledger_root is None else new_run_id()
+    if workers <= 1:
+        return score_range(
+            processed_root,
+            out_root,
+            config,
+            start_ts,
+            end_ts,
+            model_bank,
+            pretrain,
+            ledger_root,
+            run_id,
+        )
+    if model_bank is not None:
+        raise ValueError("A model bank links consecutive service days; use a single worker")
+    if StreamingIForestDetector(config).config.seed is None:
+        logger.warning("No seed configured: trees differ between days and from a serial run")
+    shards = service_day_shards(start_ts, end_ts, config)
+    logger.info("Scoring %d service days with %d workers", len(shards), workers)
+    stats = BackfillStats()
+    jobs = [
+        (processed_root, out_root, config, lo, hi, None, pretrain, ledger_root, run_id)
+        for lo, hi in shards
+    ]
+    with ProcessPoolExecutor(max_workers=min(workers, len(shards) or 1)) as pool:
+        for shard_stats in pool.map(_score_shard, jobs):
+            stats.merge(shard_stats)
+    return stats
@@ -0,0 +1,96 @@
+"""End-of-day detector snapshots used to warm-start each service day.
+
+:class:`~.streaming_iforest.StreamingIForestDetector` starts every Sydney
+service day with an empty forest, which cannot flag anything until the scores
+window has filled. A :class:`ModelBank` keeps the state of the last service
+day of each day type (``weekday`` or ``weekend``) in the array format of
+:mod:`.model_io`. Shortly before the 03:00 boundary the detector stashes its
+state and the bank rebuilds the forest for the next day's type on a
+background thread, so the reset only swaps in a ready model.
+"""
+
+from __future__ import annotations
+
+import logging
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import date, datetime, time, timedelta
+from pathlib import Path
+
+import numpy as np
+from river import anomaly
+
+from ..time_context import SERVICE_DAY_START_HOUR, sydney_table
+from .model_io import hst_from_arrays, read_model_arrays, write_model_arrays
+
+logger = logging.getLogger(__name__)
+
+DAY_TYPES = ("weekday", "weekend")
+# the next day's model is prepared once a snapshot arrives this close to the boundary
+PREFETCH_SECS = 900
+
+
+def day_type(service_day: date) -> str:
+    """Return ``"weekend"`` for Saturday and Sunday service days, else ``"weekday"``."""
+    return DAY_TYPES[int(service_day.weekday() >= 5)]
+
+
+def next_service_day_start(service_day: date) -> int:
+    """Return the epoch at which the service day after ``service_day`` starts."""
+    start = datetime.combine(
+        service_day + timedelta(days=1), time(SERVICE_DAY_START_HOUR), tzinfo=sydney_table().tz
+    )
+    return int(start.timestamp())
+
+
+class ModelBank:
+    """Detector snapshots keyed by day type, optionally persisted below ``root``."""
+
+    def __init__(self, root: Path | None = None) -> None:
+        """Keep snapshots in memory and, when ``root`` is given, as ``<day_type>.npz`` files."""
+        self.root = None if root is None else Path(root)
+        self._snapshots: dict[str, dict[str, np.ndarray]] = {}
+        self._prepared: dict[str, Future] = {}
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="model-bank")
+
+    def path(self, kind: str) -> Path | None:
+        """Return the file of the ``kind`` snapshot, or ``None`` for an in-memory bank."""
+        return None if self.root is None else self.root / f"{kind}.npz"
+
+    def put(self, kind: str, arrays: dict[str, np.ndarray]) -> None:
+        """Store ``arrays`` from :meth:`StreamingIForestDetector.state_arrays` as the ``kind`` snapshot."""
+        self._snapshots[kind] = arrays
+        self._prepared.pop(kind, None)
+        path = self.path(kind)
+        if path is not None:
+            write_model_arrays(path, arrays)
+        logger.info("Stored %s snapshot in model bank", kind)
+
+    def get(self, kind: str) -> dict[str, np.ndarray] | None:
+        """Return the ``kind`` snapshot, reading it from ``root`` if not in memory."""
+        if kind not in self._snapshots:
+            path = self.path(kind)
+            if path is None or not path.exists():
+                return None
+            self._snapshots[kind] = read_model_arrays(path)
+        return self._snapshots[kind]
+
+    def prepare(self, kind: str) -> None:
+        """Start rebuilding the ``kind`` forest in the background."""
+        if kind in self._prepared:
+            return
+        arrays = self.get(kind)
+        if arrays is not None:
+            self._prepared[kind] = self._executor.submit(hst_from_arrays, arrays)
+
+    def take(self, kind: str) -> tuple[anomaly.HalfSpaceTrees, dict[str, np.ndarray]] | None:
+        """Return a fresh forest and the snapshot arrays for ``kind``, or ``None`` if unknown.
+
+        A forest started by :meth:`prepare` is used when available; otherwise
+        it is rebuilt now. Each forest is handed out once.
+        """
+        arrays = self.get(kind)
+        if arrays is None:
+            return None
+        future = self._prepared.pop(kind, None)
+        hst = future.result() if future is not None else hst_from_arrays(arrays)
+        return hst, arrays
@@ -0,0 +1,207 @@
+"""Array-based persistence for :class:`~.streaming_iforest.StreamingIForestDetector`.
+
+River's Half-Space Trees are complete binary trees of Python node objects, so
+pickling them stores ``n_trees * (2 ** (height + 1) - 1)`` objects and loading
+rebuilds each through the pickle machinery. Here every tree is flattened in
+depth-first order into fixed-shape arrays (split feature code, threshold and
+the two masses) which, together with the scores window, are written to an
+uncompressed ``.npz`` file. :func:`read_model_arrays` maps those members
+straight from disk, so many workers can open the same model file without
+copying it and without executing pickled code.
+"""
+
+from __future__ import annotations
+
+import gc
+import json
+import logging
+import os
+import struct
+import zipfile
+from functools import lru_cache
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+from river import anomaly
+from river.tree.padded import PaddedBranch, PaddedLeaf
+
+logger = logging.getLogger(__name__)
+
+MODEL_FORMAT_VERSION = 1
+# local file header of a zip member: 30 fixed bytes, then the name and extra field
+_ZIP_LOCAL_HEADER = struct.Struct("<4s5H3I2H")
+
+
+def hst_to_arrays(hst: anomaly.HalfSpaceTrees) -> dict[str, np.ndarray]:
+    """Return the state of ``hst`` as flat arrays, one row per tree."""
+    n_nodes = 2 ** (hst.height + 1) - 1
+    features = sorted({str(f) for f in hst.limits})
+    codes = {f: i for i, f in enumerate(features)}
+    shape = (len(hst._tree_nodes), n_nodes)
+    feature = np.full(shape, -1, dtype=np.int16)
+    threshold = np.full(shape, np.nan)
+    l_mass = np.zeros(shape, dtype=np.int64)
+    r_mass = np.zeros(shape, dtype=np.int64)
+    for t, nodes in enumerate(hst._tree_nodes):
+        for i, node in enumerate(nodes):
+            l_mass[t, i] = node.l_mass
+            r_mass[t, i] = node.r_mass
+            if isinstance(node, PaddedBranch):
+                feature[t, i] = codes[str(node.feature)]
+                threshold[t, i] = node.threshold
+    version, internal, gauss_next = hst.rng.getstate()
+    return {
+        "hst_params": np.array(
+            json.dumps({
+                "n_trees": hst.n_trees,
+                "height": hst.height,
+                "window_size": hst.window_size,
+                "seed": hst.seed,
+                "counter": hst.counter,
+                "first_window": hst._first_window,
+                "rng_version": version,
+                "rng_gauss_next": gauss_next,
+            })
+        ),
+        "hst_features": np.array(features, dtype=str),
+        "hst_limits": np.array([hst.limits[f] for f in features], dtype=float).reshape(-1, 2),
+        "hst_rng_state": np.array(internal, dtype=np.int64),
+        "hst_feature": feature,
+        "hst_threshold": threshold,
+        "hst_l_mass": l_mass,
+        "hst_r_mass": r_mass,
+    }
+
+
+@lru_cache(maxsize=8)
+def _levels(height: int) -> tuple[list[int], ...]:
+    """Return the depth-first positions of the nodes of each level, left to right."""
+    levels = [[0]]
+    for level in range(height):
+        step = 2 ** (height - level)
+        levels.append([j for i in levels[-1] for j in (i + 1, i + step)])
+    return tuple(levels)
+
+
+def _build_tree(
+    height: int, features: list[str], feature: list, threshold: list, l_mass: list, r_mass: list
+) -> list:
+    """Rebuild one tree bottom-up, bypassing the node constructors, and return its DFS node list."""
+    nodes: list = [None] * len(feature)
+    levels = _levels(height)
+    below = []
+    for i in levels[-1]:
+        leaf = PaddedLeaf.__new__(PaddedLeaf)
+        leaf.__dict__ = {"r_mass": r_mass[i], "l_mass": l_mass[i]}
+        nodes[i] = leaf
+        below.append(leaf)
+    for positions in reversed(levels[:-1]):
+        current = []
+        for k, i in enumerate(positions):
+            branch = PaddedBranch.__new__(PaddedBranch)
+            branch.__dict__ = {
+                "children": (below[2 * k], below[2 * k + 1]),
+                "feature": features[feature[i]],
+                "threshold": threshold[i],
+                "l_mass": l_mass[i],
+                "r_mass": r_mass[i],
+            }
+            nodes[i] = branch
+            current.append(branch)
+        below = current
+    return nodes
+
+
+def hst_from_arrays(arrays: dict[str, np.ndarray]) -> anomaly.HalfSpaceTrees:
+    """Rebuild the :class:`~river.anomaly.HalfSpaceTrees` stored by :func:`hst_to_arrays`."""
+    params = json.loads(str(arrays["hst_params"]))
+    hst = anomaly.HalfSpaceTrees(
+        n_trees=params["n_trees"],
+        height=params["height"],
+        window_size=params["window_size"],
+        seed=params["seed"],
+    )
+    features = arrays["hst_features"].tolist()
+    hst.limits.update({f: tuple(lim) for f, lim in zip(features, arrays["hst_limits"].tolist())})
+    hst.rng.setstate((
+        params["rng_version"],
+        tuple(arrays["hst_rng_state"].tolist()),
+        params["rng_gauss_next"],
+    ))
+    hst.counter = params["counter"]
+    hst._first_window = params["first_window"]
+    columns = [arrays[f"hst_{k}"] for k in ("feature", "threshold", "l_mass", "r_mass")]
+    # the nodes hold no cycles, and collections triggered by allocating them dominate the load
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for rows in zip(*columns):
+            nodes = _build_tree(hst.height, features, *(row.tolist() for row in rows))
+            hst.trees.append(nodes[0])
+            hst._tree_nodes.append(nodes)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    return hst
+
+
+def write_model_arrays(path: Path, arrays: dict[str, Any]) -> Path:
+    """Atomically write ``arrays`` plus the format version to the uncompressed ``.npz`` ``path``."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as fh:
+        np.savez(fh, version=np.array(MODEL_FORMAT_VERSION), **arrays)
+    os.replace(tmp, path)
+    return path
+
+
+def _member_offset(fh, info: zipfile.ZipInfo) -> int:
+    fh.seek(info.header_offset)
+    header = _ZIP_LOCAL_HEADER.unpack(fh.read(_ZIP_LOCAL_HEADER.size))
+    name_len, extra_len = header[-2:]
+    return info.header_offset + _ZIP_LOCAL_HEADER.size + name_len + extra_len
+
+
+def read_model_arrays(path: Path, *, mmap: bool = True) -> dict[str, np.ndarray]:
+    """Return the arrays written by :func:`write_model_arrays`.
+
+    With ``mmap`` the non-empty arrays are read-only memory maps into
+    ``path``; the operating system shares their pages between processes.
+    Raises :class:`ValueError` for files of another format version.
+    """
+    arrays: dict[str, np.ndarray] = {}
+    with zipfile.ZipFile(path) as zf, open(path, "rb") as fh:
+        for info in zf.infolist():
+            name = info.filename.removesuffix(".npy")
+            if not mmap or info.compress_type != zipfile.ZIP_STORED:
+                arrays[name] = np.lib.format.read_array(zf.open(info), allow_pickle=False)
+                continue
+            fh.seek(_member_offset(fh, info))
+            version = np.lib.format.read_magic(fh)
+            if version == (1, 0):
+                shape, fortran, dtype = np.lib.format.read_array_header_1_0(fh)
+            else:
+                shape, fortran, dtype = np.lib.format.read_array_header_2_0(fh)
+            if dtype.hasobject:
+                raise ValueError(f"{path} stores Python objects in {name}")
+            if not shape or 0 in shape:
+                arrays[name] = np.lib.format.read_array(zf.open(info), allow_pickle=False)
+                continue
+            arrays[name] = np.memmap(
+                path,
+                dtype=dtype,
+                mode="r",
+                shape=shape,
+                order="F" if fortran else "C",
+                offset=fh.tell(),
+            )
+    if int(arrays.get("version", -1)) != MODEL_FORMAT_VERSION:
+        raise ValueError(f"Unsupported model format version {int(arrays.get('version', -1))}")
+    return arrays
+
+
+def is_model_file(path: Path) -> bool:
+    """Return whether ``path`` is a zip archive as written by :func:`write_model_arrays`."""
+    return zipfile.is_zipfile(path)
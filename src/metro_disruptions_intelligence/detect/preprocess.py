@@ -0,0 +1,139 @@
+"""Compiled preprocessing of feature snapshots for :class:`~.streaming_iforest.StreamingIForestDetector`.
+
+Every minute frame of a run has the same columns and dtypes, so the work of
+sanitising a snapshot is split in two. :class:`MinutePlan` resolves the
+schema once: column positions, the features, the station filter on the
+``stop_id`` codes and the fill value. :meth:`MinutePlan.apply` then turns a
+frame into its kept keys and one contiguous ``float32`` feature matrix
+without copying the frame or walking its rows. :class:`OnlineMinMaxScaler`
+optionally scales that matrix with running per-feature bounds.
+"""
+
+from __future__ import annotations
+
+import logging
+from collections.abc import Iterable
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# identify a snapshot row rather than describe it
+KEY_COLUMNS = ("snapshot_timestamp", "stop_id", "direction_id", "local_dt")
+FILL_VALUE = 0.0
+
+
+def _is_feature_dtype(dtype) -> bool:
+    return pd.api.types.is_numeric_dtype(dtype) or pd.api.types.is_bool_dtype(dtype)
+
+
+class MinutePlan:
+    """Column positions and filters resolved from the schema of a feature snapshot."""
+
+    def __init__(
+        self,
+        df: pd.DataFrame,
+        station_ids: Iterable[str],
+        drop_features: Iterable[str] = (),
+        feature_cols: list[str] | None = None,
+    ) -> None:
+        """Compile the plan for frames with the columns and dtypes of ``df``.
+
+        Without ``feature_cols`` every numeric or boolean column other than
+        the keys and ``drop_features`` is a feature.
+        """
+        self.columns = tuple(df.columns)
+        self.dtypes = tuple(df.dtypes)
+        drop = set(drop_features)
+        if feature_cols is None:
+            feature_cols = [
+                c
+                for c, dtype in zip(self.columns, self.dtypes)
+                if c not in KEY_COLUMNS and c not in drop and _is_feature_dtype(dtype)
+            ]
+        self.feature_cols = list(feature_cols)
+        position = {c: i for i, c in enumerate(self.columns)}
+        missing = [c for c in self.feature_cols if c not in position]
+        if missing:
+            raise KeyError(f"Snapshot lacks feature columns {missing}")
+        # the all-zero filter looks at numeric columns other than the dropped features
+        mask_cols = [
+            c
+            for c, dtype in zip(self.columns, self.dtypes)
+            if c not in drop
+            and pd.api.types.is_numeric_dtype(dtype)
+            and not pd.api.types.is_bool_dtype(dtype)
+        ]
+        used = list(dict.fromkeys(self.feature_cols + mask_cols))
+        self._positions = [position[c] for c in used]
+        self._feature_idx = np.array([used.index(c) for c in self.feature_cols], dtype=np.intp)
+        self._mask_idx = np.array([used.index(c) for c in mask_cols], dtype=np.intp)
+        self._stop_pos = position["stop_id"]
+        self._direction_pos = position["direction_id"]
+        self.stations = np.array(sorted({str(s) for s in station_ids}), dtype=object)
+        self._categories: pd.Index | None = None
+        self._allowed = np.zeros(1, dtype=bool)
+
+    def matches(self, df: pd.DataFrame) -> bool:
+        """Return whether ``df`` has the schema the plan was compiled for."""
+        return tuple(df.columns) == self.columns and tuple(df.dtypes) == self.dtypes
+
+    def _station_mask(self, stop_ids: pd.Series) -> np.ndarray:
+        """Return which rows belong to the stations, testing each distinct ``stop_id`` once."""
+        if isinstance(stop_ids.dtype, pd.CategoricalDtype):
+            codes = stop_ids.cat.codes.to_numpy()
+            categories = stop_ids.cat.categories
+        else:
+            codes, categories = pd.factorize(stop_ids)
+        if self._categories is None or not categories.equals(self._categories):
+            allowed = np.isin(categories.astype(str).to_numpy(dtype=object), self.stations)
+            # missing stop ids have code -1 and pick the trailing False
+            self._allowed = np.append(allowed, False)
+            self._categories = categories
+        return self._allowed[codes]
+
+    def apply(self, df: pd.DataFrame) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Return the ``stop_id`` and ``direction_id`` of the kept rows and their feature matrix.
+
+        Rows of other stations and rows whose numeric columns are all zero
+        after filling missing values are dropped.
+        """
+        keep = self._station_mask(df.iloc[:, self._stop_pos])
+        values = df.iloc[:, self._positions].to_numpy(dtype=np.float64, na_value=np.nan)[keep]
+        np.nan_to_num(values, copy=False, nan=FILL_VALUE, posinf=np.inf, neginf=-np.inf)
+        nonzero = np.abs(values[:, self._mask_idx]).sum(axis=1) != 0
+        rows = np.flatnonzero(keep)[nonzero]
+        directions = df.iloc[:, self._direction_pos].fillna(FILL_VALUE).to_numpy()[rows]
+        X = np.ascontiguousarray(values[np.ix_(nonzero, self._feature_idx)], dtype=np.float32)
+        return df.iloc[:, self._stop_pos].to_numpy()[rows], directions, X
+
+
+class OnlineMinMaxScaler:
+    """Per-feature running minimum and maximum, updated one block of rows at a time."""
+
+    def __init__(self, lo: np.ndarray | None = None, hi: np.ndarray | None = None) -> None:
+        """Start from the bounds ``lo`` and ``hi``, or from the first block learned."""
+        self.min = None if lo is None else np.asarray(lo, dtype=np.float32).copy()
+        self.max = None if hi is None else np.asarray(hi, dtype=np.float32).copy()
+
+    def learn(self, X: np.ndarray) -> None:
+        """Widen the bounds to cover the rows of ``X``."""
+        if not len(X):
+            return
+        if self.min is None:
+            self.min, self.max = X.min(axis=0), X.max(axis=0)
+        else:
+            np.minimum(self.min, X.min(axis=0), out=self.min)
+            np.maximum(self.max, X.max(axis=0), out=self.max)
+
+    def transform(self, X: np.ndarray) -> np.ndarray:
+        """Scale ``X`` in place to ``[0, 1]``; features without range become ``0``."""
+        if self.min is None:
+            X[:] = 0
+            return X
+        span = self.max - self.min
+        X -= self.min
+        X /= np.where(span > 0, span, 1)
+        X[:, span <= 0] = 0
+        return X
@@ -0,0 +1,157 @@
+"""Bulk pre-training of Half-Space Trees on a block of historical rows.
+
+Replaying history through :meth:`~river.anomaly.HalfSpaceTrees.learn_one`
+walks every tree in Python once per row. The state river keeps only depends
+on which rows fell into the last complete window (``r_mass``) and into the
+trailing partial one (``l_mass``), and a row's score only on the window before
+its own. :func:`pretrain_forest` therefore routes whole blocks of rows through
+each tree with NumPy, one level at a time, counts node visits with
+:func:`numpy.bincount` and touches at most the last three windows of the
+history.
+"""
+
+from __future__ import annotations
+
+import gc
+import logging
+
+import numpy as np
+from river import anomaly
+from river.tree.padded import make_padded_tree
+
+from .model_io import hst_to_arrays
+
+logger = logging.getLogger(__name__)
+
+
+def _grow_trees(hst: anomaly.HalfSpaceTrees, feature_names: list[str]) -> None:
+    """Grow the trees of ``hst`` exactly as its first ``learn_one`` would."""
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        hst.trees = [
+            make_padded_tree(
+                limits={i: hst.limits[i] for i in sorted(feature_names)},
+                height=hst.height,
+                padding=0.15,
+                rng=hst.rng,
+                r_mass=0,
+                l_mass=0,
+            )
+            for _ in range(hst.n_trees)
+        ]
+        hst._tree_nodes = [list(t.iter_dfs()) for t in hst.trees]
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+
+def _route(X: np.ndarray, column: np.ndarray, threshold: np.ndarray, height: int) -> np.ndarray:
+    """Return the depth-first node index of every row of ``X`` at each level of one tree."""
+    rows = np.arange(len(X))
+    path = np.empty((height + 1, len(X)), dtype=np.int64)
+    node = np.zeros(len(X), dtype=np.int64)
+    for level in range(height):
+        path[level] = node
+        left = X[rows, column[node]] < threshold[node]
+        node = np.where(left, node + 1, node + 2 ** (height - level))
+    path[height] = node
+    return path
+
+
+def _score(path: np.ndarray, r_mass: np.ndarray, size_limit: float) -> np.ndarray:
+    """Return river's unnormalised score of each routed row against the masses ``r_mass``."""
+    score = np.zeros(path.shape[1])
+    active = np.ones(path.shape[1], dtype=bool)
+    for level, nodes in enumerate(path):
+        r = r_mass[nodes]
+        score += np.where(active, r << level, 0)
+        active &= r >= size_limit
+    return score
+
+
+def pretrain_forest(
+    hst: anomaly.HalfSpaceTrees,
+    X: np.ndarray,
+    feature_names: list[str],
+    *,
+    subsample_size: int | None = None,
+    rng: np.random.Generator | None = None,
+) -> np.ndarray:
+    """Train the untrained ``hst`` on the rows of ``X`` and return the scores of the last window.
+
+    The trees are grown from the random state of ``hst`` and the masses,
+    window counter and the ``score_one`` values of the last ``window_size``
+    rows are those of replaying ``score_one``/``learn_one`` row by row. With a
+    ``subsample_size`` below the window size, the profile of each complete
+    window is instead estimated from that many of its rows drawn with ``rng``.
+    """
+    if hst.trees:
+        raise ValueError("Bulk pre-training needs an untrained forest")
+    n_rows, window = len(X), hst.window_size
+    if not n_rows:
+        return np.empty(0)
+    _grow_trees(hst, feature_names)
+    arrays = hst_to_arrays(hst)
+    lookup = np.array([feature_names.index(f) for f in arrays["hst_features"].tolist()])
+    columns = lookup[np.maximum(arrays["hst_feature"], 0)]
+    thresholds = arrays["hst_threshold"]
+    n_nodes = thresholds.shape[1]
+
+    n_windows = n_rows // window
+    score_lo = n_rows - min(n_rows, window)
+    first = max(score_lo // window - 1, 0)
+    # rows of the history before ``first`` shape neither the final masses nor the kept scores
+    X = np.asarray(X, dtype=float)[first * window :]
+    subsample = subsample_size is not None and subsample_size < window
+    if subsample:
+        rng = rng if rng is not None else np.random.default_rng()
+        samples = {
+            j: (j - first) * window + np.sort(rng.choice(window, subsample_size, replace=False))
+            for j in range(first, n_windows)
+        }
+    else:
+        samples = {
+            j: slice((j - first) * window, (j - first + 1) * window)
+            for j in range(first, n_windows)
+        }
+    segments = [
+        (j, max(j * window, score_lo), min((j + 1) * window, n_rows))
+        for j in range(max(score_lo // window, 1), n_windows + 1)
+        if max(j * window, score_lo) < min((j + 1) * window, n_rows)
+    ]
+
+    size_limit = 0.1 * window
+    totals = np.zeros(n_rows - score_lo)
+    l_mass = np.zeros((hst.n_trees, n_nodes), dtype=np.int64)
+    r_mass = np.zeros((hst.n_trees, n_nodes), dtype=np.int64)
+    for t in range(hst.n_trees):
+        path = _route(X, columns[t], thresholds[t], hst.height)
+        profiles = {}
+        for j, rows in samples.items():
+            counts = np.bincount(path[:, rows].ravel(), minlength=n_nodes)
+            if subsample:
+                counts = np.rint(counts * (window / subsample_size)).astype(np.int64)
+            profiles[j] = counts
+        if n_windows:
+            r_mass[t] = profiles[n_windows - 1]
+        tail = path[:, (n_windows - first) * window :]
+        l_mass[t] = np.bincount(tail.ravel(), minlength=n_nodes)
+        for j, lo, hi in segments:
+            offset = first * window
+            totals[lo - score_lo : hi - score_lo] += _score(
+                path[:, lo - offset : hi - offset], profiles[j - 1], size_limit
+            )
+
+    for nodes, l_row, r_row in zip(hst._tree_nodes, l_mass.tolist(), r_mass.tolist()):
+        for node, left, right in zip(nodes, l_row, r_row):
+            node.l_mass = left
+            node.r_mass = right
+    hst.counter = n_rows % window
+    hst._first_window = n_windows == 0
+
+    scores = 1 - totals / hst._max_score
+    # rows of the first window are scored before any window completed
+    scores[: max(window - score_lo, 0)] = 0.0
+    logger.info("Pre-trained %d trees on %d rows", hst.n_trees, n_rows)
+    return scores
@@ -5,8 +5,10 @@ from __future__ import annotations
 import json
 import logging
 import pickle
+import time
 from collections import deque
 from dataclasses import dataclass
+from datetime import date, timedelta
 from pathlib import Path
 from typing import Any
 
@@ -14,7 +16,19 @@ import numpy as np
 import pandas as pd
 from river import anomaly, compose
 
-from ..utils_gtfsrt import sydney_time
+from ..metrics import REGISTRY
+from ..processed_reader import read_feature_range
+from ..time_context import sydney_context
+from .model_bank import PREFETCH_SECS, ModelBank, day_type, next_service_day_start
+from .model_io import (
+    hst_from_arrays,
+    hst_to_arrays,
+    is_model_file,
+    read_model_arrays,
+    write_model_arrays,
+)
+from .preprocess import MinutePlan, OnlineMinMaxScaler
+from .pretrain import pretrain_forest
 from .shap_utils import top_n_tree_shap
 
 logger = logging.getLogger(__name__)
@@ -45,6 +59,16 @@ DEFAULT_STATIONS = {
 }
 
 
+def _record_scoring(n_rows: int, n_anomalies: int, elapsed: float) -> None:
+    REGISTRY.histogram("mdi_score_seconds", "Time to score and learn one minute").observe(elapsed)
+    REGISTRY.counter("mdi_scored_rows_total", "Rows scored by the detector").inc(n_rows)
+    REGISTRY.counter("mdi_anomalies_total", "Rows flagged as anomalous").inc(n_anomalies)
+    if elapsed > 0:
+        REGISTRY.gauge(
+            "mdi_scoring_rows_per_second", "Scoring throughput of the latest minute"
+        ).set(n_rows / elapsed)
+
+
 @dataclass
 class IForestConfig:
     """Hyper-parameters for :class:`StreamingIForestDetector`."""
@@ -55,6 +79,8 @@ class IForestConfig:
     window_size: int = 10_000
     threshold_quantile: float = 0.97
     warmup_days: int = 4
+    seed: int | None = None
+    scale: bool = False
 
 
 class StreamingIForestDetector:
@@ -66,8 +92,16 @@ class StreamingIForestDetector:
         *,
         station_ids: list[str] | None = None,
         drop_features: list[str] | None = None,
+        model_bank: ModelBank | None = None,
+        history_root: Path | None = None,
     ) -> None:
-        """Initialise the detector with ``config``."""
+        """Initialise the detector with ``config``.
+
+        With a ``model_bank`` each service day starts from the stored state
+        of the last day of the same type instead of an empty forest. Days the
+        bank cannot seed are pre-trained on the ``warmup_days`` of feature
+        history below ``history_root``.
+        """
         if isinstance(config, (str, Path)):
             cfg_dict = self._load_yaml(Path(config))
             self.config = IForestConfig(**cfg_dict)
@@ -84,6 +118,10 @@ class StreamingIForestDetector:
         self.n_obs = 0
         self.current_service_day: Any = None
         self.feature_cols: list[str] | None = None
+        self._plan: MinutePlan | None = None
+        self.model_bank = model_bank
+        self.history_root = None if history_root is None else Path(history_root)
+        self._bank_prepared = False
 
     @staticmethod
     def _load_yaml(path: Path) -> dict:
@@ -93,32 +131,64 @@ class StreamingIForestDetector:
             return yaml.safe_load(f)
 
     def _build_pipeline(self) -> None:
+        # scaling happens on the feature matrix before the pipeline, see _transform
+        self.scaler = OnlineMinMaxScaler() if self.config.scale else None
         self.pipeline = compose.Pipeline(
-            # ("scale", preprocessing.MinMaxScaler()),
             anomaly.HalfSpaceTrees(
                 n_trees=self.config.n_trees,
                 height=self.config.height,
                 window_size=self.config.window_size,
+                seed=self.config.seed,
             )
         )
 
     # ------------------------------------------------------------------
     def _service_day(self, ts: int) -> Any:
-        dt = sydney_time(ts)
-        if dt.hour < 3:
-            dt -= pd.Timedelta(days=1)
-        return dt.date()
+        return sydney_context(ts).service_day
 
     def _maybe_reset(self, ts: int) -> None:
         sd = self._service_day(ts)
         if self.current_service_day is None:
             self.current_service_day = sd
+            self._warm_start(sd)
         elif sd != self.current_service_day:
             logger.info("Service day boundary reached – resetting state")
+            if self.model_bank is not None and not self._bank_prepared:
+                self._stash_day()
             self._build_pipeline()
             self.scores.clear()
             self.n_obs = 0
             self.current_service_day = sd
+            self._warm_start(sd)
+        elif (
+            self.model_bank is not None
+            and not self._bank_prepared
+            and ts >= next_service_day_start(sd) - PREFETCH_SECS
+        ):
+            self._stash_day()
+            self.model_bank.prepare(day_type(sd + timedelta(days=1)))
+
+    def _stash_day(self) -> None:
+        """Store the state of the current service day in the model bank."""
+        self._bank_prepared = True
+        if self.n_obs:
+            self.model_bank.put(day_type(self.current_service_day), self.state_arrays())
+
+    def _warm_start(self, service_day: date) -> None:
+        """Seed the forest and scores window of ``service_day``.
+
+        A snapshot from the model bank is preferred; without one the forest is
+        pre-trained on the history below ``history_root``, if set.
+        """
+        self._bank_prepared = False
+        seed = None if self.model_bank is None else self.model_bank.take(day_type(service_day))
+        if seed is not None:
+            self._restore(*seed)
+            logger.info(
+                "Warm-started %s from the %s model bank", service_day, day_type(service_day)
+            )
+        elif self.history_root is not None:
+            self._pretrain_day(service_day)
 
     # ------------------------------------------------------------------
     def score_and_update(self, df_minute: pd.DataFrame, *, explain: bool = False) -> pd.DataFrame:
@@ -135,17 +205,12 @@ class StreamingIForestDetector:
                 ]
             )
 
+        start = time.perf_counter()
         ts = int(df_minute["snapshot_timestamp"].iloc[0])
         self._maybe_reset(ts)
 
-        df = df_minute.copy()
-        df = df[df["stop_id"].astype(str).isin(self.station_ids)]
-        df = df.drop(columns=[c for c in self.drop_features if c in df.columns], errors="ignore")
-        df.fillna(0, inplace=True)
-        numeric_cols = df.select_dtypes(include=[np.number]).columns.tolist()
-        df = df[(df[numeric_cols].abs().sum(axis=1) != 0)]
-
-        if df.empty:
+        stop_ids, direction_ids, X = self._transform(df_minute)
+        if not len(X):
             return pd.DataFrame(
                 columns=[
                     "ts",
@@ -157,19 +222,9 @@ class StreamingIForestDetector:
                 ]
             )
 
-        if self.feature_cols is None:
-            exclude = {
-                "snapshot_timestamp",
-                "stop_id",
-                "direction_id",
-                "local_dt",
-                *self.drop_features,
-            }
-            self.feature_cols = [c for c in df.columns if c not in exclude]
-
         rows = []
-        for _, row in df.iterrows():
-            x = {k: row[k] for k in self.feature_cols}
+        for i, values in enumerate(X.tolist()):
+            x = dict(zip(self.feature_cols, values))
             score = float(self.pipeline.score_one(x))
             self.scores.append(score)
             self.n_obs += 1
@@ -186,21 +241,130 @@ class StreamingIForestDetector:
 
             rows.append({
                 "ts": ts,
-                "stop_id": row["stop_id"],
-                "direction_id": row["direction_id"],
+                "stop_id": stop_ids[i],
+                "direction_id": direction_ids[i],
                 "anomaly_score": score,
                 "anomaly_flag": flag if self.n_obs >= self.config.window_size else 0,
                 "shap_top3_json": shap_json,
             })
             self.pipeline.learn_one(x)
+        _record_scoring(
+            len(rows), sum(r["anomaly_flag"] for r in rows), time.perf_counter() - start
+        )
         return pd.DataFrame(rows)
 
+    def _transform(self, df: pd.DataFrame) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Return the keys and (scaled) ``float32`` features of the rows of ``df`` to learn from.
+
+        The :class:`~.preprocess.MinutePlan` is compiled again only when the
+        schema of ``df`` differs from the previous frame's.
+        """
+        plan = self._plan
+        if plan is None or not plan.matches(df) or plan.feature_cols != self.feature_cols:
+            plan = MinutePlan(df, self.station_ids, self.drop_features, self.feature_cols)
+            self._plan = plan
+            self.feature_cols = plan.feature_cols
+            logger.debug("Compiled preprocessing plan for %d features", len(plan.feature_cols))
+        stop_ids, direction_ids, X = plan.apply(df)
+        if self.scaler is not None and len(X):
+            self.scaler.learn(X)
+            self.scaler.transform(X)
+        return stop_ids, direction_ids, X
+
+    def pretrain(self, history: pd.DataFrame, *, rng: np.random.Generator | None = None) -> int:
+        """Replace the forest and scores window with ones trained on ``history`` in bulk.
+
+        ``history`` holds feature snapshots in arrival order, for instance from
+        :func:`~metro_disruptions_intelligence.processed_reader.read_feature_range`,
+        and is filtered like the input of :meth:`score_and_update`. Each window's
+        mass profile is estimated from ``subsample_size`` of its rows drawn with
+        ``rng``. Returns the number of rows learned.
+        """
+        self._build_pipeline()
+        self.scores.clear()
+        self.n_obs = 0
+        if not len(history):
+            return 0
+        _, _, X = self._transform(history)
+        if not len(X):
+            return 0
+        scores = pretrain_forest(
+            self.pipeline[-1],
+            X,
+            self.feature_cols,
+            subsample_size=self.config.subsample_size,
+            rng=rng,
+        )
+        self.scores.extend(scores.tolist())
+        self.n_obs = len(X)
+        return self.n_obs
+
+    def _pretrain_day(self, service_day: date) -> None:
+        """Pre-train on the ``warmup_days`` service days before ``service_day``."""
+        end = next_service_day_start(service_day - timedelta(days=1))
+        start = next_service_day_start(service_day - timedelta(days=self.config.warmup_days + 1))
+        history = read_feature_range(self.history_root, start, end)
+        seed = None if self.config.seed is None else [self.config.seed, service_day.toordinal()]
+        n_rows = self.pretrain(history, rng=np.random.default_rng(seed))
+        logger.info(
+            "Pre-trained %s on %d rows from %d warm-up days",
+            service_day,
+            n_rows,
+            self.config.warmup_days,
+        )
+
     # ------------------------------------------------------------------
+    def state_arrays(self) -> dict[str, np.ndarray]:
+        """Return the detector state in the array format of :mod:`.model_io`."""
+        meta = {
+            "config": self.config.__dict__,
+            "n_obs": self.n_obs,
+            "current_service_day": (
+                None if self.current_service_day is None else self.current_service_day.isoformat()
+            ),
+            "feature_cols": self.feature_cols,
+            "station_ids": sorted(self.station_ids) if self.station_ids else None,
+            "drop_features": sorted(self.drop_features),
+        }
+        arrays = {
+            "meta": np.array(json.dumps(meta)),
+            "scores": np.array(self.scores, dtype=float),
+            **hst_to_arrays(self.pipeline[-1]),
+        }
+        if self.scaler is not None and self.scaler.min is not None:
+            arrays["scaler_min"] = self.scaler.min
+            arrays["scaler_max"] = self.scaler.max
+        return arrays
+
+    def _restore(self, hst: anomaly.HalfSpaceTrees, arrays: dict[str, np.ndarray]) -> None:
+        """Adopt the forest ``hst`` with the scores window and counts stored in ``arrays``."""
+        meta = json.loads(str(arrays["meta"]))
+        self.pipeline = compose.Pipeline(hst)
+        self.scores = deque(arrays["scores"].tolist(), maxlen=self.config.window_size)
+        self.n_obs = meta["n_obs"]
+        if self.config.scale:
+            self.scaler = OnlineMinMaxScaler(arrays.get("scaler_min"), arrays.get("scaler_max"))
+        if self.feature_cols is None:
+            self.feature_cols = meta["feature_cols"]
+
     def save(self, path: str | Path) -> None:
-        """Persist the detector to ``path``."""
+        """Persist the detector to ``path``.
+
+        The trees and the scores window are written as arrays in the versioned
+        format of :mod:`.model_io`. Paths ending in ``.pkl`` or ``.pickle``
+        keep the legacy pickle of the whole pipeline.
+        """
+        path = Path(path)
+        if path.suffix in {".pkl", ".pickle"}:
+            self._save_pickle(path)
+            return
+        write_model_arrays(path, self.state_arrays())
+
+    def _save_pickle(self, path: Path) -> None:
         state = {
             "config": self.config.__dict__,
             "pipeline": self.pipeline,
+            "scaler": self.scaler,
             "scores": list(self.scores),
             "n_obs": self.n_obs,
             "current_service_day": self.current_service_day,
@@ -212,8 +376,27 @@ class StreamingIForestDetector:
             pickle.dump(state, f)
 
     @classmethod
-    def load(cls, path: str | Path) -> StreamingIForestDetector:
-        """Load a persisted detector from ``path``."""
+    def load(cls, path: str | Path, *, mmap: bool = True) -> StreamingIForestDetector:
+        """Load a detector written by :meth:`save`.
+
+        Array models are memory-mapped unless ``mmap`` is false; legacy pickle
+        files are recognised by their content and unpickled.
+        """
+        if not is_model_file(Path(path)):
+            return cls._load_pickle(Path(path))
+        arrays = read_model_arrays(Path(path), mmap=mmap)
+        meta = json.loads(str(arrays["meta"]))
+        obj = cls(
+            meta["config"], station_ids=meta["station_ids"], drop_features=meta["drop_features"]
+        )
+        obj._restore(hst_from_arrays(arrays), arrays)
+        day = meta["current_service_day"]
+        obj.current_service_day = None if day is None else date.fromisoformat(day)
+        obj.feature_cols = meta["feature_cols"]
+        return obj
+
+    @classmethod
+    def _load_pickle(cls, path: Path) -> StreamingIForestDetector:
         with open(path, "rb") as f:
             state = pickle.load(f)
         obj = cls(
@@ -222,6 +405,7 @@ class StreamingIForestDetector:
             drop_features=state.get("drop_features"),
         )
         obj.pipeline = state["pipeline"]
+        obj.scaler = state.get("scaler", obj.scaler)
         obj.scores = deque(state["scores"], maxlen=obj.config.window_size)
         obj.n_obs = state["n_obs"]
         obj.current_service_day = state["current_service_day"]
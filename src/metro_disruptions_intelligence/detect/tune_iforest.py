@@ -14,6 +14,7 @@ import pandas as pd
 import yaml
 
 from ..evaluation import evaluate_scores
+from ..features import read_features
 from ..processed_reader import snapshot_path
 from .streaming_iforest import StreamingIForestDetector
 
@@ -32,7 +33,10 @@ def _snapshot_path(root: Path, ts: int) -> Path:
 def _score_range(
     root: Path, config: dict | str | Path, start: datetime, end: datetime
 ) -> pd.DataFrame:
-    det = StreamingIForestDetector(config, drop_features=["data_fresh_secs", "dwell_delta_t"])
+    # each day is pre-trained on the history before it, so warmup_days and subsample_size matter
+    det = StreamingIForestDetector(
+        config, drop_features=["data_fresh_secs", "dwell_delta_t"], history_root=root
+    )
     start_ts = int(start.timestamp())
     end_ts = int(end.timestamp())
     rows: list[pd.DataFrame] = []
@@ -40,7 +44,7 @@ def _score_range(
         path = _snapshot_path(root, ts)
         if not path.exists():
             continue
-        df = pd.read_parquet(path)
+        df = read_features(path)
         out = det.score_and_update(df)
         logger.info("processed %s -> %d rows", path, len(out))
         if not out.empty:
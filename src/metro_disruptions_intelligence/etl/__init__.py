@@ -1,9 +1,25 @@
 """ETL utilities for metro_disruptions_intelligence."""
 
-from .static_ingest import ingest_static_gtfs
-from .ingest_rt import ingest_all_rt, union_all_feeds
-from .replay_stream import replay_stream
-from .fetch_static_v2 import download_and_extract
+from __future__ import annotations
+
+import importlib
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from .fetch_static_v2 import download_and_extract
+    from .ingest_rt import ingest_all_rt, union_all_feeds
+    from .replay_stream import replay_stream
+    from .synthetic import generate_synthetic_feeds
+    from .static_ingest import ingest_static_gtfs
+
+_LAZY = {
+    "ingest_static_gtfs": ".static_ingest",
+    "ingest_all_rt": ".ingest_rt",
+    "union_all_feeds": ".ingest_rt",
+    "replay_stream": ".replay_stream",
+    "download_and_extract": ".fetch_static_v2",
+    "generate_synthetic_feeds": ".synthetic",
+}
 
 __all__ = [
     "ingest_static_gtfs",
@@ -11,4 +27,13 @@ __all__ = [
     "union_all_feeds",
     "replay_stream",
     "download_and_extract",
+    "generate_synthetic_feeds",
 ]
+
+
+def __getattr__(name: str) -> Any:
+    if name not in _LAZY:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_LAZY[name], __name__), name)
+    globals()[name] = value
+    return value
@@ -1,8 +1,10 @@
 from __future__ import annotations
 
 import argparse
+import json
 import logging
 import os
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date, datetime
 from pathlib import Path
 from typing import Iterable
@@ -14,11 +16,76 @@ import shutil
 
 
 API_ROOT = "https://api.transport.nsw.gov.au/v2/gtfs/schedule"
+# members at least this large (stop_times.txt, shapes.txt) are extracted in parallel
+LARGE_MEMBER_BYTES = 8 * 1024 * 1024
 
 
-def _stream_download(url: str, headers: dict[str, str], dest: Path) -> None:
-    """Download ``url`` to ``dest`` streaming in 1MB chunks."""
+def _validators_path(path: Path) -> Path:
+    """Return the sidecar storing the ``ETag``/``Last-Modified`` of ``path``."""
+    return path.with_name(path.name + ".http.json")
+
+
+def _read_validators(path: Path) -> dict[str, str]:
+    try:
+        return json.loads(_validators_path(path).read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_validators(path: Path, headers: dict[str, str]) -> dict[str, str]:
+    validators = {
+        "etag": headers.get("ETag", ""),
+        "last_modified": headers.get("Last-Modified", ""),
+    }
+    _validators_path(path).write_text(json.dumps(validators))
+    return validators
+
+
+def _stream_download(
+    url: str, headers: dict[str, str], dest: Path, validators: dict[str, str] | None = None
+) -> bool:
+    """Download ``url`` to ``dest`` streaming in 1MB chunks.
+
+    Data is written to ``dest`` with a ``.part`` suffix first. When such a
+    file is left over from an interrupted download, only the remaining bytes
+    are requested with an HTTP ``Range`` header; ``If-Range`` makes the server
+    send the whole file instead if the feed changed in the meantime. A partial
+    file without a stored validator cannot be checked this way and is
+    downloaded again. The finished file must be a readable zip before it
+    replaces ``dest``.
+    ``validators`` of an earlier download are sent as
+    ``If-None-Match``/``If-Modified-Since``. The validators of the new file
+    are stored in a sidecar next to ``dest``.
+
+    Returns ``False`` when the server answers ``304 Not Modified``.
+    """
+    part = dest.with_name(dest.name + ".part")
+    headers = dict(headers)
+    offset = part.stat().st_size if part.exists() else 0
+    partial = _read_validators(part) if offset else {}
+    if offset and not (partial.get("etag") or partial.get("last_modified")):
+        logging.info("Discarding partial download %s without validators", part)
+        part.unlink()
+        offset = 0
+    if offset:
+        headers["Range"] = f"bytes={offset}-"
+        headers["If-Range"] = partial.get("etag") or partial["last_modified"]
+    elif validators:
+        if validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified"):
+            headers["If-Modified-Since"] = validators["last_modified"]
+
     with requests.get(url, headers=headers, stream=True) as r:
+        if r.status_code == 304:
+            return False
+        if r.status_code == 416:
+            # the partial file is not a prefix of the current feed
+            logging.info("Discarding partial download %s", part)
+            part.unlink()
+            for key in ("Range", "If-Range"):
+                headers.pop(key, None)
+            return _stream_download(url, headers, dest, validators)
         if r.status_code == 404:
             print("operator slug not found")
             raise SystemExit(1)
@@ -32,39 +99,93 @@ def _stream_download(url: str, headers: dict[str, str], dest: Path) -> None:
         if not ctype.startswith("application/zip"):
             print("unexpected content type")
             raise SystemExit(1)
-        total = int(r.headers.get("Content-Length", 0))
-        with open(dest, "wb") as fh:
+        resumed = offset > 0 and r.status_code == 206
+        if offset:
+            logging.info(
+                "%s download of %s at byte %d", "Resuming" if resumed else "Restarting", url, offset
+            )
+        if not resumed:
+            offset = 0
+        _write_validators(part, r.headers)
+        total = int(r.headers.get("Content-Length", 0)) + offset
+        with open(part, "ab" if resumed else "wb") as fh:
             with tqdm(
-                total=total,
-                unit="B",
-                unit_scale=True,
-                unit_divisor=1024,
+                total=total, initial=offset, unit="B", unit_scale=True, unit_divisor=1024
             ) as bar:
                 for chunk in r.iter_content(chunk_size=1024 * 1024):
                     if chunk:
                         fh.write(chunk)
                         bar.update(len(chunk))
+    if not _is_valid_zip(part):
+        part.unlink()
+        _validators_path(part).unlink(missing_ok=True)
+        if resumed:
+            # the resumed bytes did not complete the stored prefix
+            logging.info("Resumed download of %s is corrupt; downloading it again", url)
+            for key in ("Range", "If-Range"):
+                headers.pop(key, None)
+            return _stream_download(url, headers, dest, validators)
+        print("downloaded file is not a valid zip")
+        raise SystemExit(1)
+    os.replace(part, dest)
+    os.replace(_validators_path(part), _validators_path(dest))
+    return True
+
 
+def _is_valid_zip(path: Path) -> bool:
+    """Return whether ``path`` is a zip whose members all pass their CRC check."""
+    if not zipfile.is_zipfile(path):
+        return False
+    try:
+        with zipfile.ZipFile(path) as zf:
+            return zf.testzip() is None
+    except (zipfile.BadZipFile, OSError):
+        return False
 
-def _extract_zip(zip_path: Path, out_dir: Path, force: bool) -> int:
-    """Extract ``zip_path`` into ``out_dir`` respecting ``force`` flag."""
-    count = 0
+
+def _member_is_current(info: zipfile.ZipInfo, dest: Path) -> bool:
+    mtime = datetime(*info.date_time).timestamp()
+    return (
+        dest.exists()
+        and dest.stat().st_size == info.file_size
+        and int(dest.stat().st_mtime) == int(mtime)
+    )
+
+
+def _extract_member(zip_path: Path, info: zipfile.ZipInfo, dest: Path) -> None:
+    """Extract one member through a temporary file; each call opens its own handle."""
+    mtime = datetime(*info.date_time).timestamp()
+    tmp = dest.with_name(dest.name + ".tmp")
+    with zipfile.ZipFile(zip_path) as zf, zf.open(info) as src, open(tmp, "wb") as dst:
+        shutil.copyfileobj(src, dst, 1024 * 1024)
+    os.utime(tmp, (mtime, mtime))
+    os.replace(tmp, dest)
+
+
+def _extract_zip(zip_path: Path, out_dir: Path, force: bool, workers: int = 4) -> int:
+    """Extract ``zip_path`` into ``out_dir`` respecting ``force`` flag.
+
+    Members whose size and modification time already match are skipped.
+    Members of at least :data:`LARGE_MEMBER_BYTES` are extracted concurrently
+    by ``workers`` threads (zlib releases the GIL while inflating).
+    """
     with zipfile.ZipFile(zip_path) as zf:
-        for info in zf.infolist():
-            if info.is_dir():
-                continue
-            dest = out_dir / info.filename
-            dest.parent.mkdir(parents=True, exist_ok=True)
-            mtime = datetime(*info.date_time).timestamp()
-            if dest.exists() and not force:
-                same_size = dest.stat().st_size == info.file_size
-                if same_size and int(dest.stat().st_mtime) == int(mtime):
-                    continue
-            with zf.open(info) as src, open(dest, "wb") as dst:
-                shutil.copyfileobj(src, dst)
-            os.utime(dest, (mtime, mtime))
-            count += 1
-    return count
+        members = [info for info in zf.infolist() if not info.is_dir()]
+    todo = []
+    for info in members:
+        dest = out_dir / info.filename
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        if force or not _member_is_current(info, dest):
+            todo.append((info, dest))
+    large = [m for m in todo if m[0].file_size >= LARGE_MEMBER_BYTES]
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = [pool.submit(_extract_member, zip_path, info, dest) for info, dest in large]
+        for info, dest in todo:
+            if info.file_size < LARGE_MEMBER_BYTES:
+                _extract_member(zip_path, info, dest)
+        for fut in futures:
+            fut.result()
+    return len(todo)
 
 
 def download_and_extract(
@@ -74,8 +195,15 @@ def download_and_extract(
     *,
     force: bool = False,
     skip_if_exists: bool = True,
+    workers: int = 4,
 ) -> Path:
-    """Download the static feed for ``operator`` and extract it."""
+    """Download the static feed for ``operator`` and extract it.
+
+    The newest earlier zip of the operator is revalidated with its stored
+    ``ETag``/``Last-Modified``; when the server reports it unchanged it is
+    reused instead of downloading the feed again. ``force`` skips the
+    revalidation and overwrites every extracted file.
+    """
     out_root = Path(out_root)
     date_str = date.today().isoformat()
     feeds_dir = out_root / "static_feeds"
@@ -85,17 +213,19 @@ def download_and_extract(
     if not (skip_if_exists and zip_path.exists()):
         url = f"{API_ROOT}/{operator}"
         headers = {"Authorization": f"apikey {api_key}"}
-        _stream_download(url, headers, zip_path)
+        previous = sorted(feeds_dir.glob(f"*_{operator}.zip"))
+        validators = None if force or not previous else _read_validators(previous[-1])
+        if not _stream_download(url, headers, zip_path, validators):
+            logging.info("Feed unchanged since %s", previous[-1])
+            zip_path = previous[-1]
     else:
         logging.info("Using cached file %s", zip_path)
 
     out_dir = out_root / "static"
     out_dir.mkdir(parents=True, exist_ok=True)
-    extracted = _extract_zip(zip_path, out_dir, force)
+    extracted = _extract_zip(zip_path, out_dir, force, workers)
     size_mb = zip_path.stat().st_size / 1024 / 1024
-    print(
-        f"\u2713 downloaded {size_mb:.0f} MB  \u2794  {zip_path} ({extracted} files extracted)"
-    )
+    print(f"\u2713 downloaded {size_mb:.0f} MB  \u2794  {zip_path} ({extracted} files extracted)")
     return out_dir
 
 
@@ -105,7 +235,10 @@ def _parse_args(argv: Iterable[str] | None = None) -> argparse.Namespace:
     parser.add_argument("--operator", required=True, help="Operator slug")
     parser.add_argument("--out_root", type=Path, default=Path("data"), help="Output root directory")
     parser.add_argument("--force", action="store_true", help="Force overwrite existing files")
-    parser.add_argument("--skip_if_exists", action="store_true", help="Skip download if zip already exists")
+    parser.add_argument(
+        "--skip_if_exists", action="store_true", help="Skip download if zip already exists"
+    )
+    parser.add_argument("--workers", type=int, default=4, help="Threads extracting large members")
     return parser.parse_args(argv)
 
 
@@ -117,6 +250,7 @@ def main(argv: Iterable[str] | None = None) -> None:
         args.out_root,
         force=args.force,
         skip_if_exists=args.skip_if_exists,
+        workers=args.workers,
     )
 
 
@@ -5,15 +5,19 @@ from __future__ import annotations
 import argparse
 import logging
 import re
+import time
 from datetime import datetime
 from pathlib import Path
 
 import pandas as pd
 from pydantic import BaseModel
 
+from ..metrics import REGISTRY
+from ..utils_gtfsrt import _TZ_LONDON
 from .parse_alerts import parse_one_alert_file
 from .parse_trip_updates import parse_one_trip_update_file
 from .parse_vehicle_positions import parse_one_vehicle_position_file
+from .schemas import FEED_SCHEMAS
 from .write_parquet import write_df_to_partitioned_parquet
 
 # Raw realtime JSON files are named using the day-first format
@@ -34,6 +38,12 @@ class IngestRTConfig(BaseModel):
 
 FEEDS = ["alerts", "trip_updates", "vehicle_positions"]
 
+PARSERS = {
+    "alerts": parse_one_alert_file,
+    "trip_updates": parse_one_trip_update_file,
+    "vehicle_positions": parse_one_vehicle_position_file,
+}
+
 
 def _file_datetime(path: Path) -> datetime | None:
     """Return the timestamp encoded in ``path`` or ``None`` if not parseable."""
@@ -44,6 +54,37 @@ def _file_datetime(path: Path) -> datetime | None:
     return datetime(yyyy, mm, dd, hh, mi, ss)
 
 
+def raw_file_epoch(path: Path) -> int | None:
+    """Return the snapshot minute of a raw JSON file as UTC epoch seconds.
+
+    Raw filenames are stamped in London local time, matching the processed
+    Parquet names produced by :func:`ingest_all_rt`.
+    """
+    dt = _file_datetime(path)
+    if dt is None:
+        return None
+    return int(_TZ_LONDON.localize(dt).timestamp())
+
+
+def group_raw_files(
+    raw_root: Path, start_ts: int | None = None, end_ts: int | None = None
+) -> dict[int, dict[str, Path]]:
+    """Return ``{minute: {feed: path}}`` for raw files under ``raw_root/<feed>``.
+
+    Only files whose minute lies within ``[start_ts, end_ts]`` are returned.
+    """
+    minutes: dict[int, dict[str, Path]] = {}
+    for feed in FEEDS:
+        for path in sorted((raw_root / feed).glob("*.json")):
+            ts = raw_file_epoch(path)
+            if ts is None:
+                continue
+            if (start_ts is not None and ts < start_ts) or (end_ts is not None and ts > end_ts):
+                continue
+            minutes.setdefault(ts, {})[feed] = path
+    return dict(sorted(minutes.items()))
+
+
 def _parse_cli_time(value: str) -> datetime:
     """Parse a command line datetime string."""
     patterns = (
@@ -71,6 +112,23 @@ def _prefix_from_name(path: Path) -> str:
     return f"{yyyy}-{dd}-{mm}-{hh}-{mi}"
 
 
+def ingest_one_file(feed: str, json_path: Path, out_dir: Path) -> pd.DataFrame:
+    """Parse ``json_path`` as ``feed`` and write it below ``out_dir``."""
+    start = time.perf_counter()
+    df = PARSERS[feed](json_path)
+    REGISTRY.histogram(
+        "mdi_parse_seconds", "Time to parse one raw realtime file", feed=feed
+    ).observe(time.perf_counter() - start)
+    REGISTRY.counter("mdi_parsed_rows_total", "Rows parsed from raw realtime files", feed=feed).inc(
+        len(df)
+    )
+    prefix = _prefix_from_name(json_path)
+    write_df_to_partitioned_parquet(
+        df, out_dir, f"{feed}_{prefix}", write_empty=True, schema=FEED_SCHEMAS[feed]
+    )
+    return df
+
+
 def ingest_all_rt(
     raw_root: Path,
     processed_root: Path,
@@ -122,14 +180,7 @@ def ingest_all_rt(
         out_dir = processed_root / feed
         out_dir.mkdir(parents=True, exist_ok=True)
         for jf in files:
-            prefix = _prefix_from_name(jf)
-            if feed == "trip_updates":
-                df = parse_one_trip_update_file(jf)
-            elif feed == "vehicle_positions":
-                df = parse_one_vehicle_position_file(jf)
-            else:
-                df = parse_one_alert_file(jf)
-            write_df_to_partitioned_parquet(df, out_dir, f"{feed}_{prefix}", write_empty=True)
+            df = ingest_one_file(feed, jf, out_dir)
             logging.info("ingested %s -> %d rows", jf.name, len(df))
 
 
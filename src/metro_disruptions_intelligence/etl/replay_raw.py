@@ -0,0 +1,72 @@
+"""Replay raw realtime JSON files into a watched directory minute by minute."""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import shutil
+import time
+from pathlib import Path
+
+from pydantic import BaseModel
+
+from .ingest_rt import group_raw_files
+
+
+class ReplayRawConfig(BaseModel):
+    """Configuration for :func:`replay_raw_files`."""
+
+    src_root: Path
+    dest_root: Path
+    interval: float = 0.0
+    limit: int | None = None
+
+
+def replay_raw_files(
+    src_root: Path, dest_root: Path, *, interval: float = 0.0, limit: int | None = None
+) -> int:
+    """Copy raw JSON files from ``src_root`` into ``dest_root`` in chronological order.
+
+    Both directories use the ``<root>/<feed>/YYYY_DD_MM_HH_MM_SS.json`` layout.
+    Every file is written under a temporary name and renamed into place so a
+    watcher never sees a partially written file. ``interval`` seconds are slept
+    between minutes and at most ``limit`` minutes are replayed.
+
+    Returns the number of minutes replayed.
+    """
+    minutes = group_raw_files(src_root)
+    replayed = 0
+    for ts in list(minutes)[:limit]:
+        if replayed and interval:
+            time.sleep(interval)
+        for feed, path in minutes[ts].items():
+            out_dir = dest_root / feed
+            out_dir.mkdir(parents=True, exist_ok=True)
+            tmp = out_dir / f"{path.name}.tmp"
+            shutil.copyfile(path, tmp)
+            os.replace(tmp, out_dir / path.name)
+        logging.debug("replayed minute %s (%d files)", ts, len(minutes[ts]))
+        replayed += 1
+    return replayed
+
+
+def _parse_args(argv: list[str] | None = None) -> ReplayRawConfig:
+    parser = argparse.ArgumentParser(description="Replay raw realtime JSON files")
+    parser.add_argument("src_root", type=Path, help="Directory with raw JSON feed subfolders")
+    parser.add_argument("dest_root", type=Path, help="Directory watched by the online service")
+    parser.add_argument("--interval", type=float, default=0.0, help="Seconds between minutes")
+    parser.add_argument("--limit", type=int, help="Maximum number of minutes to replay")
+    args = parser.parse_args(argv)
+    return ReplayRawConfig(**{k: v for k, v in vars(args).items() if v is not None})
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Entry point for the ``replay_raw`` CLI."""
+    cfg = _parse_args(argv)
+    replay_raw_files(cfg.src_root, cfg.dest_root, interval=cfg.interval, limit=cfg.limit)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s:%(message)s")
+    main()
@@ -0,0 +1,104 @@
+"""Canonical Arrow schemas and Parquet settings for processed realtime feeds.
+
+Every processed minute is written with the same schema, whether or not the
+feed contained entities, so dataset scans over many files never see
+null-typed or drifting columns. Identifier columns stay Arrow strings (pandas
+readers get plain strings, not categoricals) but are always dictionary
+encoded in the Parquet pages.
+"""
+
+from __future__ import annotations
+
+import pandas as pd
+import pyarrow as pa
+
+TRIP_UPDATES_SCHEMA = pa.schema([
+    ("snapshot_timestamp", pa.int64()),
+    ("trip_id", pa.string()),
+    ("route_id", pa.string()),
+    ("direction_id", pa.int8()),
+    ("start_time", pa.string()),
+    ("start_date", pa.string()),
+    ("vehicle_id", pa.string()),
+    ("stop_sequence", pa.int32()),
+    ("stop_id", pa.string()),
+    ("arrival_time", pa.int64()),
+    ("departure_time", pa.int64()),
+    ("arrival_delay", pa.int32()),
+    ("departure_delay", pa.int32()),
+])
+
+VEHICLE_POSITIONS_SCHEMA = pa.schema([
+    ("snapshot_timestamp", pa.int64()),
+    ("trip_id", pa.string()),
+    ("route_id", pa.string()),
+    ("direction_id", pa.int8()),
+    ("vehicle_id", pa.string()),
+    ("latitude", pa.float64()),
+    ("longitude", pa.float64()),
+    ("bearing", pa.float32()),
+    ("speed", pa.float32()),
+    ("current_stop_sequence", pa.int32()),
+    ("current_status", pa.string()),
+    ("stop_id", pa.string()),
+    ("congestion_level", pa.string()),
+    ("occupancy_status", pa.string()),
+])
+
+ALERTS_SCHEMA = pa.schema([
+    ("snapshot_timestamp", pa.int64()),
+    ("alert_entity_id", pa.string()),
+    ("active_period_start", pa.int64()),
+    ("active_period_end", pa.int64()),
+    ("agency_id", pa.string()),
+    ("route_id", pa.string()),
+    ("direction_id", pa.int8()),
+    ("cause", pa.string()),
+    ("effect", pa.string()),
+    ("header_text", pa.string()),
+    ("description_text", pa.string()),
+    ("url", pa.string()),
+])
+
+FEED_SCHEMAS = {
+    "alerts": ALERTS_SCHEMA,
+    "trip_updates": TRIP_UPDATES_SCHEMA,
+    "vehicle_positions": VEHICLE_POSITIONS_SCHEMA,
+}
+
+# Partition columns added by ``write_df_to_partitions``
+PARTITION_FIELDS = [("year", pa.int64()), ("month", pa.int64()), ("day", pa.int64())]
+
+PARQUET_COMPRESSION = "zstd"
+PARQUET_COMPRESSION_LEVEL = 3
+PARQUET_DATA_PAGE_SIZE = 256 * 1024
+
+
+def table_from_frame(df: pd.DataFrame, schema: pa.Schema) -> pa.Table:
+    """Return ``df`` as an Arrow table with exactly the columns of ``schema``.
+
+    Missing columns are filled with nulls and extra columns are dropped. Values
+    are cast safely, so e.g. a non-integral float in an integer column raises
+    :class:`pyarrow.ArrowInvalid`.
+    """
+    arrays = []
+    for field in schema:
+        if field.name in df.columns:
+            arrays.append(pa.array(df[field.name], type=field.type, from_pandas=True))
+        else:
+            arrays.append(pa.nulls(len(df), type=field.type))
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+def parquet_write_options(schema: pa.Schema) -> dict:
+    """Return :func:`pyarrow.parquet.write_table` keyword arguments for ``schema``.
+
+    String columns are dictionary encoded; numeric columns are left to zstd,
+    which avoids dictionary fallbacks on high-cardinality timestamps.
+    """
+    return {
+        "compression": PARQUET_COMPRESSION,
+        "compression_level": PARQUET_COMPRESSION_LEVEL,
+        "data_page_size": PARQUET_DATA_PAGE_SIZE,
+        "use_dictionary": [f.name for f in schema if pa.types.is_string(f.type)],
+    }
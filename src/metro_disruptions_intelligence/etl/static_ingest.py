@@ -1,16 +1,89 @@
-"""Utilities to ingest static GTFS files into Parquet tables."""
+"""Utilities to ingest static GTFS files into Parquet tables.
+
+``stop_times.txt`` is streamed through a single DuckDB ``COPY`` that joins
+``trips.txt`` and writes ``station_schedule.parquet`` as a hive-partitioned
+directory (``service_id=/route_id=/``), so schedule lookups for one service
+day only read the partitions of the services running that day. When
+``calendar.txt`` or ``calendar_dates.txt`` is present the active dates of
+every service are expanded into ``service_calendar.parquet``.
+"""
 
 from __future__ import annotations
 
 import argparse
 import logging
+from datetime import date
 from pathlib import Path
 
 import duckdb
 from pydantic import BaseModel
 
+SCHEDULE_PARTITIONS = ("service_id", "route_id")
+_WEEKDAYS = "[sunday, monday, tuesday, wednesday, thursday, friday, saturday]"
+
+
+def _csv(path: Path) -> str:
+    # all_varchar keeps ids such as stop_id as text however numeric the sample
+    # looks; DuckDB only parses the columns a query projects
+    quoted = str(path).replace("'", "''")
+    return f"read_csv('{quoted}', header = true, all_varchar = true)"
+
+
+def _gtfs_seconds(column: str) -> str:
+    """SQL for a GTFS ``H:MM:SS`` time as seconds after service-day midnight.
+
+    Times past midnight keep counting (``25:10:00`` is 90600); blank or
+    malformed times become ``NULL``.
+    """
+    return f"CAST(epoch(TRY_CAST(trim({column}) AS INTERVAL)) AS INTEGER)"
+
+
+def _service_calendar_sql(gtfs_dir: Path) -> str | None:
+    calendar = gtfs_dir / "calendar.txt"
+    calendar_dates = gtfs_dir / "calendar_dates.txt"
+    parts = []
+    if calendar.exists():
+        parts.append(
+            f"""
+            SELECT service_id, CAST(d AS DATE) AS service_date
+            FROM (
+                SELECT service_id, {_WEEKDAYS} AS weekdays,
+                       unnest(generate_series(
+                           strptime(start_date, '%Y%m%d'),
+                           strptime(end_date, '%Y%m%d'),
+                           INTERVAL 1 DAY
+                       )) AS d
+                FROM {_csv(calendar)}
+            )
+            WHERE weekdays[dayofweek(d) + 1] = '1'
+            """
+        )
+    if calendar_dates.exists():
+        exceptions = f"""
+            SELECT service_id, CAST(strptime(date, '%Y%m%d') AS DATE) AS service_date,
+                   exception_type
+            FROM {_csv(calendar_dates)}
+        """
+        base = (
+            " UNION ".join(parts)
+            or "SELECT NULL::VARCHAR AS service_id, NULL::DATE AS service_date WHERE false"
+        )
+        return f"""
+            (({base})
+             UNION SELECT service_id, service_date FROM ({exceptions}) WHERE exception_type = '1')
+            EXCEPT SELECT service_id, service_date FROM ({exceptions}) WHERE exception_type = '2'
+        """
+    return parts[0] if parts else None
 
-def ingest_static_gtfs(gtfs_dir: Path, output_dir: Path, persist_duckdb: bool = False) -> Path:
+
+def ingest_static_gtfs(
+    gtfs_dir: Path,
+    output_dir: Path,
+    persist_duckdb: bool = False,
+    *,
+    start_date: date | None = None,
+    end_date: date | None = None,
+) -> Path:
     """Read GTFS CSVs from ``gtfs_dir`` and write ``station_schedule.parquet``.
 
     Parameters
@@ -21,82 +94,94 @@ def ingest_static_gtfs(gtfs_dir: Path, output_dir: Path, persist_duckdb: bool =
         Folder where ``station_schedule.parquet`` will be created.
     persist_duckdb:
         When ``True`` an on-disk DuckDB database is created alongside the
-        Parquet output. Otherwise an in-memory database is used.
-
-    Returns
+        Parquet output with views over the written files. Otherwise an
+        in-memory database is used.
+    start_date, end_date:
+        Optional service date range. Requires the GTFS calendar files; only
+        services running on at least one day of the range are written and
+        ``service_calendar.parquet`` is limited to the range.
+
+    Returns:
     -------
     Path
-        Location of the written Parquet file.
+        Location of the partitioned ``station_schedule.parquet`` directory.
     """
-
     db_path = output_dir / "station_schedule.duckdb" if persist_duckdb else ":memory:"
     output_parquet = output_dir / "station_schedule.parquet"
+    output_calendar = output_dir / "service_calendar.parquet"
     output_dir.mkdir(parents=True, exist_ok=True)
 
     logging.info("Creating duckdb database at %s", db_path)
     con = duckdb.connect(str(db_path))
-
-    stop_times_csv = gtfs_dir / "stop_times.txt"
-    trips_csv = gtfs_dir / "trips.txt"
-
-    # First read the entire CSV so the stop_id column is interpreted as VARCHAR
-    # even when the sample contains only numeric values. SAMPLE_SIZE=-1 forces
-    # DuckDB to scan the whole file.
-    con.execute(
-        f"""
-        CREATE TABLE stop_times_raw AS
-            SELECT *
-            FROM read_csv_auto(
-                '{stop_times_csv}',
-                delim=',',
-                HEADER=TRUE,
-                SAMPLE_SIZE=-1
-            );
-        """
-    )
-
-    # Transform the raw table to add numeric arrival/departure seconds.
-    con.execute(
-        """
-        CREATE TABLE stop_times AS
-            SELECT
-                trip_id,
-                stop_id,
-                arrival_time,
-                departure_time,
-                stop_sequence,
-                CAST(split_part(arrival_time, ':', 1) AS INT) * 3600 +
-                CAST(split_part(arrival_time, ':', 2) AS INT) * 60 +
-                CAST(split_part(arrival_time, ':', 3) AS INT) AS sched_arr,
-                CAST(split_part(departure_time, ':', 1) AS INT) * 3600 +
-                CAST(split_part(departure_time, ':', 2) AS INT) * 60 +
-                CAST(split_part(departure_time, ':', 3) AS INT) AS sched_dep
-            FROM stop_times_raw;
-        """
+    # no ORDER BY is needed, which lets DuckDB stream the CSV through the COPY
+    con.execute("SET preserve_insertion_order = false")
+
+    calendar_sql = _service_calendar_sql(gtfs_dir)
+    if calendar_sql is None and (start_date or end_date):
+        raise ValueError(
+            f"start_date/end_date need calendar.txt or calendar_dates.txt in {gtfs_dir}"
+        )
+    services = ""
+    if calendar_sql is not None:
+        bounds = ["true"]
+        if start_date is not None:
+            bounds.append(f"service_date >= DATE '{start_date.isoformat()}'")
+        if end_date is not None:
+            bounds.append(f"service_date <= DATE '{end_date.isoformat()}'")
+        con.execute(
+            f"CREATE TEMP TABLE service_calendar AS SELECT * FROM ({calendar_sql}) "
+            f"WHERE {' AND '.join(bounds)} ORDER BY service_date, service_id"
+        )
+        logging.info("Writing service_calendar to %s", output_calendar)
+        con.execute(f"COPY service_calendar TO '{output_calendar}' (FORMAT PARQUET)")
+        if start_date is not None or end_date is not None:
+            services = "WHERE t.service_id IN (SELECT service_id FROM service_calendar)"
+
+    if output_parquet.is_file():
+        # earlier versions wrote a single file
+        output_parquet.unlink()
+    logging.info("Writing station_schedule to %s", output_parquet)
+    # direction_id is optional in GTFS
+    with open(gtfs_dir / "trips.txt", encoding="utf-8-sig") as fh:
+        trip_columns = [c.strip() for c in fh.readline().split(",")]
+    direction = (
+        "TRY_CAST(t.direction_id AS TINYINT)"
+        if "direction_id" in trip_columns
+        else "CAST(NULL AS TINYINT)"
     )
     con.execute(
         f"""
-        CREATE TABLE trips AS
-        SELECT trip_id, service_id, route_id
-        FROM read_csv_auto('{trips_csv}', delim=',', HEADER=TRUE);
-    """
-    )
-    con.execute(
+        COPY (
+            SELECT st.trip_id,
+                   t.service_id,
+                   t.route_id,
+                   {direction} AS direction_id,
+                   st.stop_id,
+                   {_gtfs_seconds("st.arrival_time")} AS sched_arr,
+                   {_gtfs_seconds("st.departure_time")} AS sched_dep,
+                   CAST(st.stop_sequence AS INTEGER) AS stop_sequence
+            FROM {_csv(gtfs_dir / "stop_times.txt")} st
+            JOIN {_csv(gtfs_dir / "trips.txt")} t USING (trip_id)
+            {services}
+        ) TO '{output_parquet}' (
+            FORMAT PARQUET,
+            COMPRESSION zstd,
+            PARTITION_BY ({", ".join(SCHEDULE_PARTITIONS)}),
+            OVERWRITE true
+        )
         """
-        CREATE TABLE station_schedule AS
-        SELECT st.trip_id,
-               t.service_id,
-               t.route_id,
-               st.stop_id,
-               st.sched_arr,
-               st.sched_dep,
-               st.stop_sequence
-        FROM stop_times st
-        JOIN trips t USING (trip_id);
-    """
     )
-    logging.info("Writing station_schedule to %s", output_parquet)
-    con.execute(f"COPY station_schedule TO '{output_parquet}' (FORMAT PARQUET);")
+    if persist_duckdb:
+        con.execute(
+            "CREATE OR REPLACE VIEW station_schedule AS SELECT * FROM "
+            f"read_parquet('{output_parquet}/**/*.parquet', hive_partitioning = true)"
+        )
+        if calendar_sql is not None:
+            con.execute("DROP TABLE service_calendar")
+            con.execute(
+                "CREATE OR REPLACE VIEW service_calendar AS "
+                f"SELECT * FROM read_parquet('{output_calendar}')"
+            )
     con.close()
     return output_parquet
 
@@ -107,6 +192,8 @@ class StaticIngestConfig(BaseModel):
     gtfs_dir: Path
     output_dir: Path = Path("data/processed/static")
     persist_duckdb: bool = False
+    start_date: date | None = None
+    end_date: date | None = None
 
 
 def _parse_args(argv: list[str] | None = None) -> StaticIngestConfig:
@@ -123,6 +210,12 @@ def _parse_args(argv: list[str] | None = None) -> StaticIngestConfig:
         action="store_true",
         help="Persist the intermediate DuckDB database to disk",
     )
+    parser.add_argument(
+        "--start-date", type=date.fromisoformat, help="First service date to keep (YYYY-MM-DD)"
+    )
+    parser.add_argument(
+        "--end-date", type=date.fromisoformat, help="Last service date to keep (YYYY-MM-DD)"
+    )
     ns = parser.parse_args(argv)
     return StaticIngestConfig(**vars(ns))
 
@@ -130,7 +223,13 @@ def _parse_args(argv: list[str] | None = None) -> StaticIngestConfig:
 def main(argv: list[str] | None = None) -> None:
     """Command line entry-point."""
     cfg = _parse_args(argv)
-    ingest_static_gtfs(cfg.gtfs_dir, cfg.output_dir, cfg.persist_duckdb)
+    ingest_static_gtfs(
+        cfg.gtfs_dir,
+        cfg.output_dir,
+        cfg.persist_duckdb,
+        start_date=cfg.start_date,
+        end_date=cfg.end_date,
+    )
 
 
 if __name__ == "__main__":
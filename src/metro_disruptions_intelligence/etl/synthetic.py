@@ -0,0 +1,567 @@
+"""Generate synthetic GTFS-realtime feeds at configurable scale.
+
+A route map (from :func:`~metro_disruptions_intelligence.features.build_route_map`,
+:func:`route_map_from_schedule` or :func:`synthetic_route_map`) is turned
+into a regular timetable per service day: ``trains_per_hour`` trips per
+route and direction, ``run_secs`` between stops and ``dwell_secs`` at each.
+Every trip carries a small random delay; injected disruptions add
+``disruption_delay_secs`` to the trips reaching the disrupted stop while the
+disruption is active, from that stop to the end of the line. Predictions in
+the trip update feed only include a disruption once it has started, like a
+real feed, and an alert is published while it lasts.
+
+Each minute produces one trip update, vehicle position and alert snapshot.
+Header timestamps lag the minute by an exponential delay with mean
+``lag_mean_secs`` capped at ``lag_max_secs``, and a feed file is missing with
+probability ``drop_prob``. Snapshots are written as raw JSON named like the
+collector's files (input of ``ingest-rt`` and ``serve``) or as processed
+Parquet identical to :func:`~.ingest_rt.ingest_one_file` output. The injected
+disruptions are written to ``disruptions.parquet`` as ground truth; their
+``active_period_start``/``active_period_end`` columns make them usable as
+``events`` of :func:`~metro_disruptions_intelligence.evaluation.evaluate_scores`.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+from collections.abc import Iterator
+from datetime import datetime
+from pathlib import Path
+from typing import Literal
+
+import numpy as np
+import pandas as pd
+import pyarrow.dataset as ds
+from pydantic import BaseModel
+
+from ..time_context import SECS_PER_DAY, sydney_table
+from ..utils_gtfsrt import _TZ_LONDON
+from .parse_alerts import ALERT_COLUMNS
+from .parse_trip_updates import TRIP_UPDATE_COLUMNS
+from .parse_vehicle_positions import VEHICLE_POSITION_COLUMNS
+from .schemas import FEED_SCHEMAS
+from .write_parquet import write_df_to_partitioned_parquet
+
+logger = logging.getLogger(__name__)
+
+RouteMap = dict[tuple[str, int], list[str]]
+
+FEEDS = ("alerts", "trip_updates", "vehicle_positions")
+# trips appear in the trip update feed this long before they depart
+TU_LOOKAHEAD_SECS = 20 * 60
+# GTFS-realtime enums, stringified like the parsers do
+STOPPED_AT, IN_TRANSIT_TO = "1", "2"
+CAUSE_TECHNICAL_PROBLEM, EFFECT_SIGNIFICANT_DELAYS = "3", "3"
+BASE_LAT, BASE_LON = -33.95, 150.90
+
+
+class SyntheticConfig(BaseModel):
+    """Scale and behaviour of a synthetic feed."""
+
+    start_ts: int = 1743472800  # 2025-04-01 13:00 Sydney
+    days: int = 1
+    minutes_per_day: int = 60
+    trains_per_hour: float = 12.0
+    run_secs: int = 120
+    dwell_secs: int = 30
+    delay_noise_secs: float = 20.0
+    disruptions_per_day: int = 1
+    disruption_secs: int = 30 * 60
+    disruption_delay_secs: int = 600
+    lag_mean_secs: float = 10.0
+    lag_max_secs: int = 120
+    drop_prob: float = 0.0
+    seed: int = 0
+
+
+def synthetic_route_map(n_routes: int = 1, n_stops: int = 20) -> RouteMap:
+    """Return ``n_routes`` straight lines of ``n_stops`` stops, both directions."""
+    route_map: RouteMap = {}
+    for r in range(n_routes):
+        stops = [f"SYN{r:03d}{k:03d}" for k in range(n_stops)]
+        route_map[(f"SYN_R{r:03d}", 0)] = stops
+        route_map[(f"SYN_R{r:03d}", 1)] = stops[::-1]
+    return route_map
+
+
+def route_map_from_schedule(path: Path) -> RouteMap:
+    """Return the stop list of the longest trip per route and direction in ``path``.
+
+    ``path`` is a ``station_schedule.parquet`` file or the hive-partitioned
+    directory written by :func:`~.static_ingest.ingest_static_gtfs`. A
+    missing or null ``direction_id`` is read as direction 0.
+    """
+    dataset = ds.dataset(path, partitioning="hive")
+    columns = ["trip_id", "route_id", "stop_id", "stop_sequence"]
+    if "direction_id" in dataset.schema.names:
+        columns.append("direction_id")
+    df = dataset.to_table(columns=columns).to_pandas()
+    df["route_id"] = df["route_id"].astype(str)
+    df["stop_id"] = df["stop_id"].astype(str)
+    df["direction_id"] = (
+        df["direction_id"].fillna(0).astype(int) if "direction_id" in df.columns else 0
+    )
+    sizes = df.groupby(["route_id", "direction_id", "trip_id"]).size().rename("n_stops")
+    longest = sizes.reset_index().sort_values("n_stops", kind="stable")
+    longest = longest.drop_duplicates(["route_id", "direction_id"], keep="last")
+    stops = df.merge(longest[["trip_id"]], on="trip_id").sort_values("stop_sequence")
+    return {
+        (route, int(direction)): grp["stop_id"].tolist()
+        for (route, direction), grp in stops.groupby(["route_id", "direction_id"], sort=True)
+    }
+
+
+def scale_route_map(route_map: RouteMap, n_routes: int | None) -> RouteMap:
+    """Return ``route_map`` with exactly ``n_routes`` routes.
+
+    Routes are taken in ``route_id`` order; beyond the available routes they
+    are copied with ``~<copy>`` appended to their route and stop ids, so each
+    copy is an independent line with its own stations.
+    """
+    if n_routes is None:
+        return dict(route_map)
+    routes = sorted({route for route, _ in route_map})
+    if not routes:
+        raise ValueError("route_map is empty")
+    scaled: RouteMap = {}
+    for i in range(n_routes):
+        copy, route = divmod(i, len(routes))
+        suffix = f"~{copy}" if copy else ""
+        for (rid, direction), stops in route_map.items():
+            if rid == routes[route]:
+                scaled[(rid + suffix, direction)] = [s + suffix for s in stops]
+    return scaled
+
+
+def load_route_map(source: Path | None, n_routes: int | None = None, n_stops: int = 20) -> RouteMap:
+    """Return the route map of ``source`` scaled to ``n_routes`` routes.
+
+    ``source`` is a ``station_schedule.parquet`` file or directory, a processed
+    realtime root (read by ``build_route_map``) or ``None`` for
+    :func:`synthetic_route_map` lines of ``n_stops`` stops.
+    """
+    if source is None:
+        return synthetic_route_map(n_routes or 1, n_stops)
+    if source.suffix == ".parquet":
+        route_map = route_map_from_schedule(source)
+    else:
+        from ..features import build_route_map
+
+        route_map = build_route_map(source)
+    return scale_route_map(route_map, n_routes)
+
+
+def plan_disruptions(route_map: RouteMap, cfg: SyntheticConfig) -> pd.DataFrame:
+    """Return the disruptions injected into the feed of ``route_map``.
+
+    Each service day gets ``disruptions_per_day`` disruptions at a random
+    route direction, stop (not the terminus) and start minute.
+    """
+    rng = np.random.default_rng([cfg.seed, 1])
+    keys = sorted(route_map)
+    window = max(cfg.minutes_per_day * 60 - cfg.disruption_secs, 60)
+    rows = []
+    for day in range(cfg.days):
+        day_start = cfg.start_ts + day * SECS_PER_DAY
+        for j in range(cfg.disruptions_per_day):
+            route_id, direction_id = keys[rng.integers(len(keys))]
+            stops = route_map[(route_id, direction_id)]
+            stop_index = int(rng.integers(max(len(stops) - 1, 1)))
+            start = day_start + 60 * int(rng.integers(window // 60))
+            rows.append({
+                "disruption_id": f"SYN-D{day:03d}-{j:03d}",
+                "route_id": route_id,
+                "direction_id": direction_id,
+                "stop_id": stops[stop_index],
+                "stop_index": stop_index,
+                "active_period_start": start,
+                "active_period_end": start + cfg.disruption_secs,
+                "delay_secs": cfg.disruption_delay_secs,
+            })
+    columns = [
+        "disruption_id",
+        "route_id",
+        "direction_id",
+        "stop_id",
+        "stop_index",
+        "active_period_start",
+        "active_period_end",
+        "delay_secs",
+    ]
+    return pd.DataFrame(rows, columns=columns)
+
+
+def _stop_coords(route_map: RouteMap) -> dict[str, tuple[float, float]]:
+    coords: dict[str, tuple[float, float]] = {}
+    for r, key in enumerate(sorted(route_map)):
+        for k, stop in enumerate(route_map[key]):
+            coords.setdefault(stop, (BASE_LAT + 0.01 * k, BASE_LON + 0.05 * (r // 2)))
+    return coords
+
+
+def _service_strings(t0: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Return GTFS ``start_date`` and ``start_time`` strings of Sydney epochs ``t0``."""
+    local = sydney_table().local_seconds(t0).astype(np.int64)
+    days = (local // SECS_PER_DAY).astype("datetime64[D]")
+    dates = np.char.replace(np.datetime_as_string(days), "-", "")
+    secs = local % SECS_PER_DAY
+    times = np.array([f"{s // 3600:02d}:{s // 60 % 60:02d}:{s % 60:02d}" for s in secs.tolist()])
+    return dates, times
+
+
+def _timetable(
+    route_map: RouteMap,
+    cfg: SyntheticConfig,
+    day: int,
+    disruptions: pd.DataFrame,
+    coords: dict[str, tuple[float, float]],
+    rng: np.random.Generator,
+) -> dict[str, np.ndarray]:
+    """Return the stop times of one service day as arrays sorted by trip start."""
+    step = cfg.run_secs + cfg.dwell_secs
+    headway = 3600 / cfg.trains_per_hour
+    day_start = cfg.start_ts + day * SECS_PER_DAY
+    day_end = day_start + cfg.minutes_per_day * 60
+    parts: dict[str, list[np.ndarray]] = {}
+    n_trips = 0
+    for route_id, direction_id in sorted(route_map):
+        stops = np.array(route_map[(route_id, direction_id)], dtype=object)
+        n = len(stops)
+        # trips already under way at day_start fill the line from the first minute
+        t0 = np.arange(day_start - (n - 1) * step, day_end + TU_LOOKAHEAD_SECS, headway)
+        t0 = t0.astype(np.int64)
+        trip_ids = np.array(
+            [
+                f"SYN-{route_id}-{direction_id}-{day:03d}-{i:04d}"
+                for i in range(n_trips, n_trips + len(t0))
+            ],
+            dtype=object,
+        )
+        n_trips += len(t0)
+        stop_index = np.tile(np.arange(n), len(t0))
+        columns = {
+            "trip_id": np.repeat(trip_ids, n),
+            "route_id": np.full(len(stop_index), route_id, dtype=object),
+            "direction_id": np.full(len(stop_index), direction_id, dtype=np.int64),
+            "t0": np.repeat(t0, n),
+            "stop_index": stop_index,
+            "stop_id": np.tile(stops, len(t0)),
+            "base_delay": np.repeat(
+                np.round(rng.normal(0, cfg.delay_noise_secs, len(t0))).astype(np.int64), n
+            ),
+            "is_last": np.tile(np.arange(n) == n - 1, len(t0)),
+        }
+        for name, values in columns.items():
+            parts.setdefault(name, []).append(values)
+    tt = {name: np.concatenate(values) for name, values in parts.items()}
+    order = np.lexsort((tt["stop_index"], tt["trip_id"], tt["t0"]))
+    tt = {name: values[order] for name, values in tt.items()}
+
+    tt["sched_arr"] = tt["t0"] + tt["stop_index"] * step
+    tt["sched_dep"] = tt["sched_arr"] + cfg.dwell_secs
+    tt["disr_delay"] = np.zeros(len(order), dtype=np.int64)
+    tt["known_from"] = np.full(len(order), np.iinfo(np.int64).max)
+    for d in disruptions.itertuples():
+        at_stop = tt["t0"] + d.stop_index * step
+        hit = (
+            (tt["route_id"] == d.route_id)
+            & (tt["direction_id"] == d.direction_id)
+            & (tt["stop_index"] >= d.stop_index)
+            & (at_stop >= d.active_period_start)
+            & (at_stop <= d.active_period_end)
+        )
+        tt["disr_delay"][hit] += d.delay_secs
+        tt["known_from"][hit] = np.minimum(tt["known_from"][hit], d.active_period_start)
+    tt["actual_arr"] = tt["sched_arr"] + tt["base_delay"] + tt["disr_delay"]
+    tt["actual_dep"] = tt["actual_arr"] + cfg.dwell_secs
+
+    first = tt["stop_index"] == 0
+    dates, times = _service_strings(tt["t0"][first])
+    trip_number = np.cumsum(first) - 1
+    tt["start_date"] = dates[trip_number]
+    tt["start_time"] = times[trip_number]
+    tt["vehicle_id"] = np.char.add("SYN", (trip_number % 10_000).astype(str)).astype(object)
+    tt["lat"] = np.array([coords[s][0] for s in tt["stop_id"]])
+    tt["lon"] = np.array([coords[s][1] for s in tt["stop_id"]])
+    return tt
+
+
+def _trip_updates(tt: dict[str, np.ndarray], span: int, header: int) -> pd.DataFrame:
+    t0 = tt["t0"]
+    lo = np.searchsorted(t0, header - span, "left")
+    hi = np.searchsorted(t0, header + TU_LOOKAHEAD_SECS, "right")
+    window = slice(lo, hi)
+    known = header >= tt["known_from"][window]
+    delay = tt["base_delay"][window] + np.where(known, tt["disr_delay"][window], 0)
+    arrival = tt["sched_arr"][window] + delay
+    departure = arrival + (tt["sched_dep"][window] - tt["sched_arr"][window])
+    keep = departure >= header
+    df = pd.DataFrame({
+        "snapshot_timestamp": header,
+        "trip_id": tt["trip_id"][window][keep],
+        "route_id": tt["route_id"][window][keep],
+        "direction_id": tt["direction_id"][window][keep],
+        "start_time": tt["start_time"][window][keep],
+        "start_date": tt["start_date"][window][keep],
+        "vehicle_id": tt["vehicle_id"][window][keep],
+        "stop_sequence": tt["stop_index"][window][keep] + 1,
+        "stop_id": tt["stop_id"][window][keep],
+        "arrival_time": arrival[keep],
+        "departure_time": departure[keep],
+        "arrival_delay": delay[keep],
+        "departure_delay": delay[keep],
+    })
+    return df[TRIP_UPDATE_COLUMNS]
+
+
+def _vehicle_positions(tt: dict[str, np.ndarray], span: int, header: int) -> pd.DataFrame:
+    t0 = tt["t0"]
+    lo = np.searchsorted(t0, header - span, "left")
+    hi = np.searchsorted(t0, header, "right")
+    arr, dep = tt["actual_arr"][lo:hi], tt["actual_dep"][lo:hi]
+    is_last = tt["is_last"][lo:hi]
+    reached = arr <= header
+    # the last reached stop of each trip; trip rows are contiguous and ordered
+    current = reached & (is_last | ~np.append(reached[1:], False))
+    stopped = dep > header
+    current &= stopped | ~is_last
+    i = np.flatnonzero(current) + lo
+    stopped = stopped[i - lo]
+    nxt = np.where(stopped, i, i + 1)
+    frac = np.where(
+        stopped,
+        0.0,
+        np.clip(
+            (header - tt["actual_dep"][i])
+            / np.maximum(tt["actual_arr"][nxt] - tt["actual_dep"][i], 1),
+            0,
+            1,
+        ),
+    )
+    df = pd.DataFrame({
+        "snapshot_timestamp": header,
+        "trip_id": tt["trip_id"][i],
+        "route_id": tt["route_id"][i],
+        "direction_id": tt["direction_id"][i],
+        "vehicle_id": tt["vehicle_id"][i],
+        "latitude": tt["lat"][i] + frac * (tt["lat"][nxt] - tt["lat"][i]),
+        "longitude": tt["lon"][i] + frac * (tt["lon"][nxt] - tt["lon"][i]),
+        "bearing": np.where(tt["direction_id"][i] == 0, 0.0, 180.0),
+        "speed": np.where(stopped, 0.0, 22.0),
+        "current_stop_sequence": tt["stop_index"][nxt] + 1,
+        "current_status": np.where(stopped, STOPPED_AT, IN_TRANSIT_TO).astype(object),
+        "stop_id": tt["stop_id"][nxt],
+        "congestion_level": "1",
+        "occupancy_status": "1",
+    })
+    return df[VEHICLE_POSITION_COLUMNS]
+
+
+def _alerts(disruptions: pd.DataFrame, header: int) -> pd.DataFrame:
+    active = disruptions[
+        (disruptions["active_period_start"] <= header)
+        & (disruptions["active_period_end"] >= header)
+    ]
+    minutes = active["delay_secs"] // 60
+    df = pd.DataFrame({
+        "snapshot_timestamp": header,
+        "alert_entity_id": active["disruption_id"],
+        "active_period_start": active["active_period_start"],
+        "active_period_end": active["active_period_end"],
+        "agency_id": "SYN",
+        "route_id": active["route_id"],
+        "direction_id": active["direction_id"],
+        "cause": CAUSE_TECHNICAL_PROBLEM,
+        "effect": EFFECT_SIGNIFICANT_DELAYS,
+        "header_text": "Trains are delayed by about " + minutes.astype(str) + " minutes",
+        "description_text": "A technical problem at stop "
+        + active["stop_id"]
+        + " is delaying trains.",
+        "url": None,
+    })
+    return df[ALERT_COLUMNS].reset_index(drop=True)
+
+
+def iter_synthetic_minutes(
+    route_map: RouteMap, cfg: SyntheticConfig, disruptions: pd.DataFrame | None = None
+) -> Iterator[tuple[int, dict[str, pd.DataFrame]]]:
+    """Yield ``(minute, {feed: frame})`` for every minute of the synthetic feed.
+
+    Frames have the columns of the realtime parsers. Feeds dropped with
+    ``drop_prob`` are missing from the dict. ``disruptions`` default to
+    :func:`plan_disruptions`.
+    """
+    if not 0 < cfg.minutes_per_day <= SECS_PER_DAY // 60:
+        raise ValueError("minutes_per_day must be between 1 and 1440")
+    if disruptions is None:
+        disruptions = plan_disruptions(route_map, cfg)
+    coords = _stop_coords(route_map)
+    for day in range(cfg.days):
+        rng = np.random.default_rng([cfg.seed, 0, day])
+        tt = _timetable(route_map, cfg, day, disruptions, coords, rng)
+        # longest time a trip stays in the feeds, bounding the rows of one snapshot
+        span = int((tt["actual_dep"] - tt["t0"]).max(initial=0))
+        day_start = cfg.start_ts + day * SECS_PER_DAY
+        for minute in range(day_start, day_start + cfg.minutes_per_day * 60, 60):
+            lags = np.minimum(rng.exponential(cfg.lag_mean_secs, len(FEEDS)), cfg.lag_max_secs)
+            dropped = rng.random(len(FEEDS)) < cfg.drop_prob
+            frames = {}
+            for feed, lag, drop in zip(FEEDS, lags.astype(int).tolist(), dropped.tolist()):
+                if drop:
+                    continue
+                header = minute - lag
+                if feed == "trip_updates":
+                    frames[feed] = _trip_updates(tt, span, header)
+                elif feed == "vehicle_positions":
+                    frames[feed] = _vehicle_positions(tt, span, header)
+                else:
+                    frames[feed] = _alerts(disruptions, header)
+            yield minute, frames
+
+
+def _header(ts: int) -> dict:
+    return {"gtfs_realtime_version": "2.0", "incrementality": 0, "timestamp": int(ts)}
+
+
+def _trip_update_entities(df: pd.DataFrame) -> list[dict]:
+    entities: list[dict] = []
+    for row in df.itertuples(index=False):
+        if not entities or entities[-1]["trip_update"]["trip"]["trip_id"] != row.trip_id:
+            entities.append({
+                "id": f"{len(entities)}/{row.trip_id}",
+                "trip_update": {
+                    "trip": {
+                        "trip_id": row.trip_id,
+                        "start_time": row.start_time,
+                        "start_date": row.start_date,
+                        "schedule_relationship": 0,
+                        "route_id": row.route_id,
+                        "direction_id": int(row.direction_id),
+                    },
+                    "stop_time_update": [],
+                    "vehicle": {"id": row.vehicle_id},
+                },
+            })
+        entities[-1]["trip_update"]["stop_time_update"].append({
+            "stop_sequence": int(row.stop_sequence),
+            "arrival": {"delay": int(row.arrival_delay), "time": int(row.arrival_time)},
+            "departure": {"delay": int(row.departure_delay), "time": int(row.departure_time)},
+            "stop_id": row.stop_id,
+            "schedule_relationship": 0,
+        })
+    return entities
+
+
+def _vehicle_entities(df: pd.DataFrame) -> list[dict]:
+    return [
+        {
+            "id": f"{i}/{row.vehicle_id}",
+            "vehicle": {
+                "trip": {
+                    "trip_id": row.trip_id,
+                    "route_id": row.route_id,
+                    "direction_id": int(row.direction_id),
+                },
+                "position": {
+                    "latitude": row.latitude,
+                    "longitude": row.longitude,
+                    "bearing": row.bearing,
+                    "speed": row.speed,
+                },
+                "current_stop_sequence": int(row.current_stop_sequence),
+                "current_status": int(row.current_status),
+                "stop_id": row.stop_id,
+                "vehicle": {"id": row.vehicle_id},
+                "congestion_level": int(row.congestion_level),
+                "occupancy_status": int(row.occupancy_status),
+            },
+        }
+        for i, row in enumerate(df.itertuples(index=False))
+    ]
+
+
+def _alert_entities(df: pd.DataFrame) -> list[dict]:
+    return [
+        {
+            "id": row.alert_entity_id,
+            "alert": {
+                "active_period": [
+                    {"start": int(row.active_period_start), "end": int(row.active_period_end)}
+                ],
+                "informed_entity": [
+                    {
+                        "agency_id": row.agency_id,
+                        "route_id": row.route_id,
+                        "direction_id": int(row.direction_id),
+                    }
+                ],
+                "cause": int(row.cause),
+                "effect": int(row.effect),
+                "header_text": {"translation": [{"text": row.header_text, "language": "en"}]},
+                "description_text": {
+                    "translation": [{"text": row.description_text, "language": "en"}]
+                },
+            },
+        }
+        for row in df.itertuples(index=False)
+    ]
+
+
+ENTITY_BUILDERS = {
+    "alerts": _alert_entities,
+    "trip_updates": _trip_update_entities,
+    "vehicle_positions": _vehicle_entities,
+}
+
+
+def feed_message(feed: str, df: pd.DataFrame, header_ts: int) -> dict:
+    """Return the GTFS-realtime JSON message of the ``feed`` snapshot ``df``."""
+    return {"header": _header(header_ts), "entity": ENTITY_BUILDERS[feed](df)}
+
+
+def generate_synthetic_feeds(
+    route_map: RouteMap,
+    out_root: Path,
+    cfg: SyntheticConfig,
+    fmt: Literal["json", "parquet"] = "parquet",
+) -> pd.DataFrame:
+    """Write the synthetic feed of ``route_map`` below ``out_root`` and return its disruptions.
+
+    ``fmt="json"`` writes raw ``<feed>/YYYY_DD_MM_HH_MM_SS.json`` files,
+    ``"parquet"`` the partitioned processed layout. The disruptions are also
+    written to ``out_root/disruptions.parquet``.
+    """
+    if fmt not in ("json", "parquet"):
+        raise ValueError(f"Unknown format {fmt!r}")
+    disruptions = plan_disruptions(route_map, cfg)
+    n_minutes = 0
+    for minute, frames in iter_synthetic_minutes(route_map, cfg, disruptions):
+        local = datetime.fromtimestamp(minute, _TZ_LONDON)
+        for feed, df in frames.items():
+            if fmt == "parquet":
+                write_df_to_partitioned_parquet(
+                    df,
+                    out_root / feed,
+                    f"{feed}_{local:%Y-%d-%m-%H-%M}",
+                    write_empty=True,
+                    schema=FEED_SCHEMAS[feed],
+                )
+            else:
+                header_ts = int(df["snapshot_timestamp"].iloc[0]) if len(df) else minute
+                out = out_root / feed / f"{local:%Y_%d_%m_%H_%M_%S}.json"
+                out.parent.mkdir(parents=True, exist_ok=True)
+                out.write_text(json.dumps(feed_message(feed, df, header_ts)))
+        n_minutes += 1
+        if n_minutes % 60 == 0:
+            logger.info("generated %d synthetic minutes", n_minutes)
+    out_root.mkdir(parents=True, exist_ok=True)
+    disruptions.to_parquet(out_root / "disruptions.parquet", index=False)
+    logger.info(
+        "wrote %d minutes of %d route directions with %d disruptions to %s",
+        n_minutes,
+        len(route_map),
+        len(disruptions),
+        out_root,
+    )
+    return disruptions
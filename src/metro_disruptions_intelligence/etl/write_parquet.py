@@ -2,13 +2,113 @@
 
 from __future__ import annotations
 
+import re
 from datetime import datetime
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
 import pyarrow as pa
 import pyarrow.parquet as pq
-import pytz
+
+from ..metrics import record_parquet_write
+from ..time_context import SECS_PER_DAY, london_table
+from .schemas import PARTITION_FIELDS, parquet_write_options, table_from_frame
+
+
+def partition_keys(timestamps: np.ndarray) -> np.ndarray:
+    """Return the London-local ``[year, month, day]`` of each epoch in ``timestamps``.
+
+    The result has shape ``(n, 3)`` and is computed without per-row
+    ``datetime`` objects.
+    """
+    local = london_table().local_seconds(np.asarray(timestamps, dtype=np.int64))
+    days = (local // SECS_PER_DAY).astype(np.int64).astype("datetime64[D]")
+    years = days.astype("datetime64[Y]")
+    months = days.astype("datetime64[M]")
+    return np.column_stack([
+        years.astype(np.int64) + 1970,
+        (months - years).astype(np.int64) + 1,
+        (days - months).astype(np.int64) + 1,
+    ])
+
+
+def _partition_dir(base_dir: Path, year: int, month: int, day: int) -> Path:
+    return base_dir / f"year={year:04d}" / f"month={month:02d}" / f"day={day:02d}"
+
+
+def write_df_to_partitions(
+    df: pd.DataFrame,
+    base_dir: Path,
+    filename_prefix: str,
+    timestamp_column: str = "snapshot_timestamp",
+    write_empty: bool = False,
+    schema: pa.Schema | None = None,
+) -> list[Path]:
+    """Write ``df`` to ``base_dir`` split into year/month/day partitions.
+
+    Rows are assigned to the London-local day of ``timestamp_column``; a frame
+    spanning several days produces one ``{filename_prefix}.parquet`` per day.
+    Partition columns are appended to the Arrow table, so ``df`` is not copied.
+    An empty frame is only written when ``write_empty`` is set, to the day
+    encoded in a trailing ``YYYY-DD-MM-HH-MM`` of ``filename_prefix``.
+
+    When ``schema`` is given the table is conformed to it (see
+    :func:`~metro_disruptions_intelligence.etl.schemas.table_from_frame`) and
+    written with the tuned options of
+    :func:`~metro_disruptions_intelligence.etl.schemas.parquet_write_options`;
+    empty frames then carry the same typed columns as non-empty ones.
+
+    Returns:
+    -------
+    list[Path]
+        Written files in chronological partition order.
+    """
+    if df.empty and not write_empty:
+        return []
+    if schema is None:
+        table = pa.Table.from_pandas(df)
+        options: dict = {}
+    else:
+        table = table_from_frame(df, schema)
+        options = parquet_write_options(schema)
+
+    if df.empty:
+        if schema is not None:
+            for name, type_ in PARTITION_FIELDS:
+                table = table.append_column(name, pa.nulls(0, type=type_))
+        out_dir = _partition_dir(base_dir, *_prefix_date(filename_prefix))
+        return [_write_table(table, out_dir, filename_prefix, options)]
+
+    keys = partition_keys(df[timestamp_column].to_numpy())
+    for i, (name, _) in enumerate(PARTITION_FIELDS):
+        table = table.append_column(name, pa.array(keys[:, i]))
+
+    unique, inverse = np.unique(keys, axis=0, return_inverse=True)
+    written = []
+    for i, (year, month, day) in enumerate(unique.tolist()):
+        part = table if len(unique) == 1 else table.filter(pa.array(inverse.ravel() == i))
+        out_dir = _partition_dir(base_dir, year, month, day)
+        written.append(_write_table(part, out_dir, filename_prefix, options))
+    return written
+
+
+def _write_table(table: pa.Table, out_dir: Path, filename_prefix: str, options: dict) -> Path:
+    out_dir.mkdir(parents=True, exist_ok=True)
+    out_file = out_dir / f"{filename_prefix}.parquet"
+    pq.write_table(table, out_file, **options)
+    # out_dir is <base_dir>/year=/month=/day=
+    record_parquet_write(out_file, out_dir.parents[2].name)
+    return out_file
+
+
+def _prefix_date(filename_prefix: str) -> tuple[int, int, int]:
+    m = re.search(r"(\d{4})-(\d{2})-(\d{2})-(\d{2})-(\d{2})$", filename_prefix)
+    if m:
+        return int(m.group(1)), int(m.group(3)), int(m.group(2))
+    # fallback to the current London date
+    now = datetime.now(london_table().tz)
+    return now.year, now.month, now.day
 
 
 def write_df_to_partitioned_parquet(
@@ -17,6 +117,7 @@ def write_df_to_partitioned_parquet(
     filename_prefix: str,
     timestamp_column: str = "snapshot_timestamp",
     write_empty: bool = False,
+    schema: pa.Schema | None = None,
 ) -> Path | None:
     """Write ``df`` to ``base_dir`` partitioned by year/month/day.
 
@@ -30,44 +131,20 @@ def write_df_to_partitioned_parquet(
         Base filename (without extension).
     timestamp_column:
         Column containing UNIX timestamps used for partitioning.
+    write_empty:
+        Write a file even when ``df`` has no rows.
+    schema:
+        Optional Arrow schema the written table is conformed to.
+
+    Frames spanning several London days are split across partitions by
+    :func:`write_df_to_partitions`.
 
     Returns:
     -------
     Optional[Path]
-        Path to the written file or ``None`` if ``df`` was empty.
+        Path to the first written file or ``None`` if ``df`` was empty.
     """
-    if df.empty and not write_empty:
-        return None
-
-    tz_london = pytz.timezone("Europe/London")
-
-    def to_dt(ts: int) -> datetime:
-        return datetime.fromtimestamp(int(ts), tz_london)
-
-    df2 = df.copy()
-    if not df2.empty:
-        df2["year"] = df2[timestamp_column].map(lambda ts: to_dt(ts).year)
-        df2["month"] = df2[timestamp_column].map(lambda ts: to_dt(ts).month)
-        df2["day"] = df2[timestamp_column].map(lambda ts: to_dt(ts).day)
-        year = int(df2["year"].iloc[0])
-        month = int(df2["month"].iloc[0])
-        day = int(df2["day"].iloc[0])
-    else:
-        import re
-
-        m = re.search(r"(\d{4})-(\d{2})-(\d{2})-(\d{2})-(\d{2})$", filename_prefix)
-        if m:
-            year = int(m.group(1))
-            day = int(m.group(2))
-            month = int(m.group(3))
-        else:
-            # fallback to current UTC date
-            now = datetime.now(tz_london)
-            year = now.year
-            month = now.month
-            day = now.day
-    out_dir = base_dir / f"year={year:04d}" / f"month={month:02d}" / f"day={day:02d}"
-    out_dir.mkdir(parents=True, exist_ok=True)
-    out_file = out_dir / f"{filename_prefix}.parquet"
-    pq.write_table(pa.Table.from_pandas(df2), out_file)
-    return out_file
+    written = write_df_to_partitions(
+        df, base_dir, filename_prefix, timestamp_column, write_empty=write_empty, schema=schema
+    )
+    return written[0] if written else None
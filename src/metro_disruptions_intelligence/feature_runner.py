@@ -0,0 +1,248 @@
+"""Batch generation of per-minute feature snapshots with builder checkpoints."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .features import (
+    SnapshotFeatureBuilder,
+    build_route_map,
+    checkpoint_path,
+    find_checkpoint,
+    read_checkpoint,
+    snapshot_frame,
+    write_features,
+)
+from .ledger import RunLedger, feature_facts
+from .processed_reader import compose_path, discover_all_snapshot_minutes, snapshot_path
+from .timetable import StaticTimetable
+
+logger = logging.getLogger(__name__)
+
+INPUT_FEEDS = ("trip_updates", "vehicle_positions")
+MANIFEST_NAME = "_manifest.json"
+
+
+def file_fingerprint(path: Path, previous: list | None = None) -> list:
+    """Return ``[size, mtime_ns, digest]`` for ``path``.
+
+    The content digest is reused from ``previous`` when size and modification
+    time are unchanged, so unchanged files are never re-read.
+    """
+    st = path.stat()
+    if previous is not None and previous[:2] == [st.st_size, st.st_mtime_ns]:
+        return previous
+    digest = hashlib.blake2b(path.read_bytes(), digest_size=16).hexdigest()
+    return [st.st_size, st.st_mtime_ns, digest]
+
+
+class SnapshotManifest:
+    """Input fingerprints of materialised feature snapshots.
+
+    One ``_manifest.json`` per output day partition maps each snapshot epoch to
+    the fingerprints of the trip update and vehicle position files it was
+    built from.
+    """
+
+    def __init__(self, output_root: Path, processed_root: Path) -> None:
+        """Track snapshots under ``output_root`` built from ``processed_root``."""
+        self.output_root = output_root
+        self.processed_root = processed_root
+        self._days: dict[Path, dict[str, dict[str, list]]] = {}
+        self._changed_days: set[Path] = set()
+        self._current: dict[int, dict[str, list]] = {}
+
+    def _entries(self, ts: int) -> tuple[Path, dict[str, dict[str, list]]]:
+        path = snapshot_path(ts, self.output_root).parent / MANIFEST_NAME
+        if path not in self._days:
+            self._days[path] = json.loads(path.read_text()) if path.exists() else {}
+        return path, self._days[path]
+
+    def is_stale(self, ts: int) -> bool:
+        """Return ``True`` if snapshot ``ts`` is missing or its inputs changed.
+
+        Minutes without both input files are never stale since no snapshot is
+        produced for them.
+        """
+        inputs = {feed: compose_path(ts, self.processed_root, feed) for feed in INPUT_FEEDS}
+        if not all(p.exists() for p in inputs.values()):
+            return False
+        _, entries = self._entries(ts)
+        stored = entries.get(str(ts), {})
+        current = {feed: file_fingerprint(p, stored.get(feed)) for feed, p in inputs.items()}
+        self._current[ts] = current
+        if not snapshot_path(ts, self.output_root).exists():
+            return True
+        return any(stored.get(feed, [None] * 3)[2] != fp[2] for feed, fp in current.items())
+
+    def record(self, ts: int) -> None:
+        """Store the input fingerprints of the snapshot just written for ``ts``."""
+        current = self._current.pop(ts, None)
+        if current is None:
+            current = {
+                feed: file_fingerprint(compose_path(ts, self.processed_root, feed))
+                for feed in INPUT_FEEDS
+            }
+        path, entries = self._entries(ts)
+        entries[str(ts)] = current
+        self._changed_days.add(path)
+
+    def save(self) -> None:
+        """Write the manifests of all day partitions touched by :meth:`record`."""
+        for path in sorted(self._changed_days):
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_name(path.name + ".tmp")
+            tmp.write_text(json.dumps(self._days[path], sort_keys=True))
+            os.replace(tmp, path)
+        self._changed_days.clear()
+
+
+def _same_state(a: dict[str, np.ndarray], b: dict[str, np.ndarray]) -> bool:
+    b = {k: v for k, v in b.items() if k != "ts"}
+    if a.keys() != b.keys():
+        return False
+    for key, value in a.items():
+        other = b[key]
+        if value.dtype.kind == "f":
+            if not np.array_equal(value, other, equal_nan=True):
+                return False
+        elif not np.array_equal(value, other):
+            return False
+    return True
+
+
+def _read_minute(ts: int, processed_root: Path) -> tuple[pd.DataFrame, pd.DataFrame] | None:
+    tu_file = compose_path(ts, processed_root, "trip_updates")
+    vp_file = compose_path(ts, processed_root, "vehicle_positions")
+    if not tu_file.exists() or not vp_file.exists():
+        if not tu_file.exists():
+            logger.warning("trip_updates file missing for %s", ts)
+        if not vp_file.exists():
+            logger.warning("vehicle_positions file missing for %s", ts)
+        return None
+    trip_now = pd.read_parquet(tu_file)
+    veh_now = pd.read_parquet(vp_file)
+    if veh_now.empty:
+        logger.warning("vehicle_positions file %s contains no rows", vp_file)
+    return trip_now, veh_now
+
+
+def generate_features(
+    processed_root: Path,
+    output_root: Path,
+    *,
+    start_ts: int | None = None,
+    end_ts: int | None = None,
+    checkpoint_dir: Path | None = None,
+    checkpoint_every: int = 60,
+    incremental: bool = False,
+    static_dir: Path | None = None,
+    ledger: RunLedger | None = None,
+) -> int:
+    """Write feature snapshots for processed minutes between ``start_ts`` and ``end_ts``.
+
+    When ``checkpoint_dir`` is given the builder state is saved there every
+    ``checkpoint_every`` minutes and after the last minute. A run starting at
+    ``start_ts`` restores the latest checkpoint taken before it and replays the
+    minutes in between without writing them, so rolling features match a run
+    over the whole day.
+
+    With ``incremental`` only snapshots whose inputs changed (or that were
+    never written) are rebuilt, together with the later minutes depending on
+    them through the rolling state. Recomputation starts at the first stale
+    minute and stops once the builder state matches a stored checkpoint with
+    no stale minutes left.
+
+    ``static_dir`` points at the output of ``ingest-static``; its timetable
+    adds the schedule-aware features of :class:`SnapshotFeatureBuilder`.
+
+    Every written snapshot appends a ``features`` row to ``ledger``.
+
+    Returns the number of snapshots written.
+    """
+    timetable = StaticTimetable(static_dir) if static_dir is not None else None
+    builder = SnapshotFeatureBuilder(build_route_map(processed_root), timetable=timetable)
+    minutes = discover_all_snapshot_minutes(processed_root)
+    if end_ts is not None:
+        minutes = [m for m in minutes if m <= end_ts]
+
+    write_from = start_ts
+    last_stale: int | None = None
+    manifest: SnapshotManifest | None = None
+    if incremental:
+        manifest = SnapshotManifest(output_root, processed_root)
+        stale = [m for m in minutes if (start_ts is None or m >= start_ts) and manifest.is_stale(m)]
+        if not stale:
+            logger.info("All feature snapshots in %s are up to date", output_root)
+            return 0
+        write_from, last_stale = stale[0], stale[-1]
+        logger.info("%d stale snapshots; rebuilding from %s", len(stale), write_from)
+
+    warmup_from = start_ts
+    last_saved: int | None = None
+    if checkpoint_dir is not None and write_from is not None:
+        ckpt = find_checkpoint(checkpoint_dir, write_from)
+        if ckpt is None:
+            logger.info("No checkpoint before %s in %s; starting cold", write_from, checkpoint_dir)
+        else:
+            warmup_from = builder.load_checkpoint(ckpt) + 1
+            last_saved = warmup_from - 1
+    if warmup_from is not None:
+        minutes = [m for m in minutes if m >= warmup_from]
+
+    written = 0
+    last_ts: int | None = None
+    for ts in minutes:
+        frames = _read_minute(ts, processed_root)
+        if frames is None:
+            continue
+        start = time.perf_counter()
+        feats = snapshot_frame(builder, *frames, ts)
+        last_ts = ts
+        if write_from is None or ts >= write_from:
+            out_file = snapshot_path(ts, output_root)
+            write_features(feats, out_file)
+            written += 1
+            if ledger is not None:
+                ledger.record(
+                    "features",
+                    ts,
+                    time.perf_counter() - start,
+                    bytes_written=out_file.stat().st_size,
+                    **feature_facts(builder, *frames, feats),
+                )
+            if manifest is not None:
+                manifest.record(ts)
+        if checkpoint_dir is None:
+            continue
+        stored = checkpoint_path(ts, checkpoint_dir)
+        if write_from is not None and ts >= write_from and stored.exists():
+            # checkpoints from earlier runs are refreshed or prove convergence
+            if _same_state(builder.state_arrays(), read_checkpoint(stored)):
+                last_saved = ts
+                if last_stale is not None and ts >= last_stale:
+                    logger.info("Builder state converged at %s; later snapshots unchanged", ts)
+                    break
+                continue
+            builder.save_checkpoint(stored, ts)
+            last_saved = ts
+        elif last_saved is None:
+            last_saved = ts
+        elif ts - last_saved >= checkpoint_every * 60:
+            builder.save_checkpoint(stored, ts)
+            last_saved = ts
+
+    if checkpoint_dir is not None and last_ts is not None and last_ts != last_saved:
+        builder.save_checkpoint(checkpoint_path(last_ts, checkpoint_dir), last_ts)
+    if manifest is not None:
+        manifest.save()
+    logger.info("Wrote %d feature snapshots to %s", written, output_root)
+    return written
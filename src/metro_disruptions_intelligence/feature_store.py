@@ -0,0 +1,80 @@
+"""Daily station-feature store compacted from per-minute snapshots.
+
+Per-minute snapshots (``stations_feats/year=/month=/day=/stations_feats_*.parquet``)
+suit the streaming writers but make long station histories open one file per
+minute. :func:`build_feature_store` rewrites each UTC day into a single file
+under ``stations_daily/`` sorted by ``(stop_id, direction_id,
+snapshot_timestamp)``. Row groups then cover a small contiguous block of
+stations, so the ``stop_id`` statistics let readers skip everything but the
+requested station; see :func:`~metro_disruptions_intelligence.processed_reader.read_station_series`.
+"""
+
+from __future__ import annotations
+
+import logging
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from .etl.schemas import parquet_write_options
+from .processed_reader import _partition_day_start, daily_features_path
+
+logger = logging.getLogger(__name__)
+
+SORT_KEYS = [
+    ("stop_id", "ascending"),
+    ("direction_id", "ascending"),
+    ("snapshot_timestamp", "ascending"),
+]
+# about 20 station-directions of a full day of minutes per row group
+ROW_GROUP_ROWS = 32_768
+
+
+def _day_dirs(features_root: Path) -> list[Path]:
+    return sorted((features_root / "stations_feats").glob("year=*/month=*/day=*"))
+
+
+def compact_feature_day(day_dir: Path, out_root: Path) -> Path | None:
+    """Write the minute snapshots in ``day_dir`` as one sorted daily file below ``out_root``.
+
+    Returns the written path, or ``None`` when the day holds no snapshots.
+    """
+    files = sorted(day_dir.glob("stations_feats_*.parquet"))
+    if not files:
+        return None
+    table = pa.concat_tables([pq.read_table(f) for f in files], promote_options="default")
+    table = table.sort_by(SORT_KEYS)
+    out_file = daily_features_path(_partition_day_start(day_dir), out_root)
+    out_file.parent.mkdir(parents=True, exist_ok=True)
+    tmp = out_file.with_name(out_file.name + ".tmp")
+    pq.write_table(table, tmp, row_group_size=ROW_GROUP_ROWS, **parquet_write_options(table.schema))
+    tmp.replace(out_file)
+    logger.info("Compacted %d snapshots into %s rows=%d", len(files), out_file, len(table))
+    return out_file
+
+
+def build_feature_store(
+    features_root: Path,
+    out_root: Path | None = None,
+    *,
+    start_ts: int | None = None,
+    end_ts: int | None = None,
+) -> list[Path]:
+    """Compact every UTC day of snapshots under ``features_root``.
+
+    Days are limited to those overlapping ``start_ts``/``end_ts`` when given.
+    Daily files are written below ``out_root`` (default ``features_root``).
+    """
+    out_root = features_root if out_root is None else out_root
+    written = []
+    for day_dir in _day_dirs(features_root):
+        day_start = _partition_day_start(day_dir)
+        if start_ts is not None and day_start + 86_400 <= start_ts:
+            continue
+        if end_ts is not None and day_start > end_ts:
+            continue
+        path = compact_feature_day(day_dir, out_root)
+        if path is not None:
+            written.append(path)
+    return written
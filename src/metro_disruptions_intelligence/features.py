@@ -2,14 +2,26 @@
 
 from __future__ import annotations
 
+import json
 import logging
+import os
+import time
 from collections import defaultdict, deque
 from pathlib import Path
+from typing import TYPE_CHECKING
 
 import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 
-from .utils_gtfsrt import CONSTANTS, is_new_service_day, sydney_time
+from .etl.schemas import parquet_write_options
+from .metrics import LAG_BUCKETS, REGISTRY, record_parquet_write
+from .time_context import sydney_context, sydney_table
+from .utils_gtfsrt import CONSTANTS
+
+if TYPE_CHECKING:
+    from .timetable import StaticTimetable
 
 # Sydney Metro stop_ids for Central station
 CENTRAL_STOP_IDS = {
@@ -26,6 +38,62 @@ CENTRAL_STOP_IDS = {
 
 logger = logging.getLogger(__name__)
 
+CHECKPOINT_VERSION = 1
+
+# RollingState attributes holding optional epoch seconds, stored as NaN when unset
+_OPTIONAL_TIMES = (
+    "last_actual_arrival",
+    "last_sched_arrival",
+    "last_actual_depart",
+    "last_vehicle_ts",
+)
+_WINDOWS = ("rolling_delay_5", "rolling_delay_15", "rolling_headway_60")
+
+# Storage types of persisted feature snapshots; ``local_dt`` is not stored and
+# is restored from ``snapshot_timestamp`` by :func:`read_features`.
+FEATURE_SCHEMA = pa.schema([
+    ("stop_id", pa.string()),
+    ("direction_id", pa.int8()),
+    ("route_id", pa.string()),
+    ("arrival_delay_t", pa.float32()),
+    ("departure_delay_t", pa.float32()),
+    ("headway_t", pa.float32()),
+    ("rel_headway_t", pa.float32()),
+    ("dwell_delta_t", pa.float32()),
+    ("delay_arrival_grad_t", pa.float32()),
+    ("delay_departure_grad_t", pa.float32()),
+    ("upstream_delay_mean_2", pa.float32()),
+    ("downstream_delay_max_2", pa.float32()),
+    ("delay_mean_5", pa.float32()),
+    ("delay_std_5", pa.float32()),
+    ("delay_mean_15", pa.float32()),
+    ("headway_p90_60", pa.float32()),
+    ("sin_hour", pa.float32()),
+    ("cos_hour", pa.float32()),
+    ("day_type", pa.int8()),
+    ("node_degree", pa.int16()),
+    ("hub_flag", pa.int8()),
+    ("congestion_level", pa.float32()),
+    ("occupancy_status", pa.float32()),
+    ("central_flag", pa.int8()),
+    ("is_train_present", pa.int8()),
+    ("data_fresh_secs", pa.float32()),
+    # only produced when the builder has a static timetable
+    ("sched_headway_t", pa.float32()),
+    ("next_sched_gap_t", pa.float32()),
+    ("missing_trips_t", pa.int16()),
+    ("snapshot_timestamp", pa.int64()),
+])
+
+
+def _lag_histogram(feed: str):
+    return REGISTRY.histogram(
+        "mdi_feed_lag_seconds",
+        "Age of realtime messages at the snapshot consuming them",
+        LAG_BUCKETS,
+        feed=feed,
+    )
+
 
 class RollingState:
     """Container for per-station rolling information."""
@@ -63,9 +131,16 @@ class SnapshotFeatureBuilder:
         *,
         log_every: int | None = 60,
         dynamic_lag: bool = True,
+        timetable: StaticTimetable | None = None,
     ) -> None:
-        """Create the builder from a mapping of route and direction to stop lists."""
+        """Create the builder from a mapping of route and direction to stop lists.
+
+        With a ``timetable`` the builder adds ``sched_headway_t``,
+        ``next_sched_gap_t`` and ``missing_trips_t`` and takes the scheduled
+        headway of ``rel_headway_t`` from the static timetable.
+        """
         self.route_dir_to_stops = route_dir_to_stops
+        self.timetable = timetable
         self._state: dict[tuple[str, int], RollingState] = {}
         for (_route, direction), stops in route_dir_to_stops.items():
             for stop in stops:
@@ -78,6 +153,20 @@ class SnapshotFeatureBuilder:
         self.LAG_VP_SECS = self.LAG_VP_MIN_SECS
         self._lag_hist_tu: deque[int] = deque(maxlen=self.LAG_HISTORY_MIN)
         self._lag_hist_vp: deque[int] = deque(maxlen=self.LAG_HISTORY_MIN)
+        # trip updates of the latest snapshot outside the future window
+        self.last_dropped = 0
+
+    def add_routes(self, route_dir_to_stops: dict[tuple[str, int], list[str]]) -> None:
+        """Register stop sequences not present in the original route map.
+
+        Existing rolling state and stop sequences are preserved; only unseen
+        routes and ``(stop, direction)`` keys are added. Graph metrics are recomputed.
+        """
+        for route_key, stops in route_dir_to_stops.items():
+            self.route_dir_to_stops.setdefault(route_key, list(stops))
+            for stop in stops:
+                self._state.setdefault((stop, route_key[1]), RollingState())
+        self._build_graph()
 
     def _build_graph(self) -> None:
         """Build node degree and hub flag graphs from the stop sequences."""
@@ -95,12 +184,8 @@ class SnapshotFeatureBuilder:
 
     def _time_features(self, ts: int) -> tuple[float, float, int]:
         """Return cyclic time-of-day features and day type."""
-        t = sydney_time(ts)
-        angle = 2 * np.pi * t.hour / 24
-        sin_hour = np.sin(angle)
-        cos_hour = np.cos(angle)
-        day_type = int(t.weekday() >= 5)
-        return sin_hour, cos_hour, day_type
+        ctx = sydney_context(ts)
+        return ctx.sin_hour, ctx.cos_hour, ctx.day_type
 
     def _empty_feature_row(self, row: pd.Series, key: tuple[str, int]) -> dict:
         """Return a gap feature row filled with NaNs."""
@@ -138,7 +223,34 @@ class SnapshotFeatureBuilder:
         self, trip_updates: pd.DataFrame, vehicles: pd.DataFrame, ts: int
     ) -> pd.DataFrame:
         """Create a feature frame for one snapshot."""
-        local_dt = sydney_time(ts)
+        start = time.perf_counter()
+        feats = self._build_snapshot_features(trip_updates, vehicles, ts)
+        if self.timetable is not None:
+            feats = self._add_timetable_features(feats, trip_updates, ts)
+        REGISTRY.histogram(
+            "mdi_feature_build_seconds", "Time to build the features of one snapshot"
+        ).observe(time.perf_counter() - start)
+        return feats
+
+    def _add_timetable_features(
+        self, feats: pd.DataFrame, trip_updates: pd.DataFrame, ts: int
+    ) -> pd.DataFrame:
+        """Add the gap to the next scheduled train and the count of unreported trips."""
+        index = self.timetable.index_for(ts)
+        observed = trip_updates.loc[trip_updates["snapshot_timestamp"] <= ts, "trip_id"]
+        missing = index.missing_trips(ts, self.MAX_FUTURE_SECS, observed)
+        frame = feats if "stop_id" in feats.columns else feats.index.to_frame(index=False)
+        keys = list(zip(frame["stop_id"], frame["direction_id"].astype(int)))
+        if "sched_headway_t" not in feats.columns:
+            feats["sched_headway_t"] = np.nan
+        feats["next_sched_gap_t"] = [index.next_scheduled_gap(k, ts) for k in keys]
+        feats["missing_trips_t"] = [missing.get(k, 0) for k in keys]
+        return feats
+
+    def _build_snapshot_features(
+        self, trip_updates: pd.DataFrame, vehicles: pd.DataFrame, ts: int
+    ) -> pd.DataFrame:
+        local_dt = sydney_context(ts).local_dt
         sin_hour, cos_hour, day_type = self._time_features(ts)
 
         if "snapshot_timestamp" not in trip_updates.columns:
@@ -146,9 +258,12 @@ class SnapshotFeatureBuilder:
         if "snapshot_timestamp" not in vehicles.columns:
             raise KeyError("'snapshot_timestamp' column missing from vehicle_positions")
 
-        logger.debug(
-            "ts=%s \u2192 total TUs=%d", local_dt.strftime("%Y-%m-%d %H:%M"), len(trip_updates)
-        )
+        self.last_dropped = 0
+        debug = logger.isEnabledFor(logging.DEBUG)
+        if debug:
+            logger.debug(
+                "ts=%s \u2192 total TUs=%d", local_dt.strftime("%Y-%m-%d %H:%M"), len(trip_updates)
+            )
 
         if trip_updates.empty:
             empty_rows = [
@@ -175,15 +290,17 @@ class SnapshotFeatureBuilder:
         if missing:
             logger.warning("Found new stop/direction keys not in route_map: %s", missing)
 
-        # ── DEBUG: log how far behind each TU message is ──────────────
+        # how far behind each TU message is
         diffs = ts - trip_updates["snapshot_timestamp"]
-        logger.debug(
-            "snapshot %s: TU lag range = [%d, %d] sec (LAG_TU_SECS=%d)",
-            local_dt.strftime("%Y-%m-%d %H:%M"),
-            int(diffs.min()),
-            int(diffs.max()),
-            self.LAG_TU_SECS,
-        )
+        _lag_histogram("trip_updates").observe_many(diffs)
+        if debug:
+            logger.debug(
+                "snapshot %s: TU lag range = [%d, %d] sec (LAG_TU_SECS=%d)",
+                local_dt.strftime("%Y-%m-%d %H:%M"),
+                int(diffs.min()),
+                int(diffs.max()),
+                self.LAG_TU_SECS,
+            )
         if self._dynamic_lag:
             self._lag_hist_tu.extend(diffs.clip(lower=0).astype(int))
 
@@ -201,17 +318,19 @@ class SnapshotFeatureBuilder:
         mask = (arr_time >= ts - 1) & (arr_diffs <= window + 1)
 
         dropped = (~mask).sum()
+        self.last_dropped = int(dropped)
         tu_future = tu_now[mask].copy()
-        logger.debug(
-            " After lag removal: tu_now=%d \u2192 future_masked=%d", len(tu_now), len(tu_future)
-        )
-        logger.debug(
-            " Future-window diffs range=[%.1f, %.1f]; used_window=%d dropped=%d",
-            arr_diffs.min(),
-            arr_diffs.max(),
-            window,
-            dropped,
-        )
+        if debug:
+            logger.debug(
+                " After lag removal: tu_now=%d \u2192 future_masked=%d", len(tu_now), len(tu_future)
+            )
+            logger.debug(
+                " Future-window diffs range=[%.1f, %.1f]; used_window=%d dropped=%d",
+                arr_diffs.min(),
+                arr_diffs.max(),
+                window,
+                dropped,
+            )
         tu_future["arrival_delay"] = tu_future["arrival_delay"].fillna(0.0)
         tu_future["departure_delay"] = tu_future["departure_delay"].fillna(0.0)
 
@@ -262,9 +381,10 @@ class SnapshotFeatureBuilder:
         grouped["dwell"] = grouped["departure_time"] - grouped["arrival_time"]
         grouped["sched_dwell"] = grouped["sched_dep"] - grouped["sched_arr"]
 
+        vp_diffs = ts - vehicles["snapshot_timestamp"]
+        _lag_histogram("vehicle_positions").observe_many(vp_diffs)
         if self._dynamic_lag:
             if not vehicles.empty:
-                vp_diffs = ts - vehicles["snapshot_timestamp"]
                 self._lag_hist_vp.extend(vp_diffs.clip(lower=0).astype(int))
             if self._lag_hist_tu:
                 tu_p95 = int(np.percentile(self._lag_hist_tu, 95))
@@ -273,12 +393,28 @@ class SnapshotFeatureBuilder:
                 vp_p95 = int(np.percentile(self._lag_hist_vp, 95))
                 self.LAG_VP_SECS = max(self.LAG_VP_MIN_SECS, vp_p95 + self.LAG_BUFFER_SECS)
             logger.debug("lag_tolerance adjusted: TU=%d VP=%d", self.LAG_TU_SECS, self.LAG_VP_SECS)
+            tolerances = {"trip_updates": self.LAG_TU_SECS, "vehicle_positions": self.LAG_VP_SECS}
+            for feed, secs in tolerances.items():
+                REGISTRY.gauge(
+                    "mdi_lag_tolerance_seconds", "Accepted realtime message lag", feed=feed
+                ).set(secs)
 
         vp_recent = vehicles[
             (vehicles["snapshot_timestamp"] <= ts)
             & (vehicles["snapshot_timestamp"] >= ts - self.LAG_VP_SECS)
         ]
-        for _, row in grouped.iterrows():
+        index = self.timetable.index_for(ts) if self.timetable is not None else None
+        sydney = sydney_table()
+        prev_arrival = [
+            getattr(self._state.get((stop, int(direction))), "last_actual_arrival", None)
+            for stop, direction in zip(grouped["stop_id"], grouped["direction_id"])
+        ]
+        new_service_day = sydney.is_new_service_day(
+            np.array(prev_arrival, dtype=float),
+            grouped["arrival_time"].to_numpy(dtype=float),
+            self.RESET_AT_HOUR,
+        )
+        for i, (_, row) in enumerate(grouped.iterrows()):
             key = (row["stop_id"], int(row["direction_id"]))
             state = self._state[key]
 
@@ -298,17 +434,13 @@ class SnapshotFeatureBuilder:
                 feats.append(self._empty_feature_row(row, key))
                 continue
 
-            if is_new_service_day(
-                state.last_actual_arrival, row["arrival_time"], self.RESET_AT_HOUR
-            ):
+            if new_service_day[i]:
                 logger.info(
                     "Service day reset for %s/%d: %s -> %s",
                     key[0],
                     key[1],
-                    sydney_time(state.last_actual_arrival).strftime("%Y-%m-%d %H:%M")
-                    if state.last_actual_arrival
-                    else None,
-                    sydney_time(row["arrival_time"]).strftime("%Y-%m-%d %H:%M"),
+                    sydney.local_datetime(state.last_actual_arrival).strftime("%Y-%m-%d %H:%M"),
+                    sydney.local_datetime(row["arrival_time"]).strftime("%Y-%m-%d %H:%M"),
                 )
                 state.__init__()
 
@@ -322,10 +454,20 @@ class SnapshotFeatureBuilder:
                 headway = row["arrival_time"] - state.last_actual_arrival
                 if headway <= 0 or headway > self.MAX_HEADWAY_SECS:
                     headway = np.nan
-                elif state.last_sched_arrival is not None:
+                elif index is None and state.last_sched_arrival is not None:
                     sched_hw = row["sched_arr"] - state.last_sched_arrival
                     if sched_hw:
                         rel_headway = headway / sched_hw
+            if index is not None:
+                # the timetable gap to the previous scheduled train, so a
+                # cancelled train in between doubles rel_headway_t
+                sched_hw, prev_sched = index.scheduled_headway(key, row["sched_arr"])
+                if sched_hw > 0 and not np.isnan(headway):
+                    rel_headway = headway / sched_hw
+                elif sched_hw > 0 and state.last_actual_arrival is None:
+                    # no realtime arrival to compare with: measure from the
+                    # previous scheduled arrival instead
+                    rel_headway = (row["arrival_time"] - prev_sched) / sched_hw
             dwell_delta = row["dwell"] - row["sched_dwell"]
             delay_arr_grad = row["arrival_delay"] - state.last_arr_delay
             delay_dep_grad = row["departure_delay"] - state.last_dep_delay
@@ -413,6 +555,7 @@ class SnapshotFeatureBuilder:
                 "central_flag": int(row["stop_id"] in CENTRAL_STOP_IDS),
                 "is_train_present": is_present,
                 "data_fresh_secs": data_fresh,
+                **({"sched_headway_t": sched_hw} if index is not None else {}),
                 "local_dt": local_dt,
             })
 
@@ -444,14 +587,209 @@ class SnapshotFeatureBuilder:
 
         return df
 
+    # ------------------------------------------------------------------
+    def state_arrays(self) -> dict[str, np.ndarray]:
+        """Return the rolling state as flat NumPy arrays.
+
+        One row per ``(stop_id, direction_id)`` key in sorted order; unset
+        timestamps are ``NaN`` and the rolling windows are right-padded with
+        their fill lengths stored alongside.
+        """
+        keys = sorted(self._state)
+        states = [self._state[k] for k in keys]
+        arrays: dict[str, np.ndarray] = {
+            "version": np.array(CHECKPOINT_VERSION),
+            "route_map": np.array(
+                json.dumps(
+                    [
+                        [str(r), int(d), [str(s) for s in stops]]
+                        for (r, d), stops in self.route_dir_to_stops.items()
+                    ]
+                )
+            ),
+            "stop_id": np.array([k[0] for k in keys], dtype=str),
+            "direction_id": np.array([k[1] for k in keys], dtype=np.int64),
+            "last_arr_delay": np.array([s.last_arr_delay for s in states], dtype=float),
+            "last_dep_delay": np.array([s.last_dep_delay for s in states], dtype=float),
+            "last_trip_id": np.array([s.last_trip_id or "" for s in states], dtype=str),
+            "has_trip_id": np.array([s.last_trip_id is not None for s in states]),
+            "lag_hist_tu": np.array(self._lag_hist_tu, dtype=np.int64),
+            "lag_hist_vp": np.array(self._lag_hist_vp, dtype=np.int64),
+            "lag_secs": np.array([self.LAG_TU_SECS, self.LAG_VP_SECS], dtype=np.int64),
+            "multi_routes": np.array(self._multi_routes),
+        }
+        for attr in _OPTIONAL_TIMES:
+            arrays[attr] = np.array(
+                [np.nan if getattr(s, attr) is None else getattr(s, attr) for s in states],
+                dtype=float,
+            )
+        for attr in _WINDOWS:
+            width = getattr(RollingState(), attr).maxlen
+            window = np.full((len(states), width), np.nan)
+            lengths = np.zeros(len(states), dtype=np.int8)
+            for i, s in enumerate(states):
+                values = getattr(s, attr)
+                window[i, : len(values)] = values
+                lengths[i] = len(values)
+            arrays[attr] = window
+            arrays[f"{attr}_len"] = lengths
+        return arrays
+
+    def load_state_arrays(self, arrays: dict[str, np.ndarray]) -> None:
+        """Restore rolling state produced by :meth:`state_arrays`.
+
+        Routes stored in the checkpoint but missing from the current route map
+        are added, so the builder continues exactly where the checkpoint left off.
+        """
+        if int(arrays["version"]) != CHECKPOINT_VERSION:
+            raise ValueError(f"Unsupported checkpoint version {int(arrays['version'])}")
+        stored_routes = {(r, int(d)): stops for r, d, stops in json.loads(str(arrays["route_map"]))}
+        self.add_routes(stored_routes)
+
+        for i, (stop, direction) in enumerate(
+            zip(arrays["stop_id"].tolist(), arrays["direction_id"].tolist())
+        ):
+            state = self._state.setdefault((stop, direction), RollingState())
+            state.last_arr_delay = float(arrays["last_arr_delay"][i])
+            state.last_dep_delay = float(arrays["last_dep_delay"][i])
+            state.last_trip_id = (
+                str(arrays["last_trip_id"][i]) if arrays["has_trip_id"][i] else None
+            )
+            for attr in _OPTIONAL_TIMES:
+                value = float(arrays[attr][i])
+                setattr(state, attr, None if np.isnan(value) else value)
+            for attr in _WINDOWS:
+                window = getattr(state, attr)
+                window.clear()
+                window.extend(arrays[attr][i, : int(arrays[f"{attr}_len"][i])].tolist())
+
+        self._lag_hist_tu.clear()
+        self._lag_hist_tu.extend(arrays["lag_hist_tu"].tolist())
+        self._lag_hist_vp.clear()
+        self._lag_hist_vp.extend(arrays["lag_hist_vp"].tolist())
+        self.LAG_TU_SECS, self.LAG_VP_SECS = (int(v) for v in arrays["lag_secs"])
+        self._multi_routes = bool(arrays["multi_routes"])
+
+    def save_checkpoint(self, path: Path, ts: int) -> Path:
+        """Write the state after snapshot ``ts`` to the compressed ``.npz`` file ``path``."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, "wb") as fh:
+            np.savez_compressed(fh, ts=np.array(ts, dtype=np.int64), **self.state_arrays())
+        os.replace(tmp, path)
+        logger.debug("Saved builder checkpoint %s", path)
+        return path
+
+    def load_checkpoint(self, path: Path) -> int:
+        """Restore state from ``path`` and return the snapshot timestamp it was taken at."""
+        arrays = read_checkpoint(path)
+        self.load_state_arrays(arrays)
+        logger.info("Restored builder checkpoint %s", path)
+        return int(arrays["ts"])
+
+
+def checkpoint_path(ts: int, root: Path) -> Path:
+    """Return the builder checkpoint path for the state after snapshot ``ts``."""
+    return root / f"builder_{ts}.npz"
+
+
+def read_checkpoint(path: Path) -> dict[str, np.ndarray]:
+    """Return the arrays stored in the checkpoint ``path``."""
+    with np.load(path, allow_pickle=False) as data:
+        return {k: data[k] for k in data.files}
+
+
+def find_checkpoint(root: Path, before_ts: int) -> Path | None:
+    """Return the most recent checkpoint in ``root`` taken before ``before_ts``."""
+    best: tuple[int, Path] | None = None
+    for path in root.glob("builder_*.npz"):
+        try:
+            ts = int(path.stem.split("_", 1)[1])
+        except ValueError:
+            continue
+        if ts < before_ts and (best is None or ts > best[0]):
+            best = (ts, path)
+    return best[1] if best else None
+
+
+def snapshot_frame(
+    builder: SnapshotFeatureBuilder, trip_now: pd.DataFrame, veh_now: pd.DataFrame, ts: int
+) -> pd.DataFrame:
+    """Return the flat feature frame persisted for snapshot ``ts``."""
+    feats = builder.build_snapshot_features(trip_now, veh_now, ts)
+    feats = feats.reset_index()
+    feats["snapshot_timestamp"] = ts
+    return feats
+
+
+def feature_table(feats: pd.DataFrame) -> pa.Table:
+    """Return ``feats`` as an Arrow table using the compact :data:`FEATURE_SCHEMA` types.
+
+    ``local_dt`` is dropped; columns unknown to the schema keep their inferred type.
+    """
+    fields, arrays = [], []
+    for name in feats.columns:
+        if name == "local_dt":
+            continue
+        idx = FEATURE_SCHEMA.get_field_index(name)
+        type_ = FEATURE_SCHEMA.field(idx).type if idx >= 0 else None
+        arr = pa.array(feats[name], type=type_, from_pandas=True)
+        fields.append(pa.field(name, arr.type))
+        arrays.append(arr)
+    return pa.Table.from_arrays(arrays, schema=pa.schema(fields))
+
 
 def write_features(feats: pd.DataFrame, out_file: Path) -> None:
     """Write ``feats`` to ``out_file`` overwriting any existing file."""
     out_file.parent.mkdir(parents=True, exist_ok=True)
-    feats.to_parquet(out_file, compression="snappy", index=False)
+    table = feature_table(feats)
+    pq.write_table(table, out_file, **parquet_write_options(table.schema))
+    record_parquet_write(out_file, "stations_feats")
     logger.info("Wrote %s rows=%d", out_file, len(feats))
 
 
+def read_features(
+    path: Path, columns: list[str] | None = None, filters: list[tuple] | None = None
+) -> pd.DataFrame:
+    """Read a feature snapshot written by :func:`write_features` as the builder produced it.
+
+    Compact storage types are widened back to ``float64``/``int64`` and the
+    per-row ``local_dt`` (Sydney time) is restored from ``snapshot_timestamp``.
+    Snapshots written before the compact schema are returned unchanged.
+    ``filters`` are passed to :func:`pyarrow.parquet.read_table`, which skips
+    row groups whose statistics exclude them.
+    """
+    read_cols = columns
+    if columns is not None and "local_dt" in columns:
+        read_cols = [c for c in columns if c != "local_dt"]
+        if "snapshot_timestamp" not in read_cols:
+            read_cols.append("snapshot_timestamp")
+    df = pq.read_table(path, columns=read_cols, filters=filters).to_pandas()
+    for name in df.columns:
+        dtype = df[name].dtype
+        if dtype == np.float32:
+            df[name] = df[name].astype(np.float64)
+        elif dtype in (np.int8, np.int16, np.int32):
+            df[name] = df[name].astype(np.int64)
+    if "local_dt" not in df.columns and "snapshot_timestamp" in df.columns:
+        local_dt = pd.to_datetime(df["snapshot_timestamp"], unit="s", utc=True)
+        df.insert(
+            df.columns.get_loc("snapshot_timestamp"),
+            "local_dt",
+            local_dt.dt.tz_convert("Australia/Sydney"),
+        )
+    return df if columns is None else df[columns]
+
+
+def route_map_from_frame(trip_updates: pd.DataFrame) -> dict[tuple[str, int], list[str]]:
+    """Return the ordered stop list per ``(route_id, direction_id)`` in ``trip_updates``."""
+    cols = ["route_id", "direction_id", "stop_id", "stop_sequence"]
+    df = trip_updates[cols].drop_duplicates()
+    df = df.sort_values(["route_id", "direction_id", "stop_sequence"])
+    grouped = df.groupby(["route_id", "direction_id"])["stop_id"].apply(list)
+    return grouped.to_dict()
+
+
 def build_route_map(processed_root: Path) -> dict[tuple[str, int], list[str]]:
     """Return mapping ``{(route_id, direction_id): [stop_id, ...]}``.
 
@@ -475,9 +813,7 @@ def build_route_map(processed_root: Path) -> dict[tuple[str, int], list[str]]:
     if not frames:
         raise FileNotFoundError("No trip_updates*.parquet snapshots found")
     df = pd.concat(frames, ignore_index=True)
-    df = df.drop_duplicates().sort_values(["route_id", "direction_id", "stop_sequence"])
-    grouped = df.groupby(["route_id", "direction_id"])["stop_id"].apply(list)
-    route_map = grouped.to_dict()
+    route_map = route_map_from_frame(df)
 
     unique_stop_ids = set(df["stop_id"].unique())
     route_map_keys: set[str] = set()
@@ -0,0 +1,213 @@
+"""Persistent per-minute run ledger of pipeline telemetry.
+
+Every processed minute appends one row per stage to :class:`RunLedger`: the
+time spent, input and output rows, trip updates dropped outside the future
+window, the feature builder's lag tolerances, the NaN rate of the produced
+features and the bytes written. Rows are buffered and flushed as small
+Parquet files under ``run_ledger/year=/month=/day=`` (UTC day of
+``snapshot_timestamp``), one file per flush and writer, so concurrent
+workers and successive writers of one run never touch the same file.
+
+:func:`read_ledger` loads a time range back into pandas and
+:func:`ledger_summary` condenses it into per-day, per-stage trends. The same
+tree is exposed as the ``run_ledger`` view of :mod:`.query`.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import time
+import uuid
+from datetime import datetime
+from itertools import count
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+import pytz
+
+from .etl.schemas import parquet_write_options
+from .processed_reader import _partition_day_start
+from .time_context import SECS_PER_DAY
+
+if TYPE_CHECKING:
+    from .features import SnapshotFeatureBuilder
+
+logger = logging.getLogger(__name__)
+
+LEDGER_DIR = "run_ledger"
+LEDGER_SCHEMA = pa.schema([
+    ("run_id", pa.string()),
+    ("stage", pa.string()),
+    ("snapshot_timestamp", pa.int64()),
+    ("recorded_at", pa.float64()),
+    ("secs", pa.float32()),
+    ("rows_in", pa.int32()),
+    ("rows_out", pa.int32()),
+    ("dropped", pa.int32()),
+    ("lag_tu_secs", pa.int32()),
+    ("lag_vp_secs", pa.int32()),
+    ("nan_ratio", pa.float32()),
+    ("bytes_written", pa.int64()),
+])
+FACTS = [f.name for f in LEDGER_SCHEMA][4:]
+
+
+def new_run_id() -> str:
+    """Return an identifier for a run started now by this process."""
+    return f"{datetime.now():%Y%m%dT%H%M%S}-{os.getpid()}"
+
+
+def nan_ratio(df: pd.DataFrame) -> float:
+    """Return the fraction of missing cells among the numeric columns of ``df``."""
+    values = df.select_dtypes("number")
+    if values.size == 0:
+        return 0.0
+    return float(values.isna().to_numpy().mean())
+
+
+def feature_facts(
+    builder: SnapshotFeatureBuilder,
+    trip_now: pd.DataFrame,
+    veh_now: pd.DataFrame,
+    feats: pd.DataFrame,
+) -> dict[str, float]:
+    """Return the ledger facts of the snapshot ``builder`` just built as ``feats``."""
+    return {
+        "rows_in": len(trip_now) + len(veh_now),
+        "rows_out": len(feats),
+        "dropped": builder.last_dropped,
+        "lag_tu_secs": builder.LAG_TU_SECS,
+        "lag_vp_secs": builder.LAG_VP_SECS,
+        "nan_ratio": nan_ratio(feats),
+    }
+
+
+def _day_path(ts: int, root: Path) -> Path:
+    dt = datetime.fromtimestamp(ts, tz=pytz.UTC)
+    return root / LEDGER_DIR / f"year={dt.year:04d}" / f"month={dt.month:02d}" / f"day={dt.day:02d}"
+
+
+class RunLedger:
+    """Buffered writer of ledger rows below ``root``."""
+
+    def __init__(self, root: Path, run_id: str | None = None, *, flush_every: int = 240) -> None:
+        """Append rows of ``run_id`` (default :func:`new_run_id`), flushing every ``flush_every`` rows."""
+        self.root = Path(root)
+        self.run_id = run_id or new_run_id()
+        self.flush_every = flush_every
+        self._rows: list[dict] = []
+        self._token = uuid.uuid4().hex[:12]
+        self._seq = count()
+
+    def record(self, stage: str, ts: int, secs: float, **facts: float | None) -> None:
+        """Append the facts of ``stage`` for snapshot minute ``ts``.
+
+        ``facts`` are any of :data:`FACTS` besides ``secs``; missing ones are null.
+        """
+        unknown = facts.keys() - set(FACTS)
+        if unknown:
+            raise ValueError(f"Unknown ledger facts {sorted(unknown)}")
+        self._rows.append({
+            "run_id": self.run_id,
+            "stage": stage,
+            "snapshot_timestamp": int(ts),
+            "recorded_at": time.time(),
+            "secs": secs,
+            **facts,
+        })
+        if len(self._rows) >= self.flush_every:
+            self.flush()
+
+    def flush(self) -> list[Path]:
+        """Write the buffered rows, one file per UTC day, and return the paths."""
+        if not self._rows:
+            return []
+        table = pa.Table.from_pylist(self._rows, schema=LEDGER_SCHEMA)
+        self._rows = []
+        days = table.column("snapshot_timestamp").to_numpy() // SECS_PER_DAY
+        written = []
+        seq = next(self._seq)
+        for day in np.unique(days):
+            part = table.filter(pa.array(days == day))
+            out_dir = _day_path(int(day) * SECS_PER_DAY, self.root)
+            out_dir.mkdir(parents=True, exist_ok=True)
+            out_file = out_dir / f"run_ledger_{self.run_id}_{self._token}_{seq:05d}.parquet"
+            pq.write_table(part, out_file, **parquet_write_options(part.schema))
+            written.append(out_file)
+        logger.debug("Flushed %d ledger rows to %d files", len(table), len(written))
+        return written
+
+    def close(self) -> None:
+        """Flush the remaining rows."""
+        self.flush()
+
+
+def read_ledger(
+    root: Path,
+    *,
+    start_ts: int | None = None,
+    end_ts: int | None = None,
+    stage: str | None = None,
+    run_id: str | None = None,
+) -> pd.DataFrame:
+    """Return the ledger rows below ``root`` with ``start_ts <= snapshot_timestamp <= end_ts``.
+
+    Rows are ordered by ``snapshot_timestamp``, ``stage`` and ``recorded_at``.
+    """
+    tree = Path(root) / LEDGER_DIR
+    files = sorted(tree.glob("year=*/month=*/day=*/run_ledger_*.parquet"))
+    if start_ts is not None or end_ts is not None:
+        first = -np.inf if start_ts is None else start_ts - start_ts % SECS_PER_DAY
+        last = np.inf if end_ts is None else end_ts
+        files = [f for f in files if first <= _partition_day_start(f.parent) <= last]
+    if not files:
+        return LEDGER_SCHEMA.empty_table().to_pandas()
+    expr = ds.scalar(True)
+    if start_ts is not None:
+        expr &= ds.field("snapshot_timestamp") >= int(start_ts)
+    if end_ts is not None:
+        expr &= ds.field("snapshot_timestamp") <= int(end_ts)
+    if stage is not None:
+        expr &= ds.field("stage") == stage
+    if run_id is not None:
+        expr &= ds.field("run_id") == run_id
+    df = ds.dataset([str(f) for f in files], schema=LEDGER_SCHEMA).to_table(filter=expr).to_pandas()
+    return df.sort_values(
+        ["snapshot_timestamp", "stage", "recorded_at"], kind="stable", ignore_index=True
+    )
+
+
+def ledger_summary(ledger: pd.DataFrame, freq: str = "D") -> pd.DataFrame:
+    """Return per-period, per-stage trends of the ledger rows ``ledger``.
+
+    Periods are ``freq`` buckets of the UTC ``snapshot_timestamp``. Columns
+    are the number of minutes, median and 95th percentile of ``secs``, rows
+    processed per second, the mean lag tolerances and NaN rate, and the
+    bytes written.
+    """
+    if ledger.empty:
+        return pd.DataFrame()
+    df = ledger.assign(
+        period=pd.to_datetime(ledger["snapshot_timestamp"], unit="s", utc=True).dt.floor(freq)
+    )
+    grouped = df.groupby(["period", "stage"], sort=True)
+    out = grouped.agg(
+        minutes=("snapshot_timestamp", "nunique"),
+        secs_p50=("secs", "median"),
+        secs_p95=("secs", lambda s: s.quantile(0.95)),
+        secs_total=("secs", "sum"),
+        rows_in=("rows_in", "sum"),
+        dropped=("dropped", "sum"),
+        lag_tu_secs=("lag_tu_secs", "mean"),
+        lag_vp_secs=("lag_vp_secs", "mean"),
+        nan_ratio=("nan_ratio", "mean"),
+        bytes_written=("bytes_written", "sum"),
+    )
+    out["rows_per_sec"] = out["rows_in"] / out["secs_total"].where(out["secs_total"] > 0)
+    return out.reset_index()
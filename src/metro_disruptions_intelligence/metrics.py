@@ -0,0 +1,274 @@
+"""Process-wide pipeline metrics with a Prometheus text exporter.
+
+Every stage records into the shared :data:`REGISTRY`: counters for rows and
+bytes, gauges for the latest value of a rate or tolerance and histograms with
+fixed buckets for durations and feed lags. Recording is a dictionary lookup
+and an addition under a lock, so the metrics are always on; they only leave
+the process when :func:`export_to_file` (for ``node_exporter``'s textfile
+collector or a long batch run) or :func:`serve_metrics` is started. The
+module uses the standard library only so the CLI can import it at startup.
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+import os
+import threading
+from bisect import bisect_left
+from collections.abc import Callable, Iterable, Sequence
+from pathlib import Path
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+# seconds; spans a fast parse of one file to a slow minute of the online service
+DURATION_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# seconds between a realtime message and the snapshot that consumes it
+LAG_BUCKETS = (0, 15, 30, 60, 90, 120, 180, 300, 600, 1800, 3600)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", r"\\").replace('"', r"\"").replace("\n", r"\n")
+
+
+def _label_text(labels: tuple[tuple[str, str], ...]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels) + "}"
+
+
+def _number(value: float) -> str:
+    value = float(value)
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if math.isnan(value):
+        return "NaN"
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+class Counter:
+    """Monotonically increasing total."""
+
+    def __init__(self, lock: threading.Lock) -> None:
+        """Start at zero; updates hold the registry ``lock``."""
+        self._lock = lock
+        self.value = 0.0
+
+    def inc(self, amount: float = 1) -> None:
+        """Add ``amount``, which must not be negative."""
+        if amount < 0:
+            raise ValueError("Counters only increase")
+        with self._lock:
+            self.value += amount
+
+    def samples(self, name: str, labels: tuple) -> list[str]:
+        """Return the exposition lines of this counter."""
+        return [f"{name}{_label_text(labels)} {_number(self.value)}"]
+
+
+class Gauge:
+    """Value that is set to the latest observation."""
+
+    def __init__(self, lock: threading.Lock) -> None:
+        """Start at zero; updates hold the registry ``lock``."""
+        self._lock = lock
+        self.value = 0.0
+
+    def set(self, value: float) -> None:
+        """Replace the current value."""
+        with self._lock:
+            self.value = float(value)
+
+    def samples(self, name: str, labels: tuple) -> list[str]:
+        """Return the exposition lines of this gauge."""
+        return [f"{name}{_label_text(labels)} {_number(self.value)}"]
+
+
+class Histogram:
+    """Counts of observations per fixed upper bound, with their sum."""
+
+    def __init__(self, lock: threading.Lock, buckets: Sequence[float]) -> None:
+        """Use the sorted upper bounds ``buckets``; ``+Inf`` is implicit."""
+        self._lock = lock
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        """Record one observation."""
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+    def observe_many(self, values: Any) -> None:
+        """Record every element of the NumPy array or pandas series ``values``."""
+        import numpy as np
+
+        values = np.asarray(values, dtype=float)
+        if not values.size:
+            return
+        counts = np.bincount(
+            np.searchsorted(self.buckets, values, side="left"), minlength=len(self.counts)
+        )
+        total = float(values.sum())
+        with self._lock:
+            for i, n in enumerate(counts.tolist()):
+                self.counts[i] += n
+            self.sum += total
+            self.count += int(values.size)
+
+    def samples(self, name: str, labels: tuple) -> list[str]:
+        """Return the cumulative bucket, sum and count lines of this histogram."""
+        lines = []
+        cumulative = 0
+        for bound, n in zip((*self.buckets, float("inf")), self.counts):
+            cumulative += n
+            le = labels + (("le", _number(bound)),)
+            lines.append(f"{name}_bucket{_label_text(le)} {cumulative}")
+        lines.append(f"{name}_sum{_label_text(labels)} {_number(self.sum)}")
+        lines.append(f"{name}_count{_label_text(labels)} {self.count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Named metric families, each holding one metric per label combination."""
+
+    def __init__(self) -> None:
+        """Create an empty registry."""
+        self._lock = threading.Lock()
+        self._families: dict[str, tuple[str, str, dict[tuple, Any]]] = {}
+
+    def _get(self, kind: str, name: str, help_text: str, labels: dict, factory: Callable) -> Any:
+        key = tuple(sorted((k, str(v)) for k, v in labels.items()))
+        family = self._families.get(name)
+        if family is None:
+            with self._lock:
+                family = self._families.setdefault(name, (kind, help_text, {}))
+        if family[0] != kind:
+            raise ValueError(f"Metric {name} is a {family[0]}, not a {kind}")
+        metric = family[2].get(key)
+        if metric is None:
+            with self._lock:
+                metric = family[2].setdefault(key, factory())
+        return metric
+
+    def counter(self, name: str, help_text: str, **labels: Any) -> Counter:
+        """Return the counter ``name`` for ``labels``, creating it on first use."""
+        return self._get("counter", name, help_text, labels, lambda: Counter(self._lock))
+
+    def gauge(self, name: str, help_text: str, **labels: Any) -> Gauge:
+        """Return the gauge ``name`` for ``labels``, creating it on first use."""
+        return self._get("gauge", name, help_text, labels, lambda: Gauge(self._lock))
+
+    def histogram(
+        self, name: str, help_text: str, buckets: Sequence[float] = DURATION_BUCKETS, **labels: Any
+    ) -> Histogram:
+        """Return the histogram ``name`` for ``labels``, creating it with ``buckets``."""
+        return self._get(
+            "histogram", name, help_text, labels, lambda: Histogram(self._lock, buckets)
+        )
+
+    def render(self) -> str:
+        """Return all metrics in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            families = [(n, k, h, dict(m)) for n, (k, h, m) in sorted(self._families.items())]
+        for name, kind, help_text, metrics in families:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, metric in sorted(metrics.items()):
+                lines.extend(metric.samples(name, labels))
+        return "\n".join(lines) + "\n" if lines else ""
+
+    def write(self, path: Path) -> Path:
+        """Atomically write :meth:`render` to ``path``."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp")
+        tmp.write_text(self.render(), encoding="utf-8")
+        os.replace(tmp, path)
+        return path
+
+    def clear(self) -> None:
+        """Drop every metric."""
+        with self._lock:
+            self._families.clear()
+
+
+REGISTRY = MetricsRegistry()
+
+
+def record_parquet_write(path: Path, dataset: str, registry: MetricsRegistry = REGISTRY) -> None:
+    """Count the written Parquet file ``path`` of ``dataset`` and its size."""
+    registry.counter(
+        "mdi_parquet_files_written_total", "Parquet files written", dataset=dataset
+    ).inc()
+    registry.counter(
+        "mdi_parquet_written_bytes_total", "Bytes of Parquet files written", dataset=dataset
+    ).inc(os.path.getsize(path))
+
+
+def export_to_file(
+    path: Path, interval: float = 15.0, registry: MetricsRegistry = REGISTRY
+) -> Callable[[], None]:
+    """Rewrite ``path`` every ``interval`` seconds from a daemon thread.
+
+    Returns a function that stops the thread and writes the final values.
+    """
+    stop = threading.Event()
+
+    def _loop() -> None:
+        while not stop.wait(interval):
+            try:
+                registry.write(path)
+            except OSError:
+                logger.exception("Could not write metrics to %s", path)
+
+    thread = threading.Thread(target=_loop, name="metrics-file", daemon=True)
+    thread.start()
+
+    def _stop() -> None:
+        stop.set()
+        thread.join()
+        registry.write(path)
+
+    return _stop
+
+
+def serve_metrics(
+    port: int, host: str = "", registry: MetricsRegistry = REGISTRY
+) -> Callable[[], None]:
+    """Serve :meth:`MetricsRegistry.render` on ``http://host:port/metrics`` from a daemon thread.
+
+    Returns a function that shuts the server down.
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class _Handler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:  # noqa: N802 - name fixed by BaseHTTPRequestHandler
+            if self.path.split("?")[0] not in ("/", "/metrics"):
+                self.send_error(404)
+                return
+            body = registry.render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args: Iterable) -> None:  # noqa: A002
+            logger.debug("metrics %s", format % args)
+
+    server = ThreadingHTTPServer((host, port), _Handler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    logger.info("Serving metrics on port %d", server.server_address[1])
+
+    def _stop() -> None:
+        server.shutdown()
+        server.server_close()
+
+    return _stop
@@ -0,0 +1,223 @@
+"""Asyncio pipeline overlapping the parse, feature, scoring and write stages.
+
+Minutes flow through bounded queues::
+
+    parse (etl.parse_*) -> SnapshotFeatureBuilder -> StreamingIForestDetector -> sink
+
+Parsing is stateless, so several minutes are parsed concurrently in a pool of
+worker processes. The feature and scoring stages keep rolling state and each
+run in their own single-worker executor, which preserves minute order while
+letting them overlap with parsing and Parquet writes of neighbouring minutes.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections.abc import Callable, Iterable
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from .metrics import REGISTRY
+from .service import OnlineService, frame_rows, ingest_minute
+
+logger = logging.getLogger(__name__)
+
+STAGES = ("parse", "features", "score", "sink")
+
+
+@dataclass
+class StageStats:
+    """Counters for one pipeline stage."""
+
+    name: str
+    items: int = 0
+    busy_secs: float = 0.0
+
+    def as_dict(self, elapsed: float) -> dict[str, float]:
+        """Return counters plus throughput and utilisation over ``elapsed`` seconds."""
+        return {
+            "items": self.items,
+            "busy_secs": self.busy_secs,
+            "items_per_sec": self.items / elapsed if elapsed else 0.0,
+            "utilisation": self.busy_secs / elapsed if elapsed else 0.0,
+        }
+
+
+def _timed(func: Callable[..., Any], *args: Any) -> tuple[Any, float]:
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+class AsyncPipeline:
+    """Run an :class:`~metro_disruptions_intelligence.service.OnlineService` as overlapping stages."""
+
+    def __init__(
+        self,
+        service: OnlineService,
+        *,
+        queue_size: int = 8,
+        parse_workers: int = 2,
+        use_processes: bool = True,
+    ) -> None:
+        """Create the pipeline around the warm builder and detector of ``service``."""
+        self.service = service
+        self.queue_size = queue_size
+        self.parse_workers = parse_workers
+        self.use_processes = use_processes
+        self.stages = {name: StageStats(name) for name in STAGES}
+        self._queues: dict[str, asyncio.Queue] = {}
+        self._started: float | None = None
+        self._elapsed = 0.0
+
+    # ------------------------------------------------------------------
+    def queue_depths(self) -> dict[str, int]:
+        """Return the number of minutes waiting in front of each stage."""
+        return {name: q.qsize() for name, q in self._queues.items()}
+
+    def stats(self) -> dict[str, Any]:
+        """Return elapsed time, queue depths and per-stage throughput."""
+        elapsed = self._elapsed
+        if self._started is not None:
+            elapsed = time.perf_counter() - self._started
+        return {
+            "elapsed_secs": elapsed,
+            "queues": self.queue_depths(),
+            "stages": {name: s.as_dict(elapsed) for name, s in self.stages.items()},
+        }
+
+    # ------------------------------------------------------------------
+    async def _parse(
+        self, pool: Executor, minutes: Iterable[tuple[int, dict[str, Path]]], out: asyncio.Queue
+    ) -> None:
+        loop = asyncio.get_running_loop()
+        root = self.service.processed_root
+        for ts, files in minutes:
+            # futures are queued in minute order; the bounded queue caps parse concurrency
+            await out.put((ts, loop.run_in_executor(pool, _timed, ingest_minute, files, root)))
+        await out.put(None)
+
+    async def _features(self, pool: Executor, inp: asyncio.Queue, out: asyncio.Queue) -> None:
+        loop = asyncio.get_running_loop()
+        while (item := await inp.get()) is not None:
+            ts, parsed = item
+            frames, secs = await parsed
+            self._record("parse", secs)
+            if self.service.ledger is not None:
+                self.service.ledger.record("parse", ts, secs, rows_in=frame_rows(frames))
+            feats, secs = await loop.run_in_executor(
+                pool, _timed, self.service.featurise, ts, frames
+            )
+            self._record("features", secs)
+            if self.service.ledger is not None and feats is not None:
+                facts = self.service.feature_facts(frames, feats)
+                self.service.ledger.record("features", ts, secs, **facts)
+            if feats is not None:
+                await out.put((ts, feats))
+        await out.put(None)
+
+    async def _score(self, pool: Executor, inp: asyncio.Queue, out: asyncio.Queue) -> None:
+        loop = asyncio.get_running_loop()
+        while (item := await inp.get()) is not None:
+            ts, feats = item
+            scores, secs = await loop.run_in_executor(pool, _timed, self.service.score, feats)
+            self._record("score", secs)
+            if self.service.ledger is not None:
+                self.service.ledger.record(
+                    "score", ts, secs, rows_in=len(feats), rows_out=len(scores)
+                )
+            await out.put((ts, feats, scores))
+        await out.put(None)
+
+    async def _sink(
+        self, pool: Executor, inp: asyncio.Queue, on_minute: Callable[[int, Any], None] | None
+    ) -> None:
+        loop = asyncio.get_running_loop()
+        while (item := await inp.get()) is not None:
+            ts, feats, scores = item
+            written, secs = await loop.run_in_executor(
+                pool, _timed, self.service.write_outputs, ts, feats, scores
+            )
+            self._record("sink", secs)
+            if self.service.ledger is not None:
+                self.service.ledger.record("sink", ts, secs, bytes_written=written)
+            self.service.last_ts = ts
+            if on_minute is not None:
+                on_minute(ts, scores)
+
+    def _record(self, stage: str, secs: float) -> None:
+        self.stages[stage].items += 1
+        self.stages[stage].busy_secs += secs
+        REGISTRY.histogram(
+            "mdi_stage_seconds", "Time one pipeline stage spends on a minute", stage=stage
+        ).observe(secs)
+        for name, depth in self.queue_depths().items():
+            REGISTRY.gauge(
+                "mdi_queue_depth", "Minutes waiting in front of a pipeline stage", queue=name
+            ).set(depth)
+
+    async def _monitor(self, every: float) -> None:
+        while True:
+            await asyncio.sleep(every)
+            logger.info("pipeline stats: %s", self.stats())
+
+    # ------------------------------------------------------------------
+    async def run(
+        self,
+        minutes: Iterable[tuple[int, dict[str, Path]]],
+        *,
+        on_minute: Callable[[int, Any], None] | None = None,
+        report_every: float | None = None,
+    ) -> dict[str, Any]:
+        """Process ``minutes`` (``(ts, {feed: raw_path})`` pairs in time order).
+
+        ``on_minute`` is called with each minute's timestamp and score frame once
+        its outputs are written. Queue depths and stage throughput are logged
+        every ``report_every`` seconds. Returns the final :meth:`stats`.
+        """
+        self._queues = {
+            name: asyncio.Queue(maxsize=self.queue_size) for name in ("features", "score", "sink")
+        }
+        parse_pool: Executor
+        if self.use_processes:
+            parse_pool = ProcessPoolExecutor(max_workers=self.parse_workers)
+        else:
+            parse_pool = ThreadPoolExecutor(max_workers=self.parse_workers)
+        feature_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="features")
+        score_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="score")
+        sink_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sink")
+        q = self._queues
+        tasks = [
+            asyncio.create_task(self._parse(parse_pool, minutes, q["features"])),
+            asyncio.create_task(self._features(feature_pool, q["features"], q["score"])),
+            asyncio.create_task(self._score(score_pool, q["score"], q["sink"])),
+            asyncio.create_task(self._sink(sink_pool, q["sink"], on_minute)),
+        ]
+        monitor = asyncio.create_task(self._monitor(report_every)) if report_every else None
+        self._started = time.perf_counter()
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+        finally:
+            if monitor is not None:
+                monitor.cancel()
+            self._elapsed = time.perf_counter() - self._started
+            self._started = None
+            for pool in (parse_pool, feature_pool, score_pool, sink_pool):
+                pool.shutdown(wait=True, cancel_futures=True)
+        stats = self.stats()
+        logger.info("pipeline finished: %s", stats)
+        return stats
+
+    def run_sync(
+        self, minutes: Iterable[tuple[int, dict[str, Path]]], **kwargs: Any
+    ) -> dict[str, Any]:
+        """Blocking wrapper around :meth:`run`."""
+        return asyncio.run(self.run(minutes, **kwargs))
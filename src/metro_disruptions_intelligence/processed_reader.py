@@ -7,13 +7,16 @@ station feature snapshot filenames are always stamped in UTC.
 from __future__ import annotations
 
 import logging
-from datetime import datetime
+from datetime import date, datetime
 from pathlib import Path
 from typing import Iterable
 
 import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
 import pytz
 
+from .features import read_features
 from .utils_gtfsrt import _fname, try_parse
 
 _TZ_LONDON = pytz.timezone("Europe/London")
@@ -123,3 +126,151 @@ def snapshot_path(ts: int, root: Path) -> Path:
         / f"day={dt.day:02d}"
         / f"stations_feats_{dt:%Y-%d-%m-%H-%M}.parquet"
     )
+
+
+def anomaly_scores_path(ts: int, root: Path) -> Path:
+    """Return path for the anomaly scores written for snapshot ``ts`` in UTC."""
+    dt = datetime.fromtimestamp(ts, tz=pytz.UTC)
+    return (
+        root
+        / f"year={dt.year:04d}"
+        / f"month={dt.month:02d}"
+        / f"day={dt.day:02d}"
+        / f"anomaly_scores_{dt:%Y-%d-%m-%H-%M}.parquet"
+    )
+
+
+def daily_features_path(ts: int, root: Path) -> Path:
+    """Return the daily feature store file holding the UTC day of ``ts``."""
+    dt = datetime.fromtimestamp(ts, tz=pytz.UTC)
+    return (
+        root
+        / "stations_daily"
+        / f"year={dt.year:04d}"
+        / f"month={dt.month:02d}"
+        / f"day={dt.day:02d}"
+        / f"stations_daily_{dt:%Y-%d-%m}.parquet"
+    )
+
+
+def _partition_day_start(day_dir: Path) -> int:
+    """Return the UTC epoch of the ``year=YYYY/month=MM/day=DD`` directory ``day_dir``."""
+    year, month, day = (
+        int(p.name.split("=")[1]) for p in (day_dir.parent.parent, day_dir.parent, day_dir)
+    )
+    return int(datetime(year, month, day, tzinfo=pytz.UTC).timestamp())
+
+
+def _daily_files(root: Path, start_ts: int | None, end_ts: int | None) -> list[Path]:
+    files = sorted(root.glob("stations_daily/year=*/month=*/day=*/stations_daily_*.parquet"))
+    if start_ts is not None:
+        first_day = start_ts - start_ts % 86_400
+        files = [f for f in files if _partition_day_start(f.parent) >= first_day]
+    if end_ts is not None:
+        files = [f for f in files if _partition_day_start(f.parent) <= end_ts]
+    return files
+
+
+def read_station_series(
+    root: Path,
+    stop_id: str,
+    direction_id: int | None = None,
+    *,
+    start_ts: int | None = None,
+    end_ts: int | None = None,
+    columns: list[str] | None = None,
+) -> pd.DataFrame:
+    """Return the feature time series of ``stop_id`` from the daily feature store.
+
+    Only row groups whose ``stop_id`` (and ``direction_id``) statistics match
+    are read from each daily file under ``root/stations_daily``. Rows are
+    ordered by direction and ``snapshot_timestamp``.
+    """
+    filters = [("stop_id", "=", str(stop_id))]
+    if direction_id is not None:
+        filters.append(("direction_id", "=", int(direction_id)))
+    if start_ts is not None:
+        filters.append(("snapshot_timestamp", ">=", int(start_ts)))
+    if end_ts is not None:
+        filters.append(("snapshot_timestamp", "<=", int(end_ts)))
+    frames = [
+        read_features(f, columns=columns, filters=filters)
+        for f in _daily_files(root, start_ts, end_ts)
+    ]
+    if not frames:
+        return pd.DataFrame(columns=columns)
+    return pd.concat(frames, ignore_index=True)
+
+
+def read_cross_section(root: Path, ts: int, columns: list[str] | None = None) -> pd.DataFrame:
+    """Return all stations' features at snapshot ``ts``.
+
+    The per-minute snapshot holds exactly that minute and is read when it
+    exists. Otherwise the minute is filtered out of the daily feature store,
+    whose station-ordered row groups all span the whole day, so the day's
+    ``columns`` are decoded in full.
+    """
+    path = snapshot_path(ts, root)
+    if path.exists():
+        return read_features(path, columns=columns)
+    daily = daily_features_path(ts, root)
+    if not daily.exists():
+        return pd.DataFrame(columns=columns)
+    return read_features(daily, columns=columns, filters=[("snapshot_timestamp", "=", int(ts))])
+
+
+def read_feature_range(root: Path, start_ts: int, end_ts: int) -> pd.DataFrame:
+    """Return all stations' features with ``start_ts <= snapshot_timestamp < end_ts``.
+
+    UTC days compacted into the daily feature store are read from their daily
+    file; other days fall back to the per-minute snapshots under ``root``.
+    Rows are ordered by ``snapshot_timestamp``, ``stop_id`` and ``direction_id``.
+    """
+    frames = []
+    for day in range(start_ts - start_ts % 86_400, end_ts, 86_400):
+        lo, hi = max(start_ts, day), min(end_ts, day + 86_400)
+        daily = daily_features_path(day, root)
+        if daily.exists():
+            filters = [("snapshot_timestamp", ">=", lo), ("snapshot_timestamp", "<", hi)]
+            frames.append(read_features(daily, filters=filters))
+            continue
+        for ts in range(lo + (-lo) % 60, hi, 60):
+            path = snapshot_path(ts, root)
+            if path.exists():
+                frames.append(read_features(path))
+    frames = [f for f in frames if not f.empty]
+    if not frames:
+        return pd.DataFrame()
+    df = pd.concat(frames, ignore_index=True)
+    return df.sort_values(
+        ["snapshot_timestamp", "stop_id", "direction_id"], kind="stable", ignore_index=True
+    )
+
+
+def read_station_schedule(
+    static_dir: Path,
+    service_date: date,
+    *,
+    route_ids: Iterable[str] | None = None,
+    columns: list[str] | None = None,
+) -> pd.DataFrame:
+    """Return the scheduled stop times of the services running on ``service_date``.
+
+    ``static_dir`` is the output directory of
+    :func:`~metro_disruptions_intelligence.etl.static_ingest.ingest_static_gtfs`.
+    Active services come from ``service_calendar.parquet`` and only their
+    ``service_id=``/``route_id=`` partitions of ``station_schedule.parquet`` are
+    read. ``sched_arr``/``sched_dep`` are seconds after midnight of
+    ``service_date`` and may exceed one day.
+    """
+    calendar = pd.read_parquet(
+        static_dir / "service_calendar.parquet", filters=[("service_date", "=", service_date)]
+    )
+    partitioning = ds.partitioning(
+        pa.schema([("service_id", pa.string()), ("route_id", pa.string())]), flavor="hive"
+    )
+    dataset = ds.dataset(static_dir / "station_schedule.parquet", partitioning=partitioning)
+    expr = ds.field("service_id").isin(pa.array(calendar["service_id"].tolist(), type=pa.string()))
+    if route_ids is not None:
+        expr &= ds.field("route_id").isin(pa.array(list(route_ids), type=pa.string()))
+    return dataset.to_table(columns=columns, filter=expr).to_pandas()
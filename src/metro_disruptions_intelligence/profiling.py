@@ -0,0 +1,187 @@
+"""Profile one CLI command and write its report to a profiles directory.
+
+:func:`profile_command` runs up to three collectors side by side while the
+command executes:
+
+- :mod:`cProfile` for exact call counts and cumulative time per function,
+  saved as ``.prof`` for ``snakeviz``/``pstats`` and summarised in the report;
+- a sampler thread that records the main thread's stack every few
+  milliseconds as collapsed stacks (``frame;frame;frame count``), the input
+  of ``flamegraph.pl``, ``speedscope`` and ``inferno``;
+- with ``memory=True`` only, :mod:`tracemalloc` for the lines that allocated
+  the most memory still alive at the end and the peak traced memory. Tracing
+  slows allocation-heavy pandas and Arrow code several-fold and skews the
+  timings, so it is off by default; the peak RSS of the process and its
+  workers is always reported.
+
+Worker processes are not profiled; run backfills with ``--workers 1`` to
+see the scoring hot spots. The module uses the standard library only so the
+CLI can offer ``--profile`` without loading anything at startup.
+"""
+
+from __future__ import annotations
+
+import cProfile
+import io
+import logging
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from collections.abc import Callable
+from datetime import datetime
+from pathlib import Path
+from types import FrameType
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_INTERVAL = 0.005
+TOP_FUNCTIONS = 40
+TOP_ALLOCATIONS = 20
+
+
+def _frame_label(frame: FrameType) -> str:
+    code = frame.f_code
+    name = getattr(code, "co_qualname", code.co_name)
+    return f"{name} ({Path(code.co_filename).name}:{code.co_firstlineno})"
+
+
+def _stack(frame: FrameType | None) -> str:
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+class StackSampler:
+    """Count the stacks of one thread, sampled every ``interval`` seconds."""
+
+    def __init__(self, thread_id: int | None = None, interval: float = SAMPLE_INTERVAL) -> None:
+        """Sample ``thread_id`` (default: the calling thread) once started."""
+        self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self.interval = interval
+        self.stacks: Counter[str] = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[_stack(frame)] += 1
+
+    def start(self) -> None:
+        """Start sampling in a daemon thread."""
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop sampling and wait for the thread."""
+        self._stop.set()
+        self._thread.join()
+
+    def collapsed(self) -> str:
+        """Return the samples in the collapsed stack format, heaviest first."""
+        return "".join(f"{stack} {n}\n" for stack, n in self.stacks.most_common())
+
+
+def peak_rss_mb() -> dict[str, float]:
+    """Return the peak resident set size of this process and its finished children in MB."""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return {}
+    # ru_maxrss is KB on Linux and bytes on macOS
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return {
+        "self": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale,
+        "children": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale,
+    }
+
+
+def _report(
+    command: str,
+    elapsed: float,
+    profiler: cProfile.Profile,
+    snapshot: tracemalloc.Snapshot | None,
+    peak_traced: int,
+    n_samples: int,
+) -> str:
+    out = io.StringIO()
+    out.write(f"command: {command}\nwall time: {elapsed:.3f} s\nstack samples: {n_samples}\n")
+    if snapshot is None:
+        out.write("allocation tracing: off (--profile-memory)\n")
+    else:
+        out.write("allocation tracing: on; timings include the tracemalloc overhead\n")
+    for who, mb in peak_rss_mb().items():
+        out.write(f"peak RSS ({who}): {mb:.1f} MB\n")
+    if snapshot is not None:
+        out.write(f"peak traced memory: {peak_traced / 1e6:.1f} MB\n")
+
+    out.write(f"\n== top {TOP_FUNCTIONS} functions by cumulative time ==\n")
+    stats = pstats.Stats(profiler, stream=out)
+    stats.sort_stats("cumulative").print_stats(TOP_FUNCTIONS)
+    out.write(f"\n== top {TOP_FUNCTIONS} functions by own time ==\n")
+    stats.sort_stats("tottime").print_stats(TOP_FUNCTIONS)
+
+    if snapshot is None:
+        return out.getvalue()
+    out.write(f"== top {TOP_ALLOCATIONS} allocators alive at exit ==\n")
+    for stat in snapshot.statistics("lineno")[:TOP_ALLOCATIONS]:
+        frame = stat.traceback[0]
+        out.write(
+            f"{stat.size / 1e6:10.2f} MB {stat.count:9d} blocks  {frame.filename}:{frame.lineno}\n"
+        )
+    return out.getvalue()
+
+
+def profile_command(command: str, out_dir: Path, *, memory: bool = False) -> Callable[[], Path]:
+    """Start profiling the calling thread on behalf of ``command``.
+
+    Returns a function that stops the collectors and writes
+    ``<command>-<timestamp>.txt`` (report), ``.prof`` (pstats) and
+    ``.collapsed`` (stacks) below ``out_dir``; it returns the report path.
+    With ``memory`` the report also lists the top allocators from
+    :mod:`tracemalloc`, at the cost of slower, skewed timings.
+    """
+    out_dir = Path(out_dir)
+    stem = f"{command}-{datetime.now():%Y%m%d-%H%M%S}"
+    tracing = tracemalloc.is_tracing()
+    if memory and not tracing:
+        tracemalloc.start()
+    sampler = StackSampler()
+    profiler = cProfile.Profile()
+    start = time.perf_counter()
+    sampler.start()
+    profiler.enable()
+
+    def _stop() -> Path:
+        profiler.disable()
+        elapsed = time.perf_counter() - start
+        sampler.stop()
+        snapshot, peak_traced = None, 0
+        if memory:
+            snapshot = tracemalloc.take_snapshot().filter_traces([
+                tracemalloc.Filter(False, __file__),
+                tracemalloc.Filter(False, tracemalloc.__file__),
+            ])
+            peak_traced = tracemalloc.get_traced_memory()[1]
+            if not tracing:
+                tracemalloc.stop()
+
+        out_dir.mkdir(parents=True, exist_ok=True)
+        profiler.dump_stats(out_dir / f"{stem}.prof")
+        (out_dir / f"{stem}.collapsed").write_text(sampler.collapsed(), encoding="utf-8")
+        report = out_dir / f"{stem}.txt"
+        report.write_text(
+            _report(
+                command, elapsed, profiler, snapshot, peak_traced, sum(sampler.stacks.values())
+            ),
+            encoding="utf-8",
+        )
+        logger.info("Wrote profile of %s to %s", command, report)
+        return report
+
+    return _stop
@@ -0,0 +1,176 @@
+"""DuckDB views over the processed realtime and station feature partitions.
+
+:func:`connect` registers every ``year=/month=/day=`` Parquet tree as a view so
+ad-hoc SQL runs directly on the files instead of materialising them in pandas.
+``alerts``, ``trip_updates`` and ``vehicle_positions`` come from the processed
+realtime root and are partitioned by London day; ``stations_feats`` and
+``stations_daily`` come from the feature root and are partitioned by UTC day,
+as is the ``run_ledger`` view of :mod:`.ledger` telemetry.
+
+Predicates on ``snapshot_timestamp``, ``route_id`` and ``stop_id`` are pushed
+into the Parquet scan and skip row groups by their statistics. DuckDB only
+skips whole files on predicates over the partition columns, which
+:func:`time_predicate` derives from a timestamp range.
+"""
+
+from __future__ import annotations
+
+import logging
+from collections.abc import Sequence
+from datetime import date, timedelta
+from pathlib import Path
+
+import duckdb
+import numpy as np
+import pandas as pd
+
+from .processed_reader import FEEDS
+from .time_context import SECS_PER_DAY, london_table
+
+logger = logging.getLogger(__name__)
+
+FEATURE_VIEWS = ["stations_feats", "stations_daily"]
+LEDGER_VIEW = "run_ledger"
+_EPOCH_DATE = date(1970, 1, 1)
+
+
+def _parquet_source(tree: Path, union_by_name: bool) -> str:
+    glob = str(tree / "**" / "*.parquet").replace("'", "''")
+    return (
+        f"read_parquet('{glob}', hive_partitioning = true, union_by_name = {str(union_by_name).lower()}, "
+        "hive_types = {'year': BIGINT, 'month': BIGINT, 'day': BIGINT})"
+    )
+
+
+def register_views(
+    con: duckdb.DuckDBPyConnection,
+    processed_root: Path | None = None,
+    features_root: Path | None = None,
+    *,
+    ledger_root: Path | None = None,
+    union_by_name: bool = False,
+) -> list[str]:
+    """Create or replace one view per partition tree found below the roots.
+
+    Files are expected to share the canonical schemas of :mod:`.etl.schemas`
+    and :data:`.features.FEATURE_SCHEMA`. Set ``union_by_name`` for trees
+    written before those schemas; DuckDB then reads every file footer when a
+    query is planned, which defeats partition pruning. Trees without Parquet
+    files are skipped. Returns the registered view names.
+    """
+    trees: dict[str, Path] = {}
+    if processed_root is not None:
+        trees.update({feed: Path(processed_root) / feed for feed in FEEDS})
+    if features_root is not None:
+        trees.update({name: Path(features_root) / name for name in FEATURE_VIEWS})
+    if ledger_root is not None:
+        trees[LEDGER_VIEW] = Path(ledger_root) / LEDGER_VIEW
+
+    registered = []
+    for name, tree in trees.items():
+        if not tree.is_dir() or next(tree.rglob("*.parquet"), None) is None:
+            logger.debug("No Parquet files for view %s under %s", name, tree)
+            continue
+        con.execute(
+            f"CREATE OR REPLACE VIEW {name} AS SELECT * FROM {_parquet_source(tree, union_by_name)}"
+        )
+        registered.append(name)
+    logger.info("Registered DuckDB views: %s", ", ".join(registered) or "none")
+    return registered
+
+
+def connect(
+    processed_root: Path | None = None,
+    features_root: Path | None = None,
+    *,
+    database: str = ":memory:",
+    ledger_root: Path | None = None,
+    union_by_name: bool = False,
+) -> duckdb.DuckDBPyConnection:
+    """Return a DuckDB connection with the views of :func:`register_views`."""
+    con = duckdb.connect(database)
+    register_views(
+        con, processed_root, features_root, ledger_root=ledger_root, union_by_name=union_by_name
+    )
+    return con
+
+
+def _partition_days(view: str, start_ts: int, end_ts: int) -> list[date]:
+    if view in FEATURE_VIEWS or view == LEDGER_VIEW:
+        first, last = start_ts // SECS_PER_DAY, end_ts // SECS_PER_DAY
+    else:
+        first, last = (int(d) for d in london_table().local_day(np.array([start_ts, end_ts])))
+    return [_EPOCH_DATE + timedelta(days=d) for d in range(first, last + 1)]
+
+
+def time_predicate(view: str, start_ts: int | None = None, end_ts: int | None = None) -> str:
+    """Return a SQL predicate selecting ``start_ts <= snapshot_timestamp <= end_ts`` in ``view``.
+
+    When both bounds are given the predicate also lists the partition days that
+    can hold such rows (London days for the realtime feeds, UTC days for the
+    feature and ledger views) so DuckDB opens only those files.
+    """
+    bounds = []
+    if start_ts is not None:
+        bounds.append(f"snapshot_timestamp >= {int(start_ts)}")
+    if end_ts is not None:
+        bounds.append(f"snapshot_timestamp <= {int(end_ts)}")
+    if start_ts is not None and end_ts is not None:
+        by_month: dict[tuple[int, int], list[str]] = {}
+        for d in _partition_days(view, int(start_ts), int(end_ts)):
+            by_month.setdefault((d.year, d.month), []).append(str(d.day))
+        days = " OR ".join(
+            f"(year = {y} AND month = {m} AND day IN ({', '.join(ds)}))"
+            for (y, m), ds in by_month.items()
+        )
+        bounds.insert(0, f"({days or 'FALSE'})")
+    return " AND ".join(bounds) or "TRUE"
+
+
+def station_delay_percentiles(
+    con: duckdb.DuckDBPyConnection,
+    *,
+    start_ts: int | None = None,
+    end_ts: int | None = None,
+    quantiles: Sequence[float] = (0.5, 0.9, 0.99),
+) -> pd.DataFrame:
+    """Return arrival delay percentiles per ``stop_id`` from the ``trip_updates`` view.
+
+    Each trip's arrival at a stop is counted once, using the delay of the last
+    snapshot that predicted it. Only the aggregate is returned to pandas.
+    """
+    where = time_predicate("trip_updates", start_ts, end_ts)
+    cols = ", ".join(
+        f"quantile_cont(delay, {float(q)}) AS p{round(q * 100):02d}" for q in quantiles
+    )
+    sql = f"""
+        WITH arrivals AS (
+            SELECT stop_id, arg_max(arrival_delay, snapshot_timestamp) AS delay
+            FROM trip_updates
+            WHERE arrival_delay IS NOT NULL AND {where}
+            GROUP BY trip_id, start_date, stop_id
+        )
+        SELECT stop_id, count(*) AS arrivals, {cols}
+        FROM arrivals
+        GROUP BY stop_id
+        ORDER BY stop_id
+    """
+    return con.sql(sql).df()
+
+
+def run_query(con: duckdb.DuckDBPyConnection, sql: str, output: Path | None = None) -> str:
+    """Run ``sql`` and return its result rendered as a table.
+
+    With ``output`` the result is written by DuckDB's ``COPY`` instead, in
+    the format implied by the suffix (``.parquet``, ``.csv`` or ``.json``).
+    """
+    if output is None:
+        rel = con.sql(sql)
+        return "" if rel is None else str(rel)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    fmt = {".parquet": "parquet", ".csv": "csv", ".json": "json"}.get(output.suffix.lower())
+    if fmt is None:
+        raise ValueError(f"Unsupported output format: {output.suffix}")
+    target = str(output).replace("'", "''")
+    con.execute(f"COPY ({sql}) TO '{target}' (FORMAT {fmt})")
+    return f"Wrote {output}"
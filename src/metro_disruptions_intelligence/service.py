@@ -0,0 +1,402 @@
+"""Long-running online service turning raw realtime JSON into anomaly scores.
+
+The service watches a raw directory laid out as
+``<raw_root>/<feed>/YYYY_DD_MM_HH_MM_SS.json`` (London local time, as written by
+the feed collector) and processes every minute once its ``trip_updates`` and
+``vehicle_positions`` files have arrived. A single warm
+:class:`~metro_disruptions_intelligence.features.SnapshotFeatureBuilder` and
+:class:`~metro_disruptions_intelligence.detect.streaming_iforest.StreamingIForestDetector`
+keep their rolling state in memory across minutes, so the outputs match the
+batch ``ingest-rt`` → ``generate-features`` → ``detect-anomalies`` chain.
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass
+from pathlib import Path
+
+import pandas as pd
+
+from .detect.model_bank import ModelBank
+from .detect.streaming_iforest import IForestConfig, StreamingIForestDetector
+from .etl.ingest_rt import FEEDS, ingest_one_file, raw_file_epoch
+from .features import (
+    SnapshotFeatureBuilder,
+    build_route_map,
+    route_map_from_frame,
+    snapshot_frame,
+    write_features,
+)
+from .ledger import RunLedger, feature_facts
+from .metrics import REGISTRY, record_parquet_write
+from .processed_reader import anomaly_scores_path, snapshot_path
+
+logger = logging.getLogger(__name__)
+
+REQUIRED_FEEDS = ("trip_updates", "vehicle_positions")
+DROP_FEATURES = ["data_fresh_secs", "dwell_delta_t"]
+
+
+@dataclass
+class MinuteReport:
+    """Summary of one processed minute."""
+
+    ts: int
+    n_trip_updates: int
+    n_vehicles: int
+    n_scored: int
+    n_anomalies: int
+    processing_secs: float
+    latency_secs: float
+
+
+def ingest_minute(files: dict[str, Path], processed_root: Path) -> dict[str, pd.DataFrame]:
+    """Parse and persist the raw ``files`` of one minute, returning frames by feed."""
+    return {
+        feed: ingest_one_file(feed, path, processed_root / feed)
+        for feed, path in sorted(files.items())
+    }
+
+
+def frame_rows(frames: dict[str, pd.DataFrame]) -> int:
+    """Return the number of rows parsed for one minute."""
+    return sum(len(df) for df in frames.values())
+
+
+class RawFeedWatcher:
+    """Report newly arrived raw JSON files.
+
+    Linux inotify is used when the optional ``inotify_simple`` package is
+    installed; otherwise the feed directories are polled every
+    ``poll_interval`` seconds.
+    """
+
+    def __init__(
+        self, raw_root: Path, *, poll_interval: float = 1.0, use_inotify: bool = True
+    ) -> None:
+        """Watch the feed subdirectories of ``raw_root``."""
+        self.raw_root = raw_root
+        self.poll_interval = poll_interval
+        self._seen: set[Path] = set()
+        self._wd_feed: dict[int, str] = {}
+        for feed in FEEDS:
+            (raw_root / feed).mkdir(parents=True, exist_ok=True)
+        self._inotify = self._make_inotify() if use_inotify else None
+        # files already present at start-up are reported by the first poll
+        self._backlog = self._scan()
+
+    @property
+    def backend(self) -> str:
+        """Name of the change notification mechanism in use."""
+        return "inotify" if self._inotify is not None else "polling"
+
+    def _make_inotify(self):
+        try:
+            from inotify_simple import INotify, flags
+        except ImportError:
+            logger.info("inotify_simple not installed; polling %s", self.raw_root)
+            return None
+        try:
+            ino = INotify()
+            mask = flags.CLOSE_WRITE | flags.MOVED_TO
+            for feed in FEEDS:
+                self._wd_feed[ino.add_watch(str(self.raw_root / feed), mask)] = feed
+        except OSError as exc:
+            logger.warning("inotify unavailable (%s); polling %s", exc, self.raw_root)
+            return None
+        return ino
+
+    def _scan(self) -> list[Path]:
+        new: list[Path] = []
+        for feed in FEEDS:
+            for path in sorted((self.raw_root / feed).glob("*.json")):
+                if path not in self._seen:
+                    self._seen.add(path)
+                    new.append(path)
+        return new
+
+    def poll(self, timeout: float | None = None) -> list[Path]:
+        """Return files that appeared since the last call, waiting up to ``timeout`` seconds."""
+        if self._backlog:
+            new, self._backlog = self._backlog, []
+            return new
+        timeout = self.poll_interval if timeout is None else timeout
+        if self._inotify is None:
+            new = self._scan()
+            if not new:
+                time.sleep(timeout)
+                new = self._scan()
+            return new
+
+        from inotify_simple import flags
+
+        new = []
+        for event in self._inotify.read(timeout=int(timeout * 1000)):
+            if event.mask & flags.Q_OVERFLOW:
+                new.extend(self._scan())
+                continue
+            feed = self._wd_feed.get(event.wd)
+            if feed is None or not event.name.endswith(".json"):
+                continue
+            path = self.raw_root / feed / event.name
+            if path not in self._seen:
+                self._seen.add(path)
+                new.append(path)
+        return new
+
+    def close(self) -> None:
+        """Release the inotify descriptor if one is open."""
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
+
+
+class OnlineService:
+    """Process raw realtime minutes with a warm feature builder and detector."""
+
+    def __init__(
+        self,
+        builder: SnapshotFeatureBuilder,
+        detector: StreamingIForestDetector,
+        processed_root: Path,
+        features_root: Path,
+        scores_root: Path,
+        *,
+        settle_secs: float = 1.0,
+        ledger: RunLedger | None = None,
+    ) -> None:
+        """Create the service writing processed, feature and score Parquet files.
+
+        With a ``ledger`` every minute appends one row per stage to it.
+        """
+        self.builder = builder
+        self.detector = detector
+        self.processed_root = processed_root
+        self.features_root = features_root
+        self.scores_root = scores_root
+        self.settle_secs = settle_secs
+        self.ledger = ledger
+        self.last_ts: int | None = None
+        self._pending: dict[int, dict[str, Path]] = {}
+
+    # ------------------------------------------------------------------
+    def add_files(self, paths: Iterable[Path]) -> None:
+        """Queue raw ``paths`` under the minute encoded in their filenames."""
+        for path in paths:
+            feed = path.parent.name
+            ts = raw_file_epoch(path)
+            if feed not in FEEDS or ts is None:
+                logger.debug("Ignoring unexpected raw file %s", path)
+                continue
+            if self.last_ts is not None and ts <= self.last_ts:
+                if feed == "alerts":
+                    ingest_one_file(feed, path, self.processed_root / feed)
+                else:
+                    logger.warning("Late %s file %s ignored; minute already scored", feed, path)
+                continue
+            self._pending.setdefault(ts, {})[feed] = path
+
+    def _is_complete(self, files: dict[str, Path], now: float) -> bool:
+        if not all(feed in files for feed in REQUIRED_FEEDS):
+            return False
+        return all(now - p.stat().st_mtime >= self.settle_secs for p in files.values())
+
+    def ready_minutes(self, now: float | None = None) -> list[int]:
+        """Return pending minutes that can be processed, in chronological order.
+
+        A minute is ready once both required feeds have settled, or when a
+        later minute is already complete (the missing feed is then treated as
+        absent, as ``generate-features`` does).
+        """
+        now = time.time() if now is None else now
+        minutes = sorted(self._pending)
+        complete = [self._is_complete(self._pending[ts], now) for ts in minutes]
+        ready: list[int] = []
+        for i, ts in enumerate(minutes):
+            if not (complete[i] or any(complete[i + 1 :])):
+                break
+            ready.append(ts)
+        return ready
+
+    # ------------------------------------------------------------------
+    def featurise(self, ts: int, frames: dict[str, pd.DataFrame]) -> pd.DataFrame | None:
+        """Build the feature frame for minute ``ts`` from parsed ``frames``.
+
+        Returns ``None`` when a required feed is missing for the minute.
+        """
+        missing = [feed for feed in REQUIRED_FEEDS if feed not in frames]
+        if missing:
+            logger.warning("Minute %s missing %s files; skipped", ts, ", ".join(missing))
+            return None
+        trip_now = frames["trip_updates"]
+        veh_now = frames["vehicle_positions"]
+        if veh_now.empty:
+            logger.warning("vehicle_positions for minute %s contain no rows", ts)
+        self._register_routes(trip_now)
+        return snapshot_frame(self.builder, trip_now, veh_now, ts)
+
+    def feature_facts(self, frames: dict[str, pd.DataFrame], feats: pd.DataFrame) -> dict:
+        """Return the ledger facts of ``feats``, the snapshot just built from ``frames``."""
+        return feature_facts(
+            self.builder, frames["trip_updates"], frames["vehicle_positions"], feats
+        )
+
+    def score(self, feats: pd.DataFrame) -> pd.DataFrame:
+        """Score ``feats`` with the warm detector."""
+        return self.detector.score_and_update(feats)
+
+    def write_outputs(self, ts: int, feats: pd.DataFrame, scores: pd.DataFrame) -> int:
+        """Persist the feature snapshot and anomaly scores of minute ``ts``; return the bytes written."""
+        feats_file = snapshot_path(ts, self.features_root)
+        write_features(feats, feats_file)
+        written = feats_file.stat().st_size
+        if not scores.empty:
+            out_file = anomaly_scores_path(ts, self.scores_root)
+            out_file.parent.mkdir(parents=True, exist_ok=True)
+            scores.to_parquet(out_file, index=False)
+            record_parquet_write(out_file, "anomaly_scores")
+            written += out_file.stat().st_size
+        return written
+
+    def process_minute(self, ts: int) -> MinuteReport | None:
+        """Ingest, featurise and score the pending minute ``ts``."""
+        files = self._pending.pop(ts)
+        start = time.perf_counter()
+        self.last_ts = ts
+        frames = ingest_minute(files, self.processed_root)
+        parsed = time.perf_counter()
+        feats = self.featurise(ts, frames)
+        if feats is None:
+            return None
+        featurised = time.perf_counter()
+        scores = self.score(feats)
+        scored = time.perf_counter()
+        written = self.write_outputs(ts, feats, scores)
+
+        processing = time.perf_counter() - start
+        if self.ledger is not None:
+            self.ledger.record("parse", ts, parsed - start, rows_in=frame_rows(frames))
+            self.ledger.record(
+                "features", ts, featurised - parsed, **self.feature_facts(frames, feats)
+            )
+            self.ledger.record(
+                "score", ts, scored - featurised, rows_in=len(feats), rows_out=len(scores)
+            )
+            self.ledger.record("sink", ts, start + processing - scored, bytes_written=written)
+        arrived = max(p.stat().st_mtime for p in files.values())
+        report = MinuteReport(
+            ts=ts,
+            n_trip_updates=len(frames["trip_updates"]),
+            n_vehicles=len(frames["vehicle_positions"]),
+            n_scored=len(scores),
+            n_anomalies=int(scores["anomaly_flag"].sum()) if not scores.empty else 0,
+            processing_secs=processing,
+            latency_secs=max(time.time() - arrived, processing),
+        )
+        REGISTRY.counter("mdi_minutes_processed_total", "Minutes processed by the service").inc()
+        REGISTRY.histogram(
+            "mdi_minute_processing_seconds", "Time to ingest, featurise and score one minute"
+        ).observe(report.processing_secs)
+        REGISTRY.histogram(
+            "mdi_minute_latency_seconds", "Time from the last raw file of a minute to its scores"
+        ).observe(report.latency_secs)
+        logger.info(
+            "Minute %s: tu=%d vp=%d scored=%d anomalies=%d processing=%.3fs latency=%.3fs",
+            ts,
+            report.n_trip_updates,
+            report.n_vehicles,
+            report.n_scored,
+            report.n_anomalies,
+            report.processing_secs,
+            report.latency_secs,
+        )
+        return report
+
+    def _register_routes(self, trip_updates: pd.DataFrame) -> None:
+        if trip_updates.empty:
+            return
+        route_keys = set(zip(trip_updates["route_id"], trip_updates["direction_id"]))
+        if route_keys - self.builder.route_dir_to_stops.keys():
+            self.builder.add_routes(route_map_from_frame(trip_updates))
+
+    # ------------------------------------------------------------------
+    def run(
+        self,
+        watcher: RawFeedWatcher,
+        *,
+        max_minutes: int | None = None,
+        idle_timeout: float | None = None,
+        on_minute: Callable[[MinuteReport], None] | None = None,
+    ) -> list[MinuteReport]:
+        """Process minutes reported by ``watcher`` until stopped.
+
+        The loop ends after ``max_minutes`` processed minutes or once no new
+        file arrived for ``idle_timeout`` seconds; it runs forever otherwise.
+        Complete minutes still pending at that point are processed first.
+        """
+        reports: list[MinuteReport] = []
+        last_activity = time.monotonic()
+        while True:
+            new = watcher.poll()
+            if new:
+                self.add_files(new)
+                last_activity = time.monotonic()
+            idle = idle_timeout is not None and time.monotonic() - last_activity >= idle_timeout
+            due = sorted(self._pending) if idle else self.ready_minutes()
+            for ts in due:
+                report = self.process_minute(ts)
+                if report is None:
+                    continue
+                reports.append(report)
+                if on_minute is not None:
+                    on_minute(report)
+                if max_minutes is not None and len(reports) >= max_minutes:
+                    return reports
+            if idle:
+                return reports
+
+
+def build_service(
+    processed_root: Path,
+    features_root: Path,
+    scores_root: Path,
+    config: IForestConfig | dict | str | Path | None = None,
+    *,
+    settle_secs: float = 1.0,
+    model_bank: Path | None = None,
+    pretrain: bool = False,
+    ledger_root: Path | None = None,
+) -> OnlineService:
+    """Create an :class:`OnlineService` warmed with the routes already in ``processed_root``.
+
+    ``model_bank`` is a :class:`~.detect.model_bank.ModelBank` directory that
+    warm-starts the detector at each service-day boundary. With ``pretrain``
+    days the bank cannot seed are pre-trained on the features in ``features_root``.
+    ``ledger_root`` receives the :class:`~.ledger.RunLedger` of the run.
+    """
+    try:
+        route_map = build_route_map(processed_root)
+    except FileNotFoundError:
+        logger.info("No processed trip updates under %s; learning routes online", processed_root)
+        route_map = {}
+    builder = SnapshotFeatureBuilder(route_map)
+    bank = None if model_bank is None else ModelBank(model_bank)
+    detector = StreamingIForestDetector(
+        config or {},
+        drop_features=DROP_FEATURES,
+        model_bank=bank,
+        history_root=features_root if pretrain else None,
+    )
+    ledger = None if ledger_root is None else RunLedger(ledger_root)
+    return OnlineService(
+        builder,
+        detector,
+        processed_root,
+        features_root,
+        scores_root,
+        settle_secs=settle_secs,
+        ledger=ledger,
+    )
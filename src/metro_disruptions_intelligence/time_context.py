@@ -0,0 +1,164 @@
+"""Vectorised local-time context for epoch seconds.
+
+UTC offsets of a time zone are piecewise constant between DST transitions. A
+:class:`LocalTimeTable` precomputes those transitions once with
+:mod:`zoneinfo` so local hour, weekday, calendar day and service day can be
+derived for whole arrays of epoch seconds with :func:`numpy.searchsorted`
+instead of building a tz-aware ``datetime`` per value.
+"""
+
+from __future__ import annotations
+
+from datetime import date, datetime, timedelta, timezone
+from functools import lru_cache
+from typing import NamedTuple
+
+import numpy as np
+from zoneinfo import ZoneInfo
+
+SECS_PER_DAY = 86_400
+SERVICE_DAY_START_HOUR = 3
+_EPOCH_DATE = date(1970, 1, 1)
+# 1970-01-01 was a Thursday
+_EPOCH_WEEKDAY = 3
+_SAMPLE_SECS = 12 * 3600
+
+
+class TimeContext(NamedTuple):
+    """Local-time attributes of one snapshot minute."""
+
+    local_dt: datetime
+    hour: int
+    sin_hour: float
+    cos_hour: float
+    day_type: int
+    service_day: date
+    utc_offset: int
+
+
+class LocalTimeTable:
+    """UTC offset lookup for one time zone between ``start_year`` and ``end_year``."""
+
+    def __init__(self, tz: str, *, start_year: int = 2000, end_year: int = 2060) -> None:
+        """Precompute the DST transitions of ``tz``."""
+        self.tz = ZoneInfo(tz)
+        lo = int(datetime(start_year, 1, 1, tzinfo=timezone.utc).timestamp())
+        hi = int(datetime(end_year, 1, 1, tzinfo=timezone.utc).timestamp())
+        self.lo, self.hi = lo, hi
+
+        starts = [lo]
+        offsets = [self._offset(lo)]
+        for t in range(lo + _SAMPLE_SECS, hi, _SAMPLE_SECS):
+            off = self._offset(t)
+            if off == offsets[-1]:
+                continue
+            # bisect the exact second of the change; transitions are hours apart
+            a, b = t - _SAMPLE_SECS, t
+            while b - a > 1:
+                mid = (a + b) // 2
+                if self._offset(mid) == offsets[-1]:
+                    a = mid
+                else:
+                    b = mid
+            starts.append(b)
+            offsets.append(off)
+        self.starts = np.array(starts, dtype=np.int64)
+        self.offsets = np.array(offsets, dtype=np.int64)
+
+    def _offset(self, ts: int) -> int:
+        return int(datetime.fromtimestamp(ts, self.tz).utcoffset().total_seconds())
+
+    def local_datetime(self, ts: float) -> datetime:
+        """Return ``ts`` as a tz-aware local ``datetime``."""
+        return datetime.fromtimestamp(ts, self.tz)
+
+    # ------------------------------------------------------------------
+    def utc_offset(self, ts: np.ndarray | float) -> np.ndarray:
+        """Return the UTC offset in seconds in force at each epoch in ``ts``.
+
+        Epochs outside the precomputed years fall back to :mod:`zoneinfo`.
+        """
+        ts = np.asarray(ts, dtype=float)
+        idx = np.searchsorted(self.starts, ts, side="right") - 1
+        out = self.offsets[np.clip(idx, 0, None)]
+        outside = (ts < self.lo) | (ts >= self.hi)
+        if np.any(outside):
+            out = np.where(outside, np.vectorize(self._offset, otypes=[np.int64])(ts), out)
+        return out
+
+    def local_seconds(self, ts: np.ndarray | float) -> np.ndarray:
+        """Return local wall-clock seconds since 1970-01-01 00:00 for ``ts``.
+
+        ``NaN`` inputs stay ``NaN``.
+        """
+        ts = np.asarray(ts, dtype=float)
+        valid = ~np.isnan(ts)
+        out = np.full(ts.shape, np.nan)
+        out[valid] = ts[valid] + self.utc_offset(ts[valid])
+        return out
+
+    def local_day(self, ts: np.ndarray | float) -> np.ndarray:
+        """Return the local calendar day as days since 1970-01-01."""
+        return np.floor(self.local_seconds(ts) / SECS_PER_DAY)
+
+    def local_hour(self, ts: np.ndarray | float) -> np.ndarray:
+        """Return the local hour of day."""
+        return np.floor(np.mod(self.local_seconds(ts), SECS_PER_DAY) / 3600)
+
+    def weekday(self, ts: np.ndarray | float) -> np.ndarray:
+        """Return the local weekday with Monday as ``0``."""
+        return np.mod(self.local_day(ts) + _EPOCH_WEEKDAY, 7)
+
+    def service_day(self, ts: np.ndarray | float) -> np.ndarray:
+        """Return the service day (days since 1970-01-01) starting at 03:00 local."""
+        secs = self.local_seconds(ts) - SERVICE_DAY_START_HOUR * 3600
+        return np.floor(secs / SECS_PER_DAY)
+
+    def is_new_service_day(
+        self, prev_ts: np.ndarray | float, cur_ts: np.ndarray | float, reset_at_hour: int
+    ) -> np.ndarray:
+        """Vectorised :func:`~metro_disruptions_intelligence.utils_gtfsrt.is_new_service_day`.
+
+        ``NaN`` previous or current timestamps yield ``False``.
+        """
+        cur_day = self.local_day(cur_ts)
+        cur_hour = self.local_hour(cur_ts)
+        prev_day = self.local_day(prev_ts)
+        changed = (cur_day != prev_day) & ~np.isnan(prev_day) & ~np.isnan(cur_day)
+        return changed & (cur_hour >= reset_at_hour)
+
+    def context(self, ts: int) -> TimeContext:
+        """Return the :class:`TimeContext` of the snapshot at ``ts``."""
+        offset = int(self.utc_offset(ts))
+        local = ts + offset
+        hour = (local % SECS_PER_DAY) // 3600
+        angle = 2 * np.pi * hour / 24
+        weekday = (local // SECS_PER_DAY + _EPOCH_WEEKDAY) % 7
+        service = (local - SERVICE_DAY_START_HOUR * 3600) // SECS_PER_DAY
+        return TimeContext(
+            local_dt=self.local_datetime(ts),
+            hour=int(hour),
+            sin_hour=float(np.sin(angle)),
+            cos_hour=float(np.cos(angle)),
+            day_type=int(weekday >= 5),
+            service_day=_EPOCH_DATE + timedelta(days=int(service)),
+            utc_offset=offset,
+        )
+
+
+@lru_cache(maxsize=1)
+def sydney_table() -> LocalTimeTable:
+    """Return the shared Australia/Sydney :class:`LocalTimeTable`."""
+    return LocalTimeTable("Australia/Sydney")
+
+
+@lru_cache(maxsize=4096)
+def sydney_context(ts: int) -> TimeContext:
+    """Return the cached Sydney :class:`TimeContext` for the snapshot at ``ts``."""
+    return sydney_table().context(int(ts))
+
+
+@lru_cache(maxsize=1)
+def london_table() -> LocalTimeTable:
+    """Return the shared Europe/London :class:`LocalTimeTable`."""
+    return LocalTimeTable("Europe/London")
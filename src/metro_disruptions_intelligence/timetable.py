@@ -0,0 +1,167 @@
+"""In-memory static timetable index for schedule-aware features.
+
+A :class:`TimetableIndex` holds the scheduled arrivals of every
+``(stop_id, direction_id)`` as one sorted NumPy array, so the scheduled
+headway of a train, the gap to the next scheduled train and the scheduled
+trips missing from the realtime feed are ``searchsorted`` lookups.
+:class:`StaticTimetable` builds one index per Sydney service day from the
+output of :func:`~metro_disruptions_intelligence.etl.static_ingest.ingest_static_gtfs`.
+"""
+
+from __future__ import annotations
+
+import logging
+from collections.abc import Iterable
+from datetime import date, datetime, time, timedelta
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .processed_reader import read_station_schedule
+from .time_context import sydney_context, sydney_table
+
+logger = logging.getLogger(__name__)
+
+# scheduled and realtime-derived arrivals further apart than this do not match
+MATCH_TOLERANCE_SECS = 120
+
+
+def service_day_origin(service_date: date) -> int:
+    """Return the epoch that GTFS times of ``service_date`` count from.
+
+    GTFS measures stop times from noon minus 12 hours, which is local midnight
+    except on DST change days.
+    """
+    noon = datetime.combine(service_date, time(12), tzinfo=sydney_table().tz)
+    return int(noon.timestamp()) - 12 * 3600
+
+
+class TimetableIndex:
+    """Sorted scheduled arrivals per ``(stop_id, direction_id)``."""
+
+    def __init__(self, arrivals: pd.DataFrame) -> None:
+        """Index ``arrivals`` with ``stop_id``, ``direction_id``, ``trip_id`` and epoch ``arrival``."""
+        arrivals = arrivals.dropna(subset=["arrival", "direction_id"])
+        arrivals = arrivals.sort_values(["stop_id", "direction_id", "arrival"], kind="stable")
+        self.times = arrivals["arrival"].to_numpy(dtype=np.int64)
+        self.trip_ids = arrivals["trip_id"].to_numpy(dtype=object)
+        codes, trips = pd.factorize(arrivals["trip_id"])
+        self._trip_codes = codes.astype(np.int64)
+        self._trips = pd.Index(trips)
+        self._slices: dict[tuple[str, int], tuple[int, int]] = {}
+        keys = list(zip(arrivals["stop_id"].astype(str), arrivals["direction_id"].astype(int)))
+        start = 0
+        for i in range(1, len(keys) + 1):
+            if i == len(keys) or keys[i] != keys[start]:
+                self._slices[keys[start]] = (start, i)
+                start = i
+        self._keys = list(self._slices)
+        lengths = np.array([hi - lo for lo, hi in self._slices.values()], dtype=np.int64)
+        self._key_of_row = np.repeat(np.arange(len(lengths)), lengths)
+        # times offset by key, so one searchsorted finds every key's window
+        self._base = int(self.times.min()) if len(self.times) else 0
+        self._span = int(self.times.max()) - self._base + 1 if len(self.times) else 1
+        self._keyed = self._key_of_row * self._span + (self.times - self._base)
+        self._offsets = np.arange(len(lengths), dtype=np.int64) * self._span
+
+    def __len__(self) -> int:
+        """Return the number of scheduled arrivals."""
+        return len(self.times)
+
+    def keys(self) -> list[tuple[str, int]]:
+        """Return the indexed ``(stop_id, direction_id)`` keys."""
+        return list(self._keys)
+
+    def arrivals(self, key: tuple[str, int]) -> np.ndarray:
+        """Return the sorted scheduled arrival epochs of ``key``."""
+        lo, hi = self._slices.get(key, (0, 0))
+        return self.times[lo:hi]
+
+    def _match(self, key: tuple[str, int], sched_ts: float) -> tuple[np.ndarray, int | None]:
+        times = self.arrivals(key)
+        if not len(times) or np.isnan(sched_ts):
+            return times, None
+        j = int(np.searchsorted(times, sched_ts))
+        if j == len(times) or (j > 0 and sched_ts - times[j - 1] < times[j] - sched_ts):
+            j -= 1
+        return times, j if abs(times[j] - sched_ts) <= MATCH_TOLERANCE_SECS else None
+
+    def scheduled_headway(self, key: tuple[str, int], sched_ts: float) -> tuple[float, float]:
+        """Return the scheduled gap before the arrival at ``key`` scheduled near ``sched_ts``.
+
+        The second value is the preceding scheduled arrival. Both are ``NaN``
+        when no arrival lies within :data:`MATCH_TOLERANCE_SECS` or the matched
+        arrival is the first of the index.
+        """
+        times, j = self._match(key, sched_ts)
+        if j is None or j == 0:
+            return np.nan, np.nan
+        return float(times[j] - times[j - 1]), float(times[j - 1])
+
+    def next_scheduled_gap(self, key: tuple[str, int], ts: int) -> float:
+        """Return seconds from ``ts`` to the next scheduled arrival at ``key`` (``NaN`` if none)."""
+        times = self.arrivals(key)
+        j = int(np.searchsorted(times, ts))
+        return float(times[j] - ts) if j < len(times) else np.nan
+
+    def missing_trips(
+        self, ts: int, horizon: int, observed_trip_ids: Iterable[str]
+    ) -> dict[tuple[str, int], int]:
+        """Count arrivals scheduled in ``[ts, ts + horizon)`` whose trip is absent from the feed.
+
+        A trip that is scheduled but not reported by any trip update of the
+        snapshot is treated as cancelled. Keys without such trips are omitted.
+        """
+        if not len(self.times):
+            return {}
+        window = np.clip([ts - self._base, ts + horizon - self._base], 0, self._span)
+        lo = np.searchsorted(self._keyed, self._offsets + window[0])
+        hi = np.searchsorted(self._keyed, self._offsets + window[1])
+        lengths = (hi - lo)[hi > lo]
+        if not len(lengths):
+            return {}
+        # row positions of every non-empty window, concatenated
+        starts = lo[hi > lo]
+        rows = np.arange(lengths.sum()) + np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+        observed = self._trips.get_indexer(list(set(observed_trip_ids)))
+        missing = rows[~np.isin(self._trip_codes[rows], observed[observed >= 0])]
+        counts = np.bincount(self._key_of_row[missing], minlength=len(self._keys))
+        return {self._keys[k]: int(counts[k]) for k in np.flatnonzero(counts)}
+
+
+class StaticTimetable:
+    """Per-service-day :class:`TimetableIndex` loader over a static schedule directory."""
+
+    def __init__(self, static_dir: Path) -> None:
+        """Use the ``station_schedule.parquet`` and ``service_calendar.parquet`` in ``static_dir``."""
+        self.static_dir = Path(static_dir)
+        for name in ("station_schedule.parquet", "service_calendar.parquet"):
+            if not (self.static_dir / name).exists():
+                raise FileNotFoundError(f"{name} not found in {self.static_dir}")
+        self._day: date | None = None
+        self._index: TimetableIndex | None = None
+
+    def day_arrivals(self, service_date: date) -> pd.DataFrame:
+        """Return the scheduled arrivals of ``service_date`` with epoch ``arrival`` times."""
+        df = read_station_schedule(
+            self.static_dir,
+            service_date,
+            columns=["trip_id", "stop_id", "direction_id", "sched_arr"],
+        )
+        df["arrival"] = service_day_origin(service_date) + df.pop("sched_arr")
+        return df
+
+    def index_for(self, ts: int) -> TimetableIndex:
+        """Return the index covering snapshot ``ts``.
+
+        Trips of the previous service day that run past midnight are included.
+        The index of the current service day is cached.
+        """
+        day = sydney_context(ts).service_day
+        if day != self._day:
+            frames = [self.day_arrivals(day - timedelta(days=1)), self.day_arrivals(day)]
+            self._index = TimetableIndex(pd.concat(frames, ignore_index=True))
+            self._day = day
+            logger.info("Loaded timetable for %s: %d scheduled arrivals", day, len(self._index))
+        return self._index
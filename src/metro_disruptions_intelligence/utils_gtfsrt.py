@@ -8,6 +8,8 @@ from types import SimpleNamespace
 import pandas as pd
 import pytz
 
+from .time_context import sydney_table
+
 _TZ_SYDNEY = pytz.timezone("Australia/Sydney")
 _TZ_LONDON = pytz.timezone("Europe/London")
 
@@ -40,9 +42,7 @@ def is_new_service_day(prev_ts: int | None, cur_ts: int, reset_at_hour: int) ->
     """Return ``True`` if ``cur_ts`` starts a new service day."""
     if prev_ts is None:
         return False
-    prev = sydney_time(prev_ts)
-    cur = sydney_time(cur_ts)
-    return (cur.date() != prev.date()) and (cur.hour >= reset_at_hour)
+    return bool(sydney_table().is_new_service_day(prev_ts, cur_ts, reset_at_hour))
 
 
 def make_fake_tu(
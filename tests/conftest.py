@@ -8,7 +8,12 @@ def test_content(response):
 ```
 """
 
+import json
+from datetime import datetime
+from pathlib import Path
+
 import pytest
+import pytz
 
 
 @pytest.fixture
@@ -19,3 +24,47 @@ def response():
     """
     # import requests
     # return requests.get('https://github.com/arup-group/cookiecutter-pypackage')
+
+
+SAMPLES = {
+    "alerts": Path("sample_data/rt/sample_alert.json"),
+    "trip_updates": Path("sample_data/rt/sample_trip_update.json"),
+    "vehicle_positions": Path("sample_data/rt/sample_vehicles_position.json"),
+}
+# first whole minute after the sample header timestamps
+FIRST_TS = 1743462000
+
+
+def _shift(obj, secs: int):
+    if isinstance(obj, dict):
+        return {
+            k: v + secs if k in {"timestamp", "time"} and isinstance(v, int) else _shift(v, secs)
+            for k, v in obj.items()
+        }
+    if isinstance(obj, list):
+        return [_shift(v, secs) for v in obj]
+    return obj
+
+
+def _make_raw_minutes(root: Path, n: int) -> list[int]:
+    london = pytz.timezone("Europe/London")
+    minutes = []
+    for k in range(n):
+        ts = FIRST_TS + 60 * k
+        name = datetime.fromtimestamp(ts, london).strftime("%Y_%d_%m_%H_%M_%S.json")
+        for feed, sample in SAMPLES.items():
+            out = root / feed / name
+            out.parent.mkdir(parents=True, exist_ok=True)
+            out.write_text(json.dumps(_shift(json.loads(sample.read_text()), 60 * k)))
+        minutes.append(ts)
+    return minutes
+
+
+@pytest.fixture
+def make_raw_minutes():
+    """Return a factory writing ``n`` consecutive raw JSON minutes below a root.
+
+    The sample feeds are re-timed by one minute per file and named with the
+    London-local ``YYYY_DD_MM_HH_MM_SS.json`` convention of the collector.
+    """
+    return _make_raw_minutes
@@ -1,11 +1,134 @@
+"""Peak memory budgets of the pipeline stages on one synthetic service day.
+
+Run with memray to check every allocation, native ones included::
+
+    pytest -p memray -m "high_mem" --no-cov
+
+Without memray a separate budget is checked against the peak traced by
+:mod:`tracemalloc`, which covers the Python and NumPy heaps but not Arrow
+buffers. Both include the warnings pytest records, such as the per-entity
+pydantic deprecation warnings of ingestion. Data is generated once per module
+by :mod:`~.etl.synthetic`, outside the measured stages.
+"""
+
+import tracemalloc
+from pathlib import Path
+
 import pytest
 
-BENCHMARK_MEM = "1000 MB"
-BENCHMARK_SECONDS = 100
+from metro_disruptions_intelligence.detect.backfill import backfill
+from metro_disruptions_intelligence.detect.streaming_iforest import DEFAULT_STATIONS
+from metro_disruptions_intelligence.etl.ingest_rt import ingest_all_rt, union_all_feeds
+from metro_disruptions_intelligence.etl.synthetic import SyntheticConfig, generate_synthetic_feeds
+from metro_disruptions_intelligence.feature_runner import generate_features
+from metro_disruptions_intelligence.features import build_route_map
+from metro_disruptions_intelligence.processed_reader import load_rt_dataset
+
+BENCHMARK_SECONDS = 900
+# 2025-04-01 05:00 Sydney, then 19 hours of service
+DAY = SyntheticConfig(start_ts=1743444000, minutes_per_day=19 * 60, disruptions_per_day=3)
+# one line over Metro stations, so the detector's default station filter keeps its rows
+STOPS = sorted(DEFAULT_STATIONS)[:6]
+ROUTE_MAP = {("SYN_M1", 0): STOPS, ("SYN_M1", 1): STOPS[::-1]}
+# (memray, tracemalloc) peak budgets, about twice the peaks of each test run alone on DAY
+BUDGETS = {
+    "ingest": ("100 MB", "100 MB"),
+    "union": ("100 MB", "60 MB"),
+    "load": ("100 MB", "60 MB"),
+    "route_map": ("40 MB", "30 MB"),
+    "features": ("40 MB", "30 MB"),
+    "detect": ("80 MB", "100 MB"),
+}
+
+
+def _within_budget(request: pytest.FixtureRequest, stage: str, func, *args):
+    """Return ``func(*args)``, checking its traced peak against the budget unless memray runs."""
+    if request.config.pluginmanager.hasplugin("memray"):
+        return func(*args)
+    limit = BUDGETS[stage][1]
+    value, unit = limit.split()
+    budget = float(value) * {"KB": 1e3, "MB": 1e6, "GB": 1e9}[unit]
+    tracemalloc.start()
+    try:
+        result = func(*args)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    assert peak <= budget, f"{stage} traced peak {peak / 1e6:.1f} MB exceeds {limit}"
+    return result
+
+
+@pytest.fixture(scope="module")
+def raw_day(tmp_path_factory) -> Path:
+    root = tmp_path_factory.mktemp("raw")
+    generate_synthetic_feeds(ROUTE_MAP, root, DAY, "json")
+    return root
+
+
+@pytest.fixture(scope="module")
+def processed_day(tmp_path_factory) -> Path:
+    root = tmp_path_factory.mktemp("rt")
+    generate_synthetic_feeds(ROUTE_MAP, root, DAY, "parquet")
+    return root
+
+
+@pytest.fixture(scope="module")
+def features_day(tmp_path_factory, processed_day: Path) -> tuple[Path, int]:
+    root = tmp_path_factory.mktemp("features")
+    return root, generate_features(processed_day, root)
+
+
+@pytest.mark.high_mem
+@pytest.mark.limit_memory(BUDGETS["ingest"][0])
+@pytest.mark.timeout(BENCHMARK_SECONDS)
+def test_ingest_day(request, raw_day: Path, tmp_path: Path) -> None:
+    _within_budget(request, "ingest", ingest_all_rt, raw_day, tmp_path / "rt")
+    assert any((tmp_path / "rt" / "trip_updates").rglob("*.parquet"))
+
+
+@pytest.mark.high_mem
+@pytest.mark.limit_memory(BUDGETS["union"][0])
+@pytest.mark.timeout(BENCHMARK_SECONDS)
+def test_union_all_feeds_day(request, processed_day: Path, tmp_path: Path) -> None:
+    out = tmp_path / "station_event.parquet"
+    _within_budget(request, "union", union_all_feeds, processed_day, out)
+    assert out.exists()
 
 
-@pytest.mark.limit_memory(BENCHMARK_MEM)
+@pytest.mark.high_mem
+@pytest.mark.limit_memory(BUDGETS["load"][0])
 @pytest.mark.timeout(BENCHMARK_SECONDS)
+def test_load_rt_dataset_day(request, processed_day: Path) -> None:
+    df = _within_budget(request, "load", load_rt_dataset, processed_day)
+    assert set(df["feed_type"]) == {"alerts", "trip_updates", "vehicle_positions"}
+
+
 @pytest.mark.high_mem
-def test_mem():
-    pass
+@pytest.mark.limit_memory(BUDGETS["route_map"][0])
+@pytest.mark.timeout(BENCHMARK_SECONDS)
+def test_build_route_map_day(request, processed_day: Path) -> None:
+    assert _within_budget(request, "route_map", build_route_map, processed_day) == ROUTE_MAP
+
+
+@pytest.mark.high_mem
+@pytest.mark.limit_memory(BUDGETS["features"][0])
+@pytest.mark.timeout(BENCHMARK_SECONDS)
+def test_generate_features_day(request, processed_day: Path, tmp_path: Path) -> None:
+    written = _within_budget(
+        request, "features", generate_features, processed_day, tmp_path / "features"
+    )
+    assert written == len(list((tmp_path / "features").rglob("*.parquet")))
+    # the minute after London midnight is filed under the previous day and not read back
+    assert written >= DAY.minutes_per_day - 1
+
+
+@pytest.mark.high_mem
+@pytest.mark.limit_memory(BUDGETS["detect"][0])
+@pytest.mark.timeout(BENCHMARK_SECONDS)
+def test_detect_anomalies_day(request, features_day: tuple[Path, int], tmp_path: Path) -> None:
+    features_root, written = features_day
+    end_ts = DAY.start_ts + DAY.minutes_per_day * 60
+    stats = _within_budget(
+        request, "detect", backfill, features_root, tmp_path / "scores", {}, DAY.start_ts, end_ts
+    )
+    assert stats.snapshots == written
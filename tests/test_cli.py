@@ -1,12 +1,16 @@
 """Tests for :mod:`metro_disruptions_intelligence.cli`."""
 
 import logging
+import os
+import subprocess
+import sys
 from pathlib import Path
 
 import pandas as pd
 import pytest
 from click.testing import CliRunner
 
+import metro_disruptions_intelligence
 from metro_disruptions_intelligence import cli
 from metro_disruptions_intelligence.processed_reader import compose_path
 from metro_disruptions_intelligence.utils_gtfsrt import make_fake_tu
@@ -20,6 +24,47 @@ def test_cli_group_help():
     assert "ingest-rt" in result.output
 
 
+HEAVY_MODULES = ("pandas", "pyarrow", "duckdb", "river", "yaml", "pytz")
+# generous so loaded CI runners pass; the eager imports took well over a second
+IMPORT_BUDGET_US = 500_000
+
+
+def _run_python(*args: str) -> subprocess.CompletedProcess:
+    src = str(Path(metro_disruptions_intelligence.__file__).parents[1])
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join([src, os.environ.get("PYTHONPATH", "")])}
+    return subprocess.run(
+        [sys.executable, *args], capture_output=True, text=True, env=env, check=True
+    )
+
+
+def test_cli_import_stays_within_budget():
+    proc = _run_python("-X", "importtime", "-c", "import metro_disruptions_intelligence.cli")
+    cumulative = {}
+    for line in proc.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            _, total, name = line.split("|")
+            if total.strip().isdigit():
+                cumulative[name.strip()] = int(total)
+    loaded = {name.split(".")[0] for name in cumulative}
+    assert loaded.isdisjoint(HEAVY_MODULES), sorted(loaded & set(HEAVY_MODULES))
+    assert cumulative["metro_disruptions_intelligence.cli"] < IMPORT_BUDGET_US
+
+
+def test_cli_help_does_not_load_subcommand_dependencies():
+    code = (
+        "import sys\n"
+        "from metro_disruptions_intelligence.cli import cli\n"
+        "try:\n"
+        "    cli(['detect-anomalies', '--help'])\n"
+        "except SystemExit:\n"
+        "    pass\n"
+        f"print(sorted(m for m in {HEAVY_MODULES!r} if m in sys.modules))\n"
+    )
+    proc = _run_python("-c", code)
+    assert "--processed-root" in proc.stdout
+    assert proc.stdout.strip().endswith("[]")
+
+
 def test_cli_ingest_commands(tmp_path):
     runner = CliRunner()
 
@@ -64,3 +109,33 @@ def test_generate_features_warn_empty_vehicle_positions(tmp_path, caplog):
     assert result.exit_code == 0
     assert f"vehicle_positions file {vp_file} contains no rows" in caplog.text
     assert list(output_root.rglob("stations_feats_*.parquet"))
+
+
+@pytest.mark.parametrize("memory", [False, True])
+def test_profile_writes_command_report(tmp_path, memory):
+    profiles = tmp_path / "profiles"
+    result = CliRunner().invoke(
+        cli.cli,
+        [
+            "--profile",
+            *(["--profile-memory"] if memory else []),
+            "--profile-dir",
+            str(profiles),
+            "ingest-rt",
+            "sample_data/rt",
+            "--processed-root",
+            str(tmp_path / "rt"),
+        ],
+    )
+    assert result.exit_code == 0, result.output
+
+    (report,) = profiles.glob("ingest-rt-*.txt")
+    text = report.read_text()
+    assert "by cumulative time" in text
+    assert "ingest_one_file" in text
+    assert ("allocators alive at exit" in text) is memory
+    assert ("timings include the tracemalloc overhead" in text) is memory
+    assert report.with_suffix(".prof").exists()
+    stacks = report.with_suffix(".collapsed").read_text().splitlines()
+    assert stacks
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in stacks)
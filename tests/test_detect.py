@@ -1,16 +1,30 @@
+import json
 from datetime import datetime
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
+import pytest
 import pytz
 import yaml
 from click.testing import CliRunner
 
 from metro_disruptions_intelligence import cli
+from metro_disruptions_intelligence.detect.backfill import service_day_shards
+from metro_disruptions_intelligence.detect.model_bank import ModelBank
+from metro_disruptions_intelligence.detect.model_io import MODEL_FORMAT_VERSION, read_model_arrays
+from metro_disruptions_intelligence.detect.preprocess import MinutePlan
 from metro_disruptions_intelligence.detect.streaming_iforest import (
+    DEFAULT_STATIONS,
     IForestConfig,
     StreamingIForestDetector,
 )
+from metro_disruptions_intelligence.features import write_features
+from metro_disruptions_intelligence.processed_reader import (
+    daily_features_path,
+    read_feature_range,
+    snapshot_path,
+)
 
 
 def make_df(ts: int, stop_ids: list[str]) -> pd.DataFrame:
@@ -199,3 +213,235 @@ threshold_quantile: [0.97]
         assert result.exit_code == 0
         assert "No feature files found for the specified range" in result.output
         assert not Path("iforest_best.yaml").exists()
+
+
+def test_array_model_roundtrip_is_exact(tmp_path: Path) -> None:
+    rng = np.random.default_rng(0)
+
+    def frame(ts: int) -> pd.DataFrame:
+        df = make_df(ts, ["1", "2", "3"])
+        df[["congestion_level", "occupancy"]] = rng.random((3, 2))
+        return df
+
+    cfg = IForestConfig(n_trees=5, height=4, window_size=8)
+    det = StreamingIForestDetector(cfg, station_ids=["1", "2", "3"])
+    ts = 1714665600
+    for k in range(10):
+        det.score_and_update(frame(ts + 60 * k))
+    p = tmp_path / "model.npz"
+    det.save(p)
+    assert isinstance(read_model_arrays(p)["hst_l_mass"], np.memmap)
+
+    det2 = StreamingIForestDetector.load(p)
+    assert list(det2.scores) == list(det.scores)
+    assert det2.current_service_day == det.current_service_day
+    for k in range(10, 20):
+        df = frame(ts + 60 * k)
+        pd.testing.assert_frame_equal(det.score_and_update(df), det2.score_and_update(df))
+    assert det2.n_obs == det.n_obs
+
+
+def test_array_model_rejects_other_versions(tmp_path: Path) -> None:
+    det = StreamingIForestDetector(IForestConfig(window_size=5), station_ids=["1"])
+    det.score_and_update(make_df(0, ["1"]))
+    p = tmp_path / "model.npz"
+    det.save(p)
+    arrays = dict(np.load(p))
+    arrays["version"] = np.array(MODEL_FORMAT_VERSION + 1)
+    np.savez(p, **arrays)
+    with pytest.raises(ValueError, match="version"):
+        StreamingIForestDetector.load(p)
+
+
+def test_detect_anomalies_workers_match_serial(tmp_path: Path) -> None:
+    rng = np.random.default_rng(2)
+    features_root = tmp_path / "features"
+    stations = ["2155269", "2155267", "2153402"]
+    # 2024-05-20 12:00 Sydney; days above 12 keep the CLI times unambiguous
+    start, end = 1716170400, 1716170400 + 48 * 3600
+    for ts in range(start, end, 1800):
+        df = make_df(ts, stations)
+        df[["congestion_level", "occupancy"]] = rng.random((len(stations), 2))
+        write_features(df, snapshot_path(ts, features_root))
+    config = tmp_path / "iforest.yaml"
+    config.write_text("n_trees: 5\nheight: 4\nwindow_size: 6\nseed: 7\n")
+    assert len(service_day_shards(start, end, config)) == 3
+
+    outputs = {}
+    for workers in (1, 2):
+        out_root = tmp_path / f"scores_{workers}"
+        result = CliRunner().invoke(
+            cli.cli,
+            [
+                "detect-anomalies",
+                "--processed-root",
+                str(features_root),
+                "--out-root",
+                str(out_root),
+                "--config",
+                str(config),
+                "--start",
+                datetime.fromtimestamp(start).isoformat(),
+                "--end",
+                datetime.fromtimestamp(end).isoformat(),
+                "--workers",
+                str(workers),
+            ],
+        )
+        assert result.exit_code == 0, result.output
+        files = sorted(out_root.rglob("*.parquet"))
+        outputs[workers] = (result.output, [f.relative_to(out_root) for f in files], files)
+
+    assert outputs[1][0] == outputs[2][0]
+    assert "anomalies 0 " not in outputs[1][0]
+    assert outputs[1][1] == outputs[2][1] and len(outputs[1][1]) == 96
+    for serial, parallel in zip(outputs[1][2], outputs[2][2]):
+        pd.testing.assert_frame_equal(pd.read_parquet(serial), pd.read_parquet(parallel))
+
+
+def test_model_bank_warm_starts_service_days(tmp_path: Path) -> None:
+    rng = np.random.default_rng(3)
+
+    def frame(ts: int) -> pd.DataFrame:
+        df = make_df(ts, ["1"])
+        df[["congestion_level", "occupancy"]] = rng.random((1, 2))
+        return df
+
+    cfg = IForestConfig(n_trees=5, height=4, window_size=5, seed=1)
+    bank = ModelBank(tmp_path / "bank")
+    det = StreamingIForestDetector(cfg, station_ids=["1"], model_bank=bank)
+    monday_end = 1716224400  # 2024-05-21 03:00 Sydney
+    for ts in range(monday_end - 3600, monday_end, 60):
+        det.score_and_update(frame(ts))
+    # stashed and prepared by the first snapshot of the last 15 minutes
+    assert bank.path("weekday").exists()
+    stashed = json.loads(str(bank.get("weekday")["meta"]))["n_obs"]
+    assert stashed == 45
+
+    out = det.score_and_update(frame(monday_end))
+    assert det.n_obs == stashed + 1
+    assert out["anomaly_score"].iloc[0] > 0
+    cold = StreamingIForestDetector(cfg, station_ids=["1"])
+    assert cold.score_and_update(frame(monday_end))["anomaly_score"].iloc[0] == 0
+
+    # no weekend snapshot yet: Saturday starts cold
+    friday_end = monday_end + 4 * 86_400
+    det.score_and_update(frame(friday_end - 60))
+    det.score_and_update(frame(friday_end))
+    assert det.n_obs == 1
+
+    # a restarted service picks up the weekday snapshot stashed on Friday
+    friday = StreamingIForestDetector.load(bank.path("weekday"))
+    assert friday.current_service_day.isoformat() == "2024-05-24"
+    restarted = StreamingIForestDetector(cfg, station_ids=["1"], model_bank=ModelBank(bank.root))
+    restarted.score_and_update(frame(monday_end + 86_400))
+    assert restarted.n_obs == friday.n_obs + 1
+
+
+def test_pretrain_matches_learn_one_replay() -> None:
+    rng = np.random.default_rng(4)
+    stations = ["2155269", "2155267", "2153402"]
+    start = 1716170400  # 2024-05-20 12:00 Sydney
+    frames = []
+    for ts in range(start, start + 47 * 60, 60):
+        df = make_df(ts, stations)
+        df[["congestion_level", "occupancy"]] = rng.random((len(stations), 2))
+        frames.append(df)
+    cfg = IForestConfig(n_trees=5, height=4, window_size=20, subsample_size=20, seed=5)
+
+    replay = StreamingIForestDetector(cfg)
+    for df in frames:
+        replay.score_and_update(df)
+    bulk = StreamingIForestDetector(cfg)
+    assert bulk.pretrain(pd.concat(frames, ignore_index=True)) == 141
+
+    expected, got = replay.state_arrays(), bulk.state_arrays()
+    for name in expected:
+        if name.startswith("hst_") or name == "scores":
+            np.testing.assert_array_equal(got[name], expected[name], err_msg=name)
+    assert bulk.n_obs == replay.n_obs and bulk.feature_cols == replay.feature_cols
+
+    sampled = StreamingIForestDetector(IForestConfig(**{**cfg.__dict__, "subsample_size": 8}))
+    sampled.pretrain(pd.concat(frames, ignore_index=True), rng=np.random.default_rng(0))
+    assert len(sampled.scores) == 20 and sampled.pipeline[-1].counter == 1
+
+
+def test_pretrain_reads_warmup_days_from_feature_store(tmp_path: Path) -> None:
+    rng = np.random.default_rng(5)
+    monday_end = 1716224400  # 2024-05-21 03:00 Sydney, 2024-05-20 17:00 UTC
+    utc_midnight = monday_end - 17 * 3600
+    daily, n_rows = [], 0
+    for ts in range(monday_end - 86_400, monday_end, 600):
+        df = make_df(ts, ["1"])
+        df[["congestion_level", "occupancy"]] = rng.random((1, 2))
+        n_rows += 1
+        if ts < utc_midnight:
+            daily.append(df)
+        else:
+            write_features(df, snapshot_path(ts, tmp_path))
+    # the older UTC day is compacted into the daily feature store
+    write_features(
+        pd.concat(daily, ignore_index=True), daily_features_path(daily[0].iloc[0, 0], tmp_path)
+    )
+    assert len(read_feature_range(tmp_path, monday_end - 86_400, monday_end)) == n_rows
+
+    cfg = IForestConfig(
+        n_trees=5, height=4, window_size=20, subsample_size=8, warmup_days=1, seed=1
+    )
+    det = StreamingIForestDetector(cfg, station_ids=["1"], history_root=tmp_path)
+    out = det.score_and_update(make_df(monday_end, ["1"]))
+    assert det.n_obs == n_rows + 1
+    assert out["anomaly_score"].iloc[0] > 0
+
+
+def test_minute_plan_filters_and_packs_features() -> None:
+    df = make_df(1716170400, ["2155269", "999", "2155267", "2153402"])
+    df["occupancy"] = [np.nan, 1.5, 0.25, 3.0]
+    df["is_train_present"] = [True, False, False, True]
+    df["route_id"] = "T1"
+    df.loc[2, ["node_degree", "congestion_level", "occupancy", "snapshot_timestamp"]] = 0
+    plan = MinutePlan(df, DEFAULT_STATIONS, drop_features=["hub_flag"])
+    assert plan.feature_cols == [
+        "node_degree",
+        "central_flag",
+        "congestion_level",
+        "occupancy",
+        "is_train_present",
+    ]
+    stop_ids, direction_ids, X = plan.apply(df)
+    assert stop_ids.tolist() == ["2155269", "2153402"]
+    assert direction_ids.tolist() == [0, 0]
+    assert X.dtype == np.float32 and X.flags.c_contiguous
+    np.testing.assert_array_equal(X, [[1, 0, 1, 0, 1], [1, 0, 1, 3, 1]])
+
+    categorical = df.astype({"stop_id": "category"})
+    assert not plan.matches(categorical)
+    plan = MinutePlan(categorical, DEFAULT_STATIONS, drop_features=["hub_flag"])
+    np.testing.assert_array_equal(plan.apply(categorical)[2], X)
+
+    det = StreamingIForestDetector(IForestConfig(window_size=5))
+    det.score_and_update(df)
+    compiled = det._plan
+    det.score_and_update(df.assign(snapshot_timestamp=1716170460))
+    assert det._plan is compiled
+    det.score_and_update(categorical.assign(snapshot_timestamp=1716170520))
+    assert det._plan is not compiled and det.feature_cols == compiled.feature_cols
+
+
+def test_min_max_scaling_is_persisted(tmp_path: Path) -> None:
+    rng = np.random.default_rng(6)
+    cfg = IForestConfig(n_trees=5, height=4, window_size=5, seed=2, scale=True)
+    det = StreamingIForestDetector(cfg, station_ids=["1", "2"])
+    for k in range(4):
+        df = make_df(1716170400 + 60 * k, ["1", "2"])
+        df[["congestion_level", "occupancy"]] = rng.normal(50, 10, (2, 2))
+        det.score_and_update(df)
+    np.testing.assert_array_equal(det.scaler.min[:2], [1, 0])
+    assert det.scaler.max[3] > det.scaler.min[3]
+
+    det.save(tmp_path / "model.npz")
+    loaded = StreamingIForestDetector.load(tmp_path / "model.npz")
+    np.testing.assert_array_equal(loaded.scaler.max, det.scaler.max)
+    nxt = make_df(1716170640, ["1", "2"])
+    nxt[["congestion_level", "occupancy"]] = [[40.0, 60.0], [55.0, 45.0]]
+    pd.testing.assert_frame_equal(loaded.score_and_update(nxt), det.score_and_update(nxt))
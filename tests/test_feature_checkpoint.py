@@ -0,0 +1,98 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from click.testing import CliRunner
+
+from metro_disruptions_intelligence import cli
+from metro_disruptions_intelligence.etl.ingest_rt import ingest_all_rt
+from metro_disruptions_intelligence.feature_runner import generate_features
+from metro_disruptions_intelligence.features import (
+    SnapshotFeatureBuilder,
+    build_route_map,
+    checkpoint_path,
+    find_checkpoint,
+    snapshot_frame,
+)
+from metro_disruptions_intelligence.processed_reader import (
+    compose_path,
+    discover_all_snapshot_minutes,
+    snapshot_path,
+)
+
+
+def _processed(tmp_path: Path, make_raw_minutes, n: int) -> tuple[Path, list[int]]:
+    make_raw_minutes(tmp_path / "raw", n)
+    ingest_all_rt(tmp_path / "raw", tmp_path / "rt")
+    return tmp_path / "rt", discover_all_snapshot_minutes(tmp_path / "rt")
+
+
+def _frames(ts: int, root: Path) -> tuple[pd.DataFrame, pd.DataFrame]:
+    return (
+        pd.read_parquet(compose_path(ts, root, "trip_updates")),
+        pd.read_parquet(compose_path(ts, root, "vehicle_positions")),
+    )
+
+
+def test_checkpoint_round_trip(tmp_path: Path, make_raw_minutes) -> None:
+    root, minutes = _processed(tmp_path, make_raw_minutes, 5)
+    warm = SnapshotFeatureBuilder(build_route_map(root))
+    for ts in minutes[:3]:
+        snapshot_frame(warm, *_frames(ts, root), ts)
+    path = warm.save_checkpoint(checkpoint_path(minutes[2], tmp_path / "ckpt"), minutes[2])
+
+    restored = SnapshotFeatureBuilder(build_route_map(root))
+    assert restored.load_checkpoint(path) == minutes[2]
+    assert find_checkpoint(tmp_path / "ckpt", minutes[3]) == path
+    assert find_checkpoint(tmp_path / "ckpt", minutes[2]) is None
+    assert restored.LAG_TU_SECS == warm.LAG_TU_SECS
+    assert list(restored._lag_hist_tu) == list(warm._lag_hist_tu)
+    for key, state in warm._state.items():
+        other = restored._state[key]
+        assert list(other.rolling_headway_60) == list(state.rolling_headway_60)
+        assert other.last_trip_id == state.last_trip_id
+        assert other.last_actual_arrival == state.last_actual_arrival
+
+    expected = snapshot_frame(warm, *_frames(minutes[3], root), minutes[3])
+    result = snapshot_frame(restored, *_frames(minutes[3], root), minutes[3])
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_resume_matches_full_run(tmp_path: Path, make_raw_minutes) -> None:
+    root, minutes = _processed(tmp_path, make_raw_minutes, 7)
+    assert generate_features(root, tmp_path / "full") == len(minutes)
+
+    ckpt = tmp_path / "ckpt"
+    generate_features(
+        root, tmp_path / "inc", end_ts=minutes[2], checkpoint_dir=ckpt, checkpoint_every=1
+    )
+    assert sorted(ckpt.glob("*.npz"))[-1] == checkpoint_path(minutes[2], ckpt)
+    assert not list(ckpt.glob("*.tmp"))
+
+    written = generate_features(
+        root, tmp_path / "inc", start_ts=minutes[4], checkpoint_dir=ckpt, checkpoint_every=1
+    )
+    assert written == 2
+    assert not snapshot_path(minutes[3], tmp_path / "inc").exists()
+    for ts in minutes[4:]:
+        full = pd.read_parquet(snapshot_path(ts, tmp_path / "full"))
+        inc = pd.read_parquet(snapshot_path(ts, tmp_path / "inc"))
+        pd.testing.assert_frame_equal(inc, full)
+
+
+def test_generate_features_cli_writes_checkpoints(tmp_path: Path, make_raw_minutes) -> None:
+    root, minutes = _processed(tmp_path, make_raw_minutes, 4)
+    result = CliRunner().invoke(
+        cli.cli,
+        [
+            "generate-features",
+            str(root),
+            "--output-root",
+            str(tmp_path / "out"),
+            "--checkpoint-dir",
+            str(tmp_path / "ckpt"),
+        ],
+    )
+    assert result.exit_code == 0, result.output
+    with np.load(checkpoint_path(minutes[-1], tmp_path / "ckpt")) as data:
+        assert int(data["ts"]) == minutes[-1]
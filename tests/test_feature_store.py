@@ -0,0 +1,83 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+from click.testing import CliRunner
+
+from metro_disruptions_intelligence import cli, feature_store
+from metro_disruptions_intelligence.features import read_features, write_features
+from metro_disruptions_intelligence.processed_reader import (
+    daily_features_path,
+    read_cross_section,
+    read_station_series,
+    snapshot_path,
+)
+
+# 2025-04-01 23:55 UTC, so the snapshots span two UTC days
+START = 1743551700
+STOPS = [f"20000{i:02d}" for i in range(30)]
+
+
+def _write_minutes(root: Path, n: int) -> list[int]:
+    rng = np.random.default_rng(0)
+    minutes = [START + 60 * k for k in range(n)]
+    for ts in minutes:
+        feats = pd.DataFrame({
+            "stop_id": np.repeat(STOPS, 2),
+            "direction_id": np.tile([0, 1], len(STOPS)),
+            "arrival_delay_t": rng.normal(0, 60, 2 * len(STOPS)),
+            "hub_flag": 0,
+            "snapshot_timestamp": ts,
+        })
+        write_features(feats, snapshot_path(ts, root))
+    return minutes
+
+
+def test_feature_store_queries_match_minute_files(tmp_path: Path, monkeypatch) -> None:
+    monkeypatch.setattr(feature_store, "ROW_GROUP_ROWS", 20)
+    minutes = _write_minutes(tmp_path, 10)
+    written = feature_store.build_feature_store(tmp_path)
+    assert written == [
+        daily_features_path(START, tmp_path),
+        daily_features_path(minutes[-1], tmp_path),
+    ]
+
+    meta = pq.ParquetFile(written[1]).metadata
+    assert meta.num_row_groups > 1
+    stop_col = meta.schema.names.index("stop_id")
+    ranges = [
+        (
+            meta.row_group(i).column(stop_col).statistics.min,
+            meta.row_group(i).column(stop_col).statistics.max,
+        )
+        for i in range(meta.num_row_groups)
+    ]
+    assert ranges == sorted(ranges)
+
+    minute_frames = pd.concat([read_features(snapshot_path(ts, tmp_path)) for ts in minutes])
+    expected = minute_frames[
+        (minute_frames["stop_id"] == "2000007") & (minute_frames["direction_id"] == 1)
+    ]
+    series = read_station_series(tmp_path, "2000007", 1)
+    pd.testing.assert_frame_equal(series, expected.reset_index(drop=True))
+    assert len(read_station_series(tmp_path, "2000007", start_ts=minutes[6])) == 8
+
+    snapshot = read_features(snapshot_path(minutes[3], tmp_path))
+    pd.testing.assert_frame_equal(read_cross_section(tmp_path, minutes[3]), snapshot)
+    # once the minute file is pruned the daily file answers instead
+    snapshot_path(minutes[3], tmp_path).unlink()
+    pd.testing.assert_frame_equal(read_cross_section(tmp_path, minutes[3]), snapshot)
+    cols = ["stop_id", "arrival_delay_t"]
+    pd.testing.assert_frame_equal(read_cross_section(tmp_path, minutes[3], cols), snapshot[cols])
+    assert read_cross_section(tmp_path, minutes[-1] + 86_400).empty
+
+
+def test_build_feature_store_cli(tmp_path: Path) -> None:
+    _write_minutes(tmp_path, 2)
+    result = CliRunner().invoke(
+        cli.cli, ["build-feature-store", str(tmp_path), "--out-root", str(tmp_path / "store")]
+    )
+    assert result.exit_code == 0, result.output
+    assert "Wrote 1 daily feature files" in result.output
+    assert daily_features_path(START, tmp_path / "store").exists()
@@ -1,9 +1,16 @@
 from pathlib import Path
 
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 import pytest
 
-from metro_disruptions_intelligence.features import SnapshotFeatureBuilder
+from metro_disruptions_intelligence.features import (
+    SnapshotFeatureBuilder,
+    read_features,
+    snapshot_frame,
+    write_features,
+)
 from metro_disruptions_intelligence.utils_gtfsrt import make_fake_tu, make_fake_vp
 
 
@@ -91,3 +98,33 @@ def test_empty_vehicle_positions_returns_features() -> None:
 
     assert not feats.empty
     assert (feats["is_train_present"] == 0).all()
+
+
+def test_compact_feature_snapshot_round_trip(tmp_path: Path) -> None:
+    sample = pd.read_parquet("sample_data/processed_sample/station_event.parquet")
+    trip = sample[sample["feed_type"] == "trip_updates"]
+    veh = sample[sample["feed_type"] == "vehicle_positions"]
+    ts = int(trip["snapshot_timestamp"].min())
+    builder = SnapshotFeatureBuilder(_route_dir_to_stops(trip))
+    feats = snapshot_frame(
+        builder, trip[trip["snapshot_timestamp"] == ts], veh[veh["snapshot_timestamp"] == ts], ts
+    )
+
+    compact = tmp_path / "compact.parquet"
+    write_features(feats, compact)
+    stored = pq.read_schema(compact)
+    assert "local_dt" not in stored.names
+    assert stored.field("arrival_delay_t").type == pa.float32()
+    assert stored.field("is_train_present").type == pa.int8()
+    legacy = tmp_path / "legacy.parquet"
+    feats.to_parquet(legacy, compression="snappy", index=False)
+    assert compact.stat().st_size < legacy.stat().st_size / 2
+
+    restored = read_features(compact)
+    assert list(restored.columns) == list(feats.columns)
+    pd.testing.assert_frame_equal(restored, feats, check_dtype=False, rtol=1e-6)
+    assert read_features(legacy).equals(pd.read_parquet(legacy))
+    assert list(read_features(compact, columns=["stop_id", "local_dt"]).columns) == [
+        "stop_id",
+        "local_dt",
+    ]
@@ -1,6 +1,9 @@
 from __future__ import annotations
 
+import http.server
 import io
+import random
+import threading
 import zipfile
 from datetime import date
 from pathlib import Path
@@ -11,8 +14,10 @@ import sys
 import types
 import importlib.util
 
-sys.modules.setdefault("duckdb", types.ModuleType("duckdb"))
-sys.modules.setdefault("pyarrow", types.ModuleType("pyarrow"))
+# stub only missing modules: a stub left in sys.modules breaks later test modules
+for _name in ("duckdb", "pyarrow"):
+    if importlib.util.find_spec(_name) is None:
+        sys.modules.setdefault(_name, types.ModuleType(_name))
 requests_mod = types.ModuleType("requests")
 requests_mod.get = lambda *a, **k: None
 sys.modules.setdefault("requests", requests_mod)
@@ -81,3 +86,135 @@ def test_download_and_extract(monkeypatch, tmp_path):
     extracted = sorted((tmp_path / "static").glob("*.txt"))
     assert {p.name for p in extracted} == {"stops.txt", "routes.txt"}
     assert out == tmp_path / "static"
+
+
+class _FeedHandler(http.server.BaseHTTPRequestHandler):
+    data = b""
+    etag = '"v1"'
+    truncate_next = False
+    seen: list[dict[str, str]] = []
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        cls = type(self)
+        cls.seen.append(dict(self.headers))
+        if self.headers.get("If-None-Match") == cls.etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        start = 0
+        rng = self.headers.get("Range")
+        if rng and self.headers.get("If-Range", cls.etag) == cls.etag:
+            start = int(rng.split("=")[1].rstrip("-"))
+        body = cls.data[start:]
+        self.send_response(206 if start else 200)
+        self.send_header("Content-Type", "application/zip")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", cls.etag)
+        if start:
+            self.send_header("Content-Range", f"bytes {start}-{len(cls.data) - 1}/{len(cls.data)}")
+        self.end_headers()
+        if cls.truncate_next:
+            cls.truncate_next = False
+            self.wfile.write(body[: len(body) // 2])
+            self.wfile.flush()
+            self.close_connection = True
+            return
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def feed_server(monkeypatch):
+    if not hasattr(sys.modules.get("requests"), "Session"):
+        # replace the stub installed above by the real package for this test
+        monkeypatch.delitem(sys.modules, "requests", raising=False)
+    real_requests = pytest.importorskip("requests")
+    monkeypatch.setattr(fetch_static_v2, "requests", real_requests)
+    monkeypatch.setattr(fetch_static_v2, "tqdm", fake_tqdm)
+    _FeedHandler.seen = []
+    _FeedHandler.truncate_next = False
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _FeedHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setattr(fetch_static_v2, "API_ROOT", f"http://127.0.0.1:{server.server_port}")
+    yield _FeedHandler
+    server.shutdown()
+    server.server_close()
+
+
+def _set_today(monkeypatch, day: date) -> None:
+    monkeypatch.setattr(fetch_static_v2, "date", type("D", (), {"today": staticmethod(lambda: day)}))
+
+
+def make_large_zip_bytes() -> bytes:
+    buf = io.BytesIO()
+    rng = random.Random(0)
+    # incompressible members, so an interrupted transfer leaves whole 1MB chunks
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("stop_times.txt", rng.randbytes(2_000_000))
+        zf.writestr("shapes.txt", rng.randbytes(2_000_000))
+        zf.writestr("stops.txt", "id,name\n1,A\n")
+    return buf.getvalue()
+
+
+def test_download_resumes_partial_file(monkeypatch, tmp_path, feed_server):
+    feed_server.data = make_large_zip_bytes()
+    feed_server.truncate_next = True
+    monkeypatch.setattr(fetch_static_v2, "LARGE_MEMBER_BYTES", 1024)
+    _set_today(monkeypatch, date(2025, 3, 31))
+
+    with pytest.raises(fetch_static_v2.requests.exceptions.ChunkedEncodingError):
+        fetch_static_v2.download_and_extract("key", "metro", tmp_path, skip_if_exists=False)
+    part = tmp_path / "static_feeds" / "2025-03-31_metro.zip.part"
+    partial = part.stat().st_size
+    assert 0 < partial < len(feed_server.data)
+
+    fetch_static_v2.download_and_extract("key", "metro", tmp_path, skip_if_exists=False)
+    assert feed_server.seen[-1]["Range"] == f"bytes={partial}-"
+    assert (tmp_path / "static_feeds" / "2025-03-31_metro.zip").read_bytes() == feed_server.data
+    assert not part.exists()
+    with zipfile.ZipFile(io.BytesIO(feed_server.data)) as zf:
+        for name in zf.namelist():
+            assert (tmp_path / "static" / name).read_bytes() == zf.read(name)
+
+
+def test_unverifiable_or_corrupt_partial_download_restarts(monkeypatch, tmp_path, feed_server):
+    feed_server.data = make_large_zip_bytes()
+    _set_today(monkeypatch, date(2025, 3, 31))
+    feeds = tmp_path / "static_feeds"
+    feeds.mkdir()
+    part = feeds / "2025-03-31_metro.zip.part"
+    zip_path = feeds / "2025-03-31_metro.zip"
+
+    # a partial file without validators may be a prefix of an older feed
+    part.write_bytes(b"\0" * 1000)
+    fetch_static_v2.download_and_extract("key", "metro", tmp_path, skip_if_exists=False)
+    assert "Range" not in feed_server.seen[-1]
+    assert zip_path.read_bytes() == feed_server.data
+
+    # a validated prefix whose bytes are wrong yields a corrupt zip
+    zip_path.unlink()
+    part.write_bytes(b"\0" * 1000)
+    part.with_name(part.name + ".http.json").write_text('{"etag": "\\"v1\\""}')
+    fetch_static_v2.download_and_extract("key", "metro", tmp_path, skip_if_exists=False)
+    assert [h.get("Range") for h in feed_server.seen[-2:]] == ["bytes=1000-", None]
+    assert zip_path.read_bytes() == feed_server.data
+    assert not part.exists()
+
+
+def test_unchanged_feed_is_not_downloaded_again(monkeypatch, tmp_path, feed_server):
+    feed_server.data = make_zip_bytes()
+    _set_today(monkeypatch, date(2025, 3, 31))
+    fetch_static_v2.download_and_extract("key", "metro", tmp_path, skip_if_exists=False)
+
+    _set_today(monkeypatch, date(2025, 4, 1))
+    fetch_static_v2.download_and_extract("key", "metro", tmp_path)
+    assert feed_server.seen[-1]["If-None-Match"] == '"v1"'
+    assert not (tmp_path / "static_feeds" / "2025-04-01_metro.zip").exists()
+
+    feed_server.etag = '"v2"'
+    fetch_static_v2.download_and_extract("key", "metro", tmp_path)
+    assert (tmp_path / "static_feeds" / "2025-04-01_metro.zip").exists()
+    feed_server.etag = '"v1"'
@@ -0,0 +1,80 @@
+import os
+from pathlib import Path
+
+import pandas as pd
+from click.testing import CliRunner
+
+from metro_disruptions_intelligence import cli
+from metro_disruptions_intelligence.etl.ingest_rt import ingest_all_rt
+from metro_disruptions_intelligence.feature_runner import MANIFEST_NAME, generate_features
+from metro_disruptions_intelligence.processed_reader import (
+    compose_path,
+    discover_all_snapshot_minutes,
+    snapshot_path,
+)
+
+
+def _processed(tmp_path: Path, make_raw_minutes, n: int) -> tuple[Path, list[int]]:
+    make_raw_minutes(tmp_path / "raw", n)
+    ingest_all_rt(tmp_path / "raw", tmp_path / "rt")
+    return tmp_path / "rt", discover_all_snapshot_minutes(tmp_path / "rt")
+
+
+def test_incremental_skips_unchanged_minutes(tmp_path: Path, make_raw_minutes) -> None:
+    root, minutes = _processed(tmp_path, make_raw_minutes, 6)
+    out = tmp_path / "out"
+    assert generate_features(root, out, incremental=True) == len(minutes)
+    assert (snapshot_path(minutes[0], out).parent / MANIFEST_NAME).exists()
+    assert generate_features(root, out, incremental=True) == 0
+
+    # a touched but identical input is recognised by its content hash
+    tu = compose_path(minutes[1], root, "trip_updates")
+    os.utime(tu, ns=(tu.stat().st_atime_ns, tu.stat().st_mtime_ns + 10**9))
+    assert generate_features(root, out, incremental=True) == 0
+
+
+def test_incremental_rebuilds_dependent_minutes(tmp_path: Path, make_raw_minutes) -> None:
+    root, minutes = _processed(tmp_path, make_raw_minutes, 6)
+    out, ckpt = tmp_path / "out", tmp_path / "ckpt"
+    generate_features(root, out, incremental=True, checkpoint_dir=ckpt, checkpoint_every=1)
+
+    tu = compose_path(minutes[2], root, "trip_updates")
+    pd.read_parquet(tu).iloc[::2].to_parquet(tu, index=False)
+    written = generate_features(
+        root, out, incremental=True, checkpoint_dir=ckpt, checkpoint_every=1
+    )
+    assert written == len(minutes) - 2
+
+    generate_features(root, tmp_path / "fresh")
+    for ts in minutes:
+        pd.testing.assert_frame_equal(
+            pd.read_parquet(snapshot_path(ts, out)),
+            pd.read_parquet(snapshot_path(ts, tmp_path / "fresh")),
+        )
+
+
+def test_incremental_stops_when_state_converges(tmp_path: Path, make_raw_minutes) -> None:
+    root, minutes = _processed(tmp_path, make_raw_minutes, 6)
+    out, ckpt = tmp_path / "out", tmp_path / "ckpt"
+    generate_features(root, out, incremental=True, checkpoint_dir=ckpt, checkpoint_every=1)
+
+    # same rows, different bytes: the minute is rebuilt but the state is unchanged
+    vp = compose_path(minutes[2], root, "vehicle_positions")
+    pd.read_parquet(vp).to_parquet(vp, index=False, compression="gzip")
+    assert generate_features(root, out, incremental=True, checkpoint_dir=ckpt) == 1
+
+    # no vehicles for one minute: its state differs until the next vehicle report
+    vp = compose_path(minutes[1], root, "vehicle_positions")
+    pd.read_parquet(vp).iloc[:0].to_parquet(vp, index=False)
+    assert generate_features(root, out, incremental=True, checkpoint_dir=ckpt) == 3
+
+
+def test_generate_features_cli_incremental(tmp_path: Path, make_raw_minutes) -> None:
+    root, _ = _processed(tmp_path, make_raw_minutes, 3)
+    args = ["generate-features", str(root), "--output-root", str(tmp_path / "out"), "--incremental"]
+    runner = CliRunner()
+    assert runner.invoke(cli.cli, args).exit_code == 0
+    manifest = next((tmp_path / "out").rglob(MANIFEST_NAME))
+    mtime = manifest.stat().st_mtime_ns
+    assert runner.invoke(cli.cli, args).exit_code == 0
+    assert manifest.stat().st_mtime_ns == mtime
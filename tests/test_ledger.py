@@ -0,0 +1,177 @@
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+from click.testing import CliRunner
+
+from metro_disruptions_intelligence import cli
+from metro_disruptions_intelligence.features import write_features
+from metro_disruptions_intelligence.ledger import RunLedger, ledger_summary, read_ledger
+from metro_disruptions_intelligence.processed_reader import compose_path, snapshot_path
+from metro_disruptions_intelligence.query import connect
+from metro_disruptions_intelligence.utils_gtfsrt import make_fake_tu
+
+# 2024-05-14 23:58 UTC, so the minutes straddle two UTC days
+START = 1715731080
+
+
+def test_ledger_round_trip(tmp_path: Path) -> None:
+    ledger = RunLedger(tmp_path, "run-a", flush_every=3)
+    for i in range(4):
+        ts = START + 60 * i
+        ledger.record("features", ts, 0.5 + i, rows_in=100, dropped=i, lag_tu_secs=30)
+        ledger.record("score", ts, 0.1, rows_in=10, rows_out=10)
+    ledger.close()
+
+    files = sorted((tmp_path / "run_ledger").rglob("*.parquet"))
+    assert {f.parent.name for f in files} == {"day=14", "day=15"}
+
+    df = read_ledger(tmp_path)
+    assert len(df) == 8
+    assert df["run_id"].eq("run-a").all()
+    assert df["snapshot_timestamp"].is_monotonic_increasing
+    assert df.loc[df["stage"] == "score", "dropped"].isna().all()
+
+    day_two = read_ledger(tmp_path, start_ts=START + 120, stage="features")
+    assert day_two["dropped"].tolist() == [2, 3]
+
+    summary = ledger_summary(df)
+    assert len(summary) == 4
+    features = summary[summary["stage"] == "features"].set_index("period")
+    assert features["minutes"].tolist() == [2, 2]
+    assert features["dropped"].tolist() == [1, 5]
+    assert features["rows_per_sec"].iloc[0] == pytest.approx(200 / 2.0)
+
+
+def test_ledger_writers_of_one_run_keep_their_rows(tmp_path: Path) -> None:
+    # like two service-day shards scored by one worker process
+    for ts in (START, START + 60):
+        ledger = RunLedger(tmp_path, "run-a")
+        ledger.record("score", ts, 0.1)
+        ledger.close()
+
+    assert read_ledger(tmp_path)["snapshot_timestamp"].tolist() == [START, START + 60]
+
+
+def test_ledger_rejects_unknown_facts(tmp_path: Path) -> None:
+    with pytest.raises(ValueError, match="Unknown ledger facts"):
+        RunLedger(tmp_path).record("score", START, 0.1, latency=3)
+
+
+def test_generate_features_appends_to_ledger(tmp_path: Path) -> None:
+    processed_root = tmp_path / "rt"
+    for ts in (START, START + 60):
+        for feed, frame in (
+            ("trip_updates", make_fake_tu(ts, ts + 120)),
+            (
+                "vehicle_positions",
+                pd.DataFrame(columns=["snapshot_timestamp", "stop_id", "direction_id"]),
+            ),
+        ):
+            path = compose_path(ts, processed_root, feed)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            frame.to_parquet(path, index=False)
+
+    result = CliRunner().invoke(
+        cli.cli,
+        [
+            "generate-features",
+            str(processed_root),
+            "--output-root",
+            str(tmp_path / "feats"),
+            "--ledger-root",
+            str(tmp_path / "ledger"),
+        ],
+    )
+    assert result.exit_code == 0, result.output
+
+    ledger = read_ledger(tmp_path / "ledger")
+    assert ledger["snapshot_timestamp"].tolist() == [START, START + 60]
+    assert ledger["stage"].eq("features").all()
+    assert (ledger["rows_in"] > 0).all()
+    assert (ledger["bytes_written"] > 0).all()
+    assert ledger["lag_tu_secs"].notna().all()
+    assert ledger["nan_ratio"].between(0, 1).all()
+
+
+def test_serve_ledger_has_every_stage(tmp_path: Path, make_raw_minutes) -> None:
+    minutes = make_raw_minutes(tmp_path / "raw", 2)
+    result = CliRunner().invoke(
+        cli.cli,
+        [
+            "serve",
+            str(tmp_path / "raw"),
+            "--processed-root",
+            str(tmp_path / "rt"),
+            "--features-root",
+            str(tmp_path / "feats"),
+            "--scores-root",
+            str(tmp_path / "scores"),
+            "--settle-secs",
+            "0",
+            "--poll-interval",
+            "0.01",
+            "--idle-timeout",
+            "0.05",
+            "--no-inotify",
+            "--ledger-root",
+            str(tmp_path / "ledger"),
+        ],
+    )
+    assert result.exit_code == 0, result.output
+
+    con = connect(ledger_root=tmp_path / "ledger")
+    rows = con.sql(
+        "SELECT snapshot_timestamp, list(stage ORDER BY stage) AS stages "
+        "FROM run_ledger GROUP BY ALL ORDER BY snapshot_timestamp"
+    ).fetchall()
+    assert [ts for ts, _ in rows] == minutes
+    assert all(stages == ["features", "parse", "score", "sink"] for _, stages in rows)
+
+
+def test_parallel_backfill_ledger_keeps_every_shard(tmp_path: Path) -> None:
+    rng = np.random.default_rng(3)
+    stations = ["2155269", "2155267", "2153402"]
+    # 2024-05-20 12:00 Sydney: three service days, each spanning two UTC days
+    start, end = 1716170400, 1716170400 + 48 * 3600
+    for ts in range(start, end, 1800):
+        df = pd.DataFrame({
+            "snapshot_timestamp": ts,
+            "stop_id": stations,
+            "direction_id": 0,
+            "congestion_level": rng.random(len(stations)),
+            "occupancy": rng.random(len(stations)),
+        })
+        write_features(df, snapshot_path(ts, tmp_path / "features"))
+    config = tmp_path / "iforest.yaml"
+    config.write_text("n_trees: 5\nheight: 4\nwindow_size: 6\nseed: 7\n")
+
+    result = CliRunner().invoke(
+        cli.cli,
+        [
+            "detect-anomalies",
+            "--processed-root",
+            str(tmp_path / "features"),
+            "--out-root",
+            str(tmp_path / "scores"),
+            "--config",
+            str(config),
+            "--start",
+            datetime.fromtimestamp(start).isoformat(),
+            "--end",
+            datetime.fromtimestamp(end).isoformat(),
+            "--workers",
+            "2",
+            "--ledger-root",
+            str(tmp_path / "ledger"),
+        ],
+    )
+    assert result.exit_code == 0, result.output
+
+    scored = sorted((tmp_path / "scores").rglob("*.parquet"))
+    ledger = read_ledger(tmp_path / "ledger", stage="score")
+    assert len(scored) == 96
+    assert len(ledger) == len(scored)
+    assert ledger["snapshot_timestamp"].is_unique
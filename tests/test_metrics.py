@@ -0,0 +1,98 @@
+import socket
+import urllib.request
+from pathlib import Path
+
+import numpy as np
+from click.testing import CliRunner
+
+from metro_disruptions_intelligence import cli
+from metro_disruptions_intelligence.metrics import MetricsRegistry, serve_metrics
+
+
+def _samples(text: str) -> dict[str, float]:
+    return {
+        line.rsplit(" ", 1)[0]: float(line.rsplit(" ", 1)[1])
+        for line in text.splitlines()
+        if not line.startswith("#")
+    }
+
+
+def test_registry_renders_prometheus_text() -> None:
+    registry = MetricsRegistry()
+    registry.counter("rows_total", "Rows", feed="trip_updates").inc(3)
+    registry.counter("rows_total", "Rows", feed="trip_updates").inc(2)
+    registry.gauge("rate", "Rate").set(1.5)
+    hist = registry.histogram("lag_seconds", "Lag", (10, 60), feed="vp")
+    for value in (5, 10, 30, 120):
+        hist.observe(value)
+
+    text = registry.render()
+    assert "# TYPE rows_total counter" in text
+    assert "# TYPE lag_seconds histogram" in text
+    samples = _samples(text)
+    assert samples['rows_total{feed="trip_updates"}'] == 5
+    assert samples["rate"] == 1.5
+    assert samples['lag_seconds_bucket{feed="vp",le="10"}'] == 2
+    assert samples['lag_seconds_bucket{feed="vp",le="60"}'] == 3
+    assert samples['lag_seconds_bucket{feed="vp",le="+Inf"}'] == 4
+    assert samples['lag_seconds_sum{feed="vp"}'] == 165
+    assert samples['lag_seconds_count{feed="vp"}'] == 4
+
+
+def test_observe_many_matches_observe() -> None:
+    values = np.random.default_rng(0).integers(-10, 4000, 500)
+    one, many = MetricsRegistry(), MetricsRegistry()
+    for v in values:
+        one.histogram("lag", "Lag", (0, 30, 600)).observe(v)
+    many.histogram("lag", "Lag", (0, 30, 600)).observe_many(values)
+    assert one.render() == many.render()
+
+
+def test_serve_metrics_http() -> None:
+    registry = MetricsRegistry()
+    registry.counter("minutes_total", "Minutes").inc()
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    stop = serve_metrics(port, "127.0.0.1", registry)
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics") as resp:
+            assert resp.headers["Content-Type"].startswith("text/plain")
+            assert _samples(resp.read().decode())["minutes_total"] == 1
+    finally:
+        stop()
+
+
+def test_serve_cli_writes_metrics_file(tmp_path: Path, make_raw_minutes) -> None:
+    make_raw_minutes(tmp_path / "raw", 2)
+    metrics_file = tmp_path / "metrics.prom"
+    result = CliRunner().invoke(
+        cli.cli,
+        [
+            "--metrics-file",
+            str(metrics_file),
+            "serve",
+            str(tmp_path / "raw"),
+            "--processed-root",
+            str(tmp_path / "rt"),
+            "--features-root",
+            str(tmp_path / "feats"),
+            "--scores-root",
+            str(tmp_path / "scores"),
+            "--settle-secs",
+            "0",
+            "--poll-interval",
+            "0.01",
+            "--idle-timeout",
+            "0.05",
+            "--no-inotify",
+        ],
+    )
+    assert result.exit_code == 0, result.output
+    samples = _samples(metrics_file.read_text())
+    assert samples["mdi_minutes_processed_total"] >= 2
+    assert samples['mdi_parse_seconds_count{feed="trip_updates"}'] >= 2
+    assert samples["mdi_feature_build_seconds_count"] >= 2
+    assert samples['mdi_feed_lag_seconds_count{feed="trip_updates"}'] > 0
+    assert samples['mdi_parquet_written_bytes_total{dataset="stations_feats"}'] > 0
+    assert samples['mdi_parquet_files_written_total{dataset="trip_updates"}'] >= 2
@@ -0,0 +1,64 @@
+from pathlib import Path
+
+import pandas as pd
+from click.testing import CliRunner
+
+from metro_disruptions_intelligence import cli
+from metro_disruptions_intelligence.etl.ingest_rt import group_raw_files
+from metro_disruptions_intelligence.pipeline import AsyncPipeline
+from metro_disruptions_intelligence.processed_reader import snapshot_path
+from metro_disruptions_intelligence.service import build_service
+
+
+def _service(root: Path):
+    return build_service(
+        root / "rt", root / "feats", root / "scores", {"window_size": 5, "n_trees": 5}
+    )
+
+
+def test_pipeline_matches_serial_service(tmp_path: Path, make_raw_minutes) -> None:
+    make_raw_minutes(tmp_path / "raw", 4)
+    minutes = group_raw_files(tmp_path / "raw")
+
+    serial = _service(tmp_path / "serial")
+    expected = {}
+    for ts, files in minutes.items():
+        serial._pending[ts] = files
+        serial.process_minute(ts)
+        expected[ts] = pd.read_parquet(snapshot_path(ts, tmp_path / "serial" / "feats"))
+
+    seen = []
+    pipeline = AsyncPipeline(_service(tmp_path / "async"), queue_size=2, use_processes=False)
+    stats = pipeline.run_sync(minutes.items(), on_minute=lambda ts, scores: seen.append(ts))
+
+    assert seen == list(minutes)
+    for ts in minutes:
+        got = pd.read_parquet(snapshot_path(ts, tmp_path / "async" / "feats"))
+        pd.testing.assert_frame_equal(got, expected[ts])
+    assert set(stats["queues"]) == {"features", "score", "sink"}
+    assert all(depth == 0 for depth in stats["queues"].values())
+    assert stats["stages"]["parse"]["items"] == 4
+    assert stats["stages"]["sink"]["items"] == 4
+    assert stats["stages"]["features"]["items_per_sec"] > 0
+
+
+def test_run_pipeline_cli(tmp_path: Path, make_raw_minutes) -> None:
+    make_raw_minutes(tmp_path / "raw", 3)
+    # the last minute lacks vehicle positions and is skipped
+    max((tmp_path / "raw" / "vehicle_positions").glob("*.json")).unlink()
+    result = CliRunner().invoke(
+        cli.cli,
+        [
+            "run-pipeline",
+            str(tmp_path / "raw"),
+            "--processed-root",
+            str(tmp_path / "rt"),
+            "--features-root",
+            str(tmp_path / "feats"),
+            "--scores-root",
+            str(tmp_path / "scores"),
+        ],
+    )
+    assert result.exit_code == 0, result.output
+    assert "Processed 2 of 3 minutes" in result.output
+    assert len(list((tmp_path / "feats").rglob("*.parquet"))) == 2
@@ -0,0 +1,116 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from click.testing import CliRunner
+
+from metro_disruptions_intelligence import cli
+from metro_disruptions_intelligence.etl.schemas import TRIP_UPDATES_SCHEMA
+from metro_disruptions_intelligence.etl.write_parquet import write_df_to_partitions
+from metro_disruptions_intelligence.features import write_features
+from metro_disruptions_intelligence.processed_reader import load_rt_dataset, snapshot_path
+from metro_disruptions_intelligence.query import connect, station_delay_percentiles, time_predicate
+
+# 2025-04-01 22:00 UTC = 23:00 BST, so six hours of minutes span two London days
+START = 1743544800
+
+
+def _write_trip_updates(root: Path) -> pd.DataFrame:
+    rng = np.random.default_rng(1)
+    frames = []
+    for hour in range(6):
+        ts = START + 3600 * hour
+        n = 40
+        df = pd.DataFrame({
+            "snapshot_timestamp": ts,
+            "trip_id": [f"trip{hour // 2}_{i % 10}" for i in range(n)],
+            "start_date": "20250401",
+            "route_id": np.where(np.arange(n) % 2, "T1", "M1"),
+            "stop_id": [f"20000{i // 10}" for i in range(n)],
+            "arrival_delay": rng.integers(-60, 600, n),
+        })
+        write_df_to_partitions(
+            df,
+            root / "trip_updates",
+            f"trip_updates_2025-01-04-{hour:02d}-00",
+            schema=TRIP_UPDATES_SCHEMA,
+        )
+        frames.append(df)
+    return pd.concat(frames, ignore_index=True)
+
+
+def test_station_delay_percentiles_matches_pandas(tmp_path: Path) -> None:
+    tu = _write_trip_updates(tmp_path)
+    con = connect(tmp_path)
+
+    got = station_delay_percentiles(con, quantiles=(0.5, 0.9))
+    last = tu.sort_values("snapshot_timestamp").groupby(["trip_id", "start_date", "stop_id"]).last()
+    expected = last.groupby("stop_id")["arrival_delay"].quantile([0.5, 0.9]).unstack()
+    assert got["stop_id"].tolist() == expected.index.tolist()
+    np.testing.assert_allclose(got["p50"], expected[0.5])
+    np.testing.assert_allclose(got["p90"], expected[0.9])
+
+    loaded = load_rt_dataset(tmp_path, ["trip_updates"])
+    assert con.sql("SELECT count(*) FROM trip_updates").fetchone()[0] == len(loaded)
+
+
+def test_time_predicate_prunes_partitions(tmp_path: Path) -> None:
+    tu = _write_trip_updates(tmp_path)
+    con = connect(tmp_path)
+    start, end = START + 1800, START + 3 * 3600
+    pred = time_predicate("trip_updates", start, end)
+    assert "day IN (1, 2)" in pred
+
+    got = con.sql(f"SELECT count(*) FROM trip_updates WHERE {pred} AND route_id = 'T1'").fetchone()
+    expected = tu[tu.snapshot_timestamp.between(start, end) & (tu.route_id == "T1")]
+    assert got[0] == len(expected)
+
+    # files of other days are never opened, so corrupting them does not matter
+    for f in (tmp_path / "trip_updates" / "year=2025" / "month=04" / "day=02").glob("*.parquet"):
+        f.write_bytes(b"not parquet")
+    pred = time_predicate("trip_updates", START, START + 60)
+    assert con.sql(f"SELECT count(*) FROM trip_updates WHERE {pred}").fetchone()[0] == 40
+
+
+def test_query_cli_reads_feature_views(tmp_path: Path) -> None:
+    features_root = tmp_path / "features"
+    for k in range(3):
+        ts = START + 60 * k
+        feats = pd.DataFrame({
+            "stop_id": ["1", "2"],
+            "direction_id": [0, 1],
+            "arrival_delay_t": [k, 2.0 * k],
+            "snapshot_timestamp": ts,
+        })
+        write_features(feats, snapshot_path(ts, features_root))
+
+    out = tmp_path / "out" / "delays.csv"
+    sql = "SELECT stop_id, sum(arrival_delay_t) AS total FROM stations_feats GROUP BY stop_id ORDER BY stop_id"
+    result = CliRunner().invoke(
+        cli.cli,
+        [
+            "query",
+            sql,
+            "--processed-root",
+            str(tmp_path / "missing"),
+            "--features-root",
+            str(features_root),
+            "--output",
+            str(out),
+        ],
+    )
+    assert result.exit_code == 0, result.output
+    df = pd.read_csv(out, dtype={"stop_id": str})
+    assert df.to_dict("list") == {"stop_id": ["1", "2"], "total": [3.0, 6.0]}
+
+    result = CliRunner().invoke(
+        cli.cli,
+        [
+            "query",
+            "SELECT count(*) AS n FROM stations_feats",
+            "--features-root",
+            str(features_root),
+        ],
+    )
+    assert result.exit_code == 0, result.output
+    assert "6" in result.output
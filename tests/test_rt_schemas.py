@@ -0,0 +1,46 @@
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from metro_disruptions_intelligence.etl.ingest_rt import ingest_one_file
+from metro_disruptions_intelligence.etl.parse_alerts import ALERT_COLUMNS
+from metro_disruptions_intelligence.etl.parse_trip_updates import TRIP_UPDATE_COLUMNS
+from metro_disruptions_intelligence.etl.parse_vehicle_positions import VEHICLE_POSITION_COLUMNS
+from metro_disruptions_intelligence.etl.schemas import FEED_SCHEMAS, PARTITION_FIELDS
+
+SAMPLES = {
+    "alerts": Path("sample_data/rt/sample_alert.json"),
+    "trip_updates": Path("sample_data/rt/sample_trip_update.json"),
+    "vehicle_positions": Path("sample_data/rt/sample_vehicles_position.json"),
+}
+EMPTY_JSON = '{"header": {"timestamp": 1743462000}, "entity": []}'
+
+
+def test_schemas_cover_parser_columns() -> None:
+    assert FEED_SCHEMAS["trip_updates"].names == TRIP_UPDATE_COLUMNS
+    assert FEED_SCHEMAS["vehicle_positions"].names == VEHICLE_POSITION_COLUMNS
+    assert FEED_SCHEMAS["alerts"].names == ALERT_COLUMNS
+
+
+def test_empty_and_full_minutes_share_schema(tmp_path: Path) -> None:
+    for feed, sample in SAMPLES.items():
+        empty = tmp_path / "raw" / feed / "2025_01_04_00_01_00.json"
+        empty.parent.mkdir(parents=True)
+        empty.write_text(EMPTY_JSON)
+        ingest_one_file(feed, sample, tmp_path / "rt" / feed)
+        ingest_one_file(feed, empty, tmp_path / "rt" / feed)
+
+        expected = FEED_SCHEMAS[feed]
+        for name, type_ in PARTITION_FIELDS:
+            expected = expected.append(pa.field(name, type_))
+        files = sorted((tmp_path / "rt" / feed).rglob("*.parquet"))
+        assert len(files) == 2
+        for path in files:
+            assert pq.read_schema(path).remove_metadata() == expected
+            meta = pq.ParquetFile(path).metadata
+            assert meta.row_group(0).column(0).compression == "ZSTD"
+
+        # one dataset scan over the empty and non-empty minute
+        table = pq.ParquetDataset(files, partitioning=None).read()
+        assert table.schema.field("stop_id" if feed != "alerts" else "route_id").type == pa.string()
@@ -0,0 +1,92 @@
+import threading
+from pathlib import Path
+
+import pandas as pd
+from click.testing import CliRunner
+
+from metro_disruptions_intelligence import cli
+from metro_disruptions_intelligence.etl.replay_raw import replay_raw_files
+from metro_disruptions_intelligence.processed_reader import anomaly_scores_path, snapshot_path
+from metro_disruptions_intelligence.service import RawFeedWatcher, build_service
+
+
+def test_replay_raw_files(tmp_path: Path, make_raw_minutes) -> None:
+    make_raw_minutes(tmp_path / "src", 3)
+    assert replay_raw_files(tmp_path / "src", tmp_path / "dest", limit=2) == 2
+    assert len(list((tmp_path / "dest" / "trip_updates").glob("*.json"))) == 2
+    assert not list((tmp_path / "dest").rglob("*.tmp"))
+
+
+def test_service_processes_each_minute(tmp_path: Path, make_raw_minutes) -> None:
+    minutes = make_raw_minutes(tmp_path / "src", 3)
+    raw = tmp_path / "raw"
+    replay_raw_files(tmp_path / "src", raw)
+
+    service = build_service(
+        tmp_path / "rt", tmp_path / "feats", tmp_path / "scores", {"window_size": 5}, settle_secs=0
+    )
+    watcher = RawFeedWatcher(raw, poll_interval=0.01, use_inotify=False)
+    reports = service.run(watcher, idle_timeout=0.05)
+
+    assert [r.ts for r in reports] == minutes
+    assert all(r.latency_secs >= r.processing_secs for r in reports)
+    assert service.detector.n_obs == sum(r.n_scored for r in reports)
+    for ts in minutes:
+        feats = pd.read_parquet(snapshot_path(ts, tmp_path / "feats"))
+        assert (feats["snapshot_timestamp"] == ts).all()
+        assert anomaly_scores_path(ts, tmp_path / "scores").exists()
+    assert list((tmp_path / "rt" / "alerts").rglob("*.parquet"))
+
+
+def test_service_picks_up_live_files(tmp_path: Path, make_raw_minutes) -> None:
+    make_raw_minutes(tmp_path / "src", 3)
+    raw = tmp_path / "raw"
+    service = build_service(tmp_path / "rt", tmp_path / "feats", tmp_path / "scores", settle_secs=0)
+    watcher = RawFeedWatcher(raw, poll_interval=0.01)
+    feeder = threading.Thread(
+        target=replay_raw_files, args=(tmp_path / "src", raw), kwargs={"interval": 0.05}
+    )
+    feeder.start()
+    reports = service.run(watcher, max_minutes=3, idle_timeout=2.0)
+    feeder.join()
+    watcher.close()
+    assert len(reports) == 3
+    assert [r.ts for r in reports] == sorted(r.ts for r in reports)
+
+
+def test_incomplete_minute_waits_for_vehicles(tmp_path: Path, make_raw_minutes) -> None:
+    make_raw_minutes(tmp_path / "raw", 1)
+    vp = next((tmp_path / "raw" / "vehicle_positions").glob("*.json"))
+    vp.unlink()
+    service = build_service(tmp_path / "rt", tmp_path / "feats", tmp_path / "scores", settle_secs=0)
+    watcher = RawFeedWatcher(tmp_path / "raw", use_inotify=False)
+    service.add_files(watcher.poll())
+    assert service.ready_minutes() == []
+
+
+def test_serve_cli(tmp_path: Path, make_raw_minutes) -> None:
+    make_raw_minutes(tmp_path / "raw", 2)
+    runner = CliRunner()
+    result = runner.invoke(
+        cli.cli,
+        [
+            "serve",
+            str(tmp_path / "raw"),
+            "--processed-root",
+            str(tmp_path / "rt"),
+            "--features-root",
+            str(tmp_path / "feats"),
+            "--scores-root",
+            str(tmp_path / "scores"),
+            "--settle-secs",
+            "0",
+            "--poll-interval",
+            "0.01",
+            "--idle-timeout",
+            "0.05",
+            "--no-inotify",
+        ],
+    )
+    assert result.exit_code == 0, result.output
+    assert "latency" in result.output
+    assert len(list((tmp_path / "feats").rglob("*.parquet"))) == 2
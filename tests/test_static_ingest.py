@@ -16,3 +16,68 @@ def test_static_ingest(tmp_path):
     df = pd.read_parquet(parquet_path)
     assert len(df) > 0
 
+
+def _write_gtfs(gtfs_dir: Path) -> None:
+    gtfs_dir.mkdir(parents=True)
+    (gtfs_dir / "trips.txt").write_text(
+        "route_id,service_id,trip_id\nT1,weekday,t1\nT1,weekend,t2\nM1,weekday,t3\n"
+    )
+    (gtfs_dir / "stop_times.txt").write_text(
+        "trip_id,arrival_time,departure_time,stop_id,stop_sequence\n"
+        "t1,23:58:00,23:59:30,2000001,1\n"
+        "t1,,,2000002,2\n"
+        "t1,25:10:05,25:11:00,2000003,3\n"
+        "t2,08:00:00,08:01:00,2000001,1\n"
+        "t3,7:03:00,7:04:00,0002000,1\n"
+    )
+    (gtfs_dir / "calendar.txt").write_text(
+        "service_id,monday,tuesday,wednesday,thursday,friday,saturday,sunday,start_date,end_date\n"
+        "weekday,1,1,1,1,1,0,0,20250602,20250615\n"
+        "weekend,0,0,0,0,0,1,1,20250602,20250615\n"
+    )
+    # Monday 9 June is a holiday served by the weekend timetable
+    (gtfs_dir / "calendar_dates.txt").write_text(
+        "service_id,date,exception_type\nweekday,20250609,2\nweekend,20250609,1\n"
+    )
+
+
+def test_static_ingest_partitions_and_calendar(tmp_path):
+    from datetime import date
+
+    from metro_disruptions_intelligence.processed_reader import read_station_schedule
+
+    gtfs_dir = tmp_path / "gtfs"
+    _write_gtfs(gtfs_dir)
+    out = tmp_path / "static"
+    parquet_path = ingest_static_gtfs(gtfs_dir, out)
+
+    assert parquet_path.is_dir()
+    assert (parquet_path / "service_id=weekday" / "route_id=M1").is_dir()
+    df = pd.read_parquet(parquet_path).sort_values(["trip_id", "stop_sequence"])
+    t1 = df[df.trip_id == "t1"]
+    assert t1["sched_arr"].iloc[[0, 2]].tolist() == [86280, 90605]
+    assert t1["sched_dep"].iloc[[0, 2]].tolist() == [86370, 90660]
+    assert t1["sched_arr"].isna().iloc[1]
+    assert df.loc[df.trip_id == "t3", "stop_id"].item() == "0002000"
+
+    monday = read_station_schedule(out, date(2025, 6, 2))
+    assert sorted(monday["trip_id"]) == ["t1", "t1", "t1", "t3"]
+    holiday = read_station_schedule(out, date(2025, 6, 9))
+    assert holiday["trip_id"].tolist() == ["t2"]
+    routes = read_station_schedule(out, date(2025, 6, 3), route_ids=["M1"])
+    assert routes["trip_id"].tolist() == ["t3"]
+    assert read_station_schedule(out, date(2025, 7, 1)).empty
+
+
+def test_static_ingest_date_range(tmp_path):
+    from datetime import date
+
+    gtfs_dir = tmp_path / "gtfs"
+    _write_gtfs(gtfs_dir)
+    out = tmp_path / "static"
+    ingest_static_gtfs(gtfs_dir, out, start_date=date(2025, 6, 7), end_date=date(2025, 6, 8))
+
+    calendar = pd.read_parquet(out / "service_calendar.parquet")
+    assert set(calendar["service_id"]) == {"weekend"}
+    assert len(calendar) == 2
+    assert [p.name for p in (out / "station_schedule.parquet").iterdir()] == ["service_id=weekend"]
@@ -0,0 +1,104 @@
+from pathlib import Path
+
+import pandas as pd
+from click.testing import CliRunner
+
+from metro_disruptions_intelligence import cli
+from metro_disruptions_intelligence.etl.ingest_rt import ingest_all_rt
+from metro_disruptions_intelligence.etl.synthetic import (
+    SyntheticConfig,
+    generate_synthetic_feeds,
+    iter_synthetic_minutes,
+    plan_disruptions,
+    route_map_from_schedule,
+    scale_route_map,
+    synthetic_route_map,
+)
+from metro_disruptions_intelligence.features import build_route_map
+from metro_disruptions_intelligence.processed_reader import compose_path, read_features
+
+ROUTE_MAP = synthetic_route_map(2, 6)
+CFG = SyntheticConfig(minutes_per_day=45, disruptions_per_day=2, lag_max_secs=40)
+
+
+def test_synthetic_minutes_follow_the_plan() -> None:
+    minutes = list(iter_synthetic_minutes(ROUTE_MAP, CFG))
+    assert [ts for ts, _ in minutes] == list(range(CFG.start_ts, CFG.start_ts + 45 * 60, 60))
+
+    tu = pd.concat([frames["trip_updates"] for _, frames in minutes], ignore_index=True)
+    vp = pd.concat([frames["vehicle_positions"] for _, frames in minutes], ignore_index=True)
+    lags = [ts - frames["trip_updates"]["snapshot_timestamp"].iloc[0] for ts, frames in minutes]
+    assert min(lags) >= 0 and max(lags) <= CFG.lag_max_secs
+    assert set(zip(tu["route_id"], tu["direction_id"])) == set(ROUTE_MAP)
+    assert vp["current_status"].isin(["1", "2"]).all()
+    assert vp["trip_id"].isin(tu["trip_id"]).all()
+
+    # delays only reach the predictions once a disruption has started
+    disruptions = plan_disruptions(ROUTE_MAP, CFG)
+    first = disruptions.groupby(["route_id", "direction_id"])["active_period_start"].min()
+    for (route_id, direction_id), start in first.items():
+        line = tu[(tu["route_id"] == route_id) & (tu["direction_id"] == direction_id)]
+        before = line[line["snapshot_timestamp"] < start]
+        after = line[line["snapshot_timestamp"] >= start]
+        assert before["arrival_delay"].max() < CFG.disruption_delay_secs / 2
+        assert after["arrival_delay"].max() >= CFG.disruption_delay_secs
+
+    alerts = pd.concat([frames["alerts"] for _, frames in minutes], ignore_index=True)
+    assert set(alerts["alert_entity_id"]) == set(disruptions["disruption_id"])
+
+
+def test_json_feed_ingests_like_parquet_feed(tmp_path: Path) -> None:
+    generate_synthetic_feeds(ROUTE_MAP, tmp_path / "raw", CFG, "json")
+    generate_synthetic_feeds(ROUTE_MAP, tmp_path / "direct", CFG, "parquet")
+    ingest_all_rt(tmp_path / "raw", tmp_path / "ingested")
+
+    assert build_route_map(tmp_path / "direct") == ROUTE_MAP
+    truth = pd.read_parquet(tmp_path / "direct" / "disruptions.parquet")
+    assert len(truth) == 2
+    for feed in ("alerts", "trip_updates", "vehicle_positions"):
+        for ts in (CFG.start_ts, CFG.start_ts + 30 * 60):
+            ingested = pd.read_parquet(compose_path(ts, tmp_path / "ingested", feed))
+            direct = pd.read_parquet(compose_path(ts, tmp_path / "direct", feed))
+            pd.testing.assert_frame_equal(ingested, direct)
+
+
+def test_route_map_from_schedule_and_scaling() -> None:
+    route_map = route_map_from_schedule(
+        Path("sample_data/processed_sample/station_schedule.parquet")
+    )
+    assert list(route_map) == [("SMNW_M1", 0)]
+    stops = route_map[("SMNW_M1", 0)]
+    assert len(stops) == len(set(stops)) > 10
+
+    scaled = scale_route_map(route_map, 3)
+    assert list(scaled) == [("SMNW_M1", 0), ("SMNW_M1~1", 0), ("SMNW_M1~2", 0)]
+    assert scaled[("SMNW_M1~2", 0)] == [f"{s}~2" for s in stops]
+
+
+def test_generate_synthetic_cli_feeds_generate_features(tmp_path: Path) -> None:
+    result = CliRunner().invoke(
+        cli.cli,
+        [
+            "generate-synthetic",
+            str(tmp_path / "rt"),
+            "--routes",
+            "2",
+            "--stops",
+            "5",
+            "--minutes-per-day",
+            "5",
+            "--drop-prob",
+            "0.2",
+        ],
+    )
+    assert result.exit_code == 0, result.output
+    assert "4 route directions" in result.output
+
+    result = CliRunner().invoke(
+        cli.cli,
+        ["generate-features", str(tmp_path / "rt"), "--output-root", str(tmp_path / "feats")],
+    )
+    assert result.exit_code == 0, result.output
+    files = sorted((tmp_path / "feats").rglob("*.parquet"))
+    assert files
+    assert not read_features(files[-1]).empty
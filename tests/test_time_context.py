@@ -0,0 +1,45 @@
+from datetime import timedelta
+
+import numpy as np
+import pytest
+
+from metro_disruptions_intelligence.time_context import sydney_context, sydney_table
+from metro_disruptions_intelligence.utils_gtfsrt import is_new_service_day, sydney_time
+
+# DST ends 2024-04-07 and starts 2024-10-06 in Sydney
+TRANSITIONS = [1712419200, 1728144000]
+
+
+def _around_transitions() -> np.ndarray:
+    return np.concatenate([np.arange(t - 6 * 3600, t + 6 * 3600, 450) for t in TRANSITIONS])
+
+
+def test_context_matches_pytz_across_dst() -> None:
+    for ts in _around_transitions().tolist():
+        ctx = sydney_context(ts)
+        dt = sydney_time(ts)
+        assert ctx.hour == dt.hour
+        assert ctx.utc_offset == dt.utcoffset().total_seconds()
+        assert ctx.day_type == int(dt.weekday() >= 5)
+        assert ctx.sin_hour == pytest.approx(np.sin(2 * np.pi * dt.hour / 24))
+        service = dt - timedelta(days=1) if dt.hour < 3 else dt
+        assert ctx.service_day == service.date()
+        assert ctx.local_dt.replace(tzinfo=None) == dt.replace(tzinfo=None)
+
+
+def test_vectorised_service_day_matches_scalar() -> None:
+    rng = np.random.default_rng(0)
+    prev = np.concatenate([_around_transitions(), rng.integers(1.7e9, 1.8e9, 500)])
+    cur = prev + rng.integers(0, 2 * 86400, len(prev))
+    flags = sydney_table().is_new_service_day(prev, cur, 3)
+    expected = [
+        (sydney_time(c).date() != sydney_time(p).date()) and sydney_time(c).hour >= 3
+        for p, c in zip(prev.tolist(), cur.tolist())
+    ]
+    assert flags.tolist() == expected
+    assert [is_new_service_day(p, c, 3) for p, c in zip(prev[:50], cur[:50])] == expected[:50]
+    assert not sydney_table().is_new_service_day(np.nan, cur[0], 3)
+
+
+def test_out_of_range_falls_back_to_zoneinfo() -> None:
+    assert sydney_context(0).utc_offset == sydney_time(0).utcoffset().total_seconds()
@@ -0,0 +1,134 @@
+from datetime import date, datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from zoneinfo import ZoneInfo
+
+from metro_disruptions_intelligence.etl.static_ingest import ingest_static_gtfs
+from metro_disruptions_intelligence.features import (
+    SnapshotFeatureBuilder,
+    read_features,
+    snapshot_frame,
+    write_features,
+)
+from metro_disruptions_intelligence.timetable import (
+    StaticTimetable,
+    TimetableIndex,
+    service_day_origin,
+)
+from metro_disruptions_intelligence.utils_gtfsrt import make_fake_tu, make_fake_vp
+
+SERVICE_DATE = date(2025, 6, 3)
+# trips t0..t7 every 10 minutes from 07:50 Sydney time
+ORIGIN = int(datetime(2025, 6, 3, tzinfo=ZoneInfo("Australia/Sydney")).timestamp())
+ARRIVALS = {f"t{k}": ORIGIN + 7 * 3600 + 50 * 60 + 600 * k for k in range(8)}
+
+
+def _static_dir(tmp_path: Path) -> Path:
+    gtfs = tmp_path / "gtfs"
+    gtfs.mkdir()
+    (gtfs / "trips.txt").write_text(
+        "route_id,service_id,trip_id,direction_id\n"
+        + "".join(f"R,daily,{trip},0\n" for trip in ARRIVALS)
+    )
+    rows = []
+    for trip, arr in ARRIVALS.items():
+        secs = arr - ORIGIN
+        hms = f"{secs // 3600:02d}:{secs % 3600 // 60:02d}:00"
+        rows.append(f"{trip},{hms},{hms},S1,1\n")
+    (gtfs / "stop_times.txt").write_text(
+        "trip_id,arrival_time,departure_time,stop_id,stop_sequence\n" + "".join(rows)
+    )
+    (gtfs / "calendar.txt").write_text(
+        "service_id,monday,tuesday,wednesday,thursday,friday,saturday,sunday,start_date,end_date\n"
+        "daily,1,1,1,1,1,1,1,20250601,20250630\n"
+    )
+    ingest_static_gtfs(gtfs, tmp_path / "static")
+    return tmp_path / "static"
+
+
+def _snapshot(ts: int, trips: list[str]) -> pd.DataFrame:
+    return pd.concat(
+        [make_fake_tu(ts, ARRIVALS[t], stop_id="S1", trip_id=t) for t in trips], ignore_index=True
+    )
+
+
+def test_service_day_origin_is_noon_minus_twelve_hours() -> None:
+    assert service_day_origin(SERVICE_DATE) == ORIGIN
+    # Sydney leaves daylight saving on 6 April 2025, so noon - 12h is 01:00 AEDT
+    origin = service_day_origin(date(2025, 4, 6))
+    local = datetime.fromtimestamp(origin, timezone.utc).astimezone(ZoneInfo("Australia/Sydney"))
+    assert (local.hour, local.day) == (1, 6)
+
+
+def test_timetable_index_lookups() -> None:
+    index = TimetableIndex(
+        pd.DataFrame({
+            "stop_id": ["A", "A", "A", "B"],
+            "direction_id": [0, 0, 0, 0],
+            "trip_id": ["x", "y", "z", "x"],
+            "arrival": [1_000, 1_600, 2_200, 1_100],
+        })
+    )
+    assert index.scheduled_headway(("A", 0), 1_650) == (600.0, 1_000.0)
+    assert np.isnan(index.scheduled_headway(("A", 0), 1_000)[0])
+    assert np.isnan(index.scheduled_headway(("A", 0), 1_900)[0])
+    assert np.isnan(index.scheduled_headway(("C", 0), 1_600)[0])
+    assert index.next_scheduled_gap(("A", 0), 1_601) == 599
+    assert np.isnan(index.next_scheduled_gap(("B", 0), 1_200))
+    assert index.missing_trips(1_000, 1_500, ["x"]) == {("A", 0): 2}
+
+
+def test_missing_trips_matches_full_scan() -> None:
+    rng = np.random.default_rng(5)
+    n = 2_000
+    arrivals = pd.DataFrame({
+        "stop_id": rng.choice(["A", "B", "C", "D"], n),
+        "direction_id": rng.integers(0, 2, n),
+        "trip_id": [f"t{k}" for k in rng.integers(0, 300, n)],
+        "arrival": rng.integers(0, 20_000, n),
+    })
+    index = TimetableIndex(arrivals)
+    for ts in (-500, 0, 7_000, 19_900, 25_000):
+        observed = [f"t{k}" for k in rng.integers(0, 300, 150)] + ["unknown"]
+        absent = arrivals[
+            arrivals["arrival"].between(ts, ts + 899) & ~arrivals["trip_id"].isin(observed)
+        ]
+        expected = absent.groupby(["stop_id", "direction_id"]).size()
+        assert index.missing_trips(ts, 900, observed) == {
+            (stop, int(direction)): int(n) for (stop, direction), n in expected.items()
+        }
+
+
+def test_builder_uses_timetable_headways(tmp_path: Path) -> None:
+    timetable = StaticTimetable(_static_dir(tmp_path))
+    ts1, ts2 = ARRIVALS["t1"] - 30, ARRIVALS["t3"] - 30
+    # t2 is cancelled: it never appears in the feed
+    snap1 = _snapshot(ts1, ["t1", "t3", "t4", "t5", "t6", "t7"])
+    snap2 = _snapshot(ts2, ["t3", "t4", "t5", "t6", "t7"])
+
+    plain = SnapshotFeatureBuilder({("R", 0): ["S1"]})
+    plain.build_snapshot_features(snap1, make_fake_vp(ts1, stop_id="S1"), ts1)
+    feats = plain.build_snapshot_features(snap2, make_fake_vp(ts2, stop_id="S1"), ts2)
+    assert feats.loc[("S1", 0), "rel_headway_t"] == 1.0
+    assert "sched_headway_t" not in feats.columns
+
+    builder = SnapshotFeatureBuilder({("R", 0): ["S1"]}, timetable=timetable)
+    first = builder.build_snapshot_features(snap1, make_fake_vp(ts1, stop_id="S1"), ts1)
+    # no earlier realtime arrival: measured from the previous scheduled train
+    assert first.loc[("S1", 0), "rel_headway_t"] == 1.0
+    assert first.loc[("S1", 0), "missing_trips_t"] == 1
+    feats = snapshot_frame(builder, snap2, make_fake_vp(ts2, stop_id="S1"), ts2)
+    row = feats.iloc[0]
+    assert row["headway_t"] == 1200
+    assert row["sched_headway_t"] == 600
+    assert row["rel_headway_t"] == 2.0
+    assert row["next_sched_gap_t"] == 30
+    assert row["missing_trips_t"] == 0
+
+    out = tmp_path / "feats.parquet"
+    write_features(feats, out)
+    back = read_features(out)
+    assert back.loc[0, "rel_headway_t"] == 2.0
+    assert back["missing_trips_t"].dtype == np.int64
@@ -3,7 +3,10 @@ from pathlib import Path
 
 import pandas as pd
 
-from metro_disruptions_intelligence.etl.write_parquet import write_df_to_partitioned_parquet
+from metro_disruptions_intelligence.etl.write_parquet import (
+    write_df_to_partitioned_parquet,
+    write_df_to_partitions,
+)
 
 
 def test_partition_directory_structure_and_prefix(tmp_path: Path) -> None:
@@ -51,3 +54,26 @@ def test_partition_uses_london_day(tmp_path: Path) -> None:
     out = write_df_to_partitioned_parquet(df, tmp_path, "myprefix")
     expected = tmp_path / "year=2025" / "month=06" / "day=04" / "myprefix.parquet"
     assert out == expected
+
+
+def test_multi_day_frame_is_split_by_london_day(tmp_path: Path) -> None:
+    import pytz
+
+    london = pytz.timezone("Europe/London")
+    late = int(london.localize(datetime(2025, 3, 31, 23, 59, 30)).timestamp())
+    df = pd.DataFrame({
+        "snapshot_timestamp": [late, late + 60, late, late + 120],
+        "value": range(4),
+    })
+
+    written = write_df_to_partitions(df, tmp_path, "myprefix")
+
+    assert written == [
+        tmp_path / "year=2025" / "month=03" / "day=31" / "myprefix.parquet",
+        tmp_path / "year=2025" / "month=04" / "day=01" / "myprefix.parquet",
+    ]
+    assert pd.read_parquet(written[0])["value"].tolist() == [0, 2]
+    second = pd.read_parquet(written[1])
+    assert second["value"].tolist() == [1, 3]
+    assert second[["year", "month", "day"]].drop_duplicates().values.tolist() == [[2025, 4, 1]]
+    assert write_df_to_partitioned_parquet(df, tmp_path, "myprefix") == written[0]